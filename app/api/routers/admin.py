@@ -4,12 +4,15 @@ from typing import Optional, List, Annotated
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel, Field, StringConstraints
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from ...db import get_db
-from ...models import User, LedgerEntry, Wallet
+from ...models import User, LedgerEntry, WalletShadow
 from ...auth.deps import get_current_user
 from ...repos import ledger_repo as ledger_repo
+from ...repos.ledger_checkpoints import balances_after
+from ...repos.wallet_totals import read_totals
+from ...services.wallet_reconciliation import repair_wallet
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -34,9 +37,10 @@ class LedgerOut(BaseModel):
     session_id: Optional[uuid.UUID] = None
     registration_id: Optional[uuid.UUID] = None
     created_at: str
+    balance_after_cents: Optional[int] = None  # the user's posted balance right after this entry
 
     @classmethod
-    def from_model(cls, e: LedgerEntry) -> LedgerOut:
+    def from_model(cls, e: LedgerEntry, balance_after: Optional[int] = None) -> LedgerOut:
         return cls(
             id=e.id,
             kind=e.kind,
@@ -45,12 +49,29 @@ class LedgerOut(BaseModel):
             session_id=e.session_id,
             registration_id=e.registration_id,
             created_at=e.created_at.isoformat(),
+            balance_after_cents=balance_after,
         )
 
 class WalletTotalsOut(BaseModel):
     total_posted_cents: int
     total_holds_cents: int
     total_available_cents: int
+    verified_at: Optional[str] = None  # last full check against SUM(wallets)
+
+class WalletDriftOut(BaseModel):
+    user_id: uuid.UUID
+    drift_posted_cents: int   # wallet minus ledger
+    drift_holds_cents: int
+    mismatch_since: str
+    checked_at: Optional[str] = None
+
+class WalletRepairOut(BaseModel):
+    user_id: uuid.UUID
+    posted_cents_before: int
+    holds_cents_before: int
+    posted_cents: int
+    holds_cents: int
+    changed: bool
 
 
 @router.post("/deposits", response_model=LedgerOut)
@@ -86,8 +107,9 @@ async def ledger_admin(
     rows = await ledger_repo.list_ledger_admin(
         db, user_id=user_id, session_id=session_id, limit=limit, before_id=before_id
     )
+    balances = await balances_after(db, [(e.id, e.user_id) for e in rows])
     return [
-        LedgerOut.from_model(e) for e in rows
+        LedgerOut.from_model(e, balances.get(e.id)) for e in rows
     ]
 
 
@@ -96,16 +118,60 @@ async def wallet_totals(
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
+    """Maintained totals (one row + unfolded deltas); no scan over wallets."""
     _require_admin(current)
-    res = await db.execute(
-        select(
-            func.coalesce(func.sum(Wallet.posted_cents), 0),
-            func.coalesce(func.sum(Wallet.holds_cents), 0),
-        )
-    )
-    posted, holds = res.first()
+    t = await read_totals(db)
     return WalletTotalsOut(
-        total_posted_cents=int(posted or 0),
-        total_holds_cents=int(holds or 0),
-        total_available_cents=int((posted or 0) - (holds or 0)),
+        total_posted_cents=t.posted_cents,
+        total_holds_cents=t.holds_cents,
+        total_available_cents=t.available_cents,
+        verified_at=t.verified_at.isoformat() if t.verified_at else None,
+    )
+
+
+@router.get("/wallets/drift", response_model=List[WalletDriftOut])
+async def wallet_drift(
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+    limit: Annotated[int, Field(gt=0, le=500)] = 100,
+):
+    """Wallets the reconciler found out of line with their ledger, oldest mismatch first."""
+    _require_admin(current)
+    rows = await db.execute(
+        select(WalletShadow)
+        .where(WalletShadow.mismatch_since.is_not(None))
+        .order_by(WalletShadow.mismatch_since)
+        .limit(limit)
+    )
+    return [
+        WalletDriftOut(
+            user_id=w.user_id,
+            drift_posted_cents=w.drift_posted_cents,
+            drift_holds_cents=w.drift_holds_cents,
+            mismatch_since=w.mismatch_since.isoformat(),
+            checked_at=w.checked_at.isoformat() if w.checked_at else None,
+        )
+        for w in rows.scalars().all()
+    ]
+
+
+@router.post("/wallets/{user_id}/reconcile", response_model=WalletRepairOut)
+async def wallet_reconcile(
+    user_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    """Recompute one wallet from the ledger and clear its drift flag."""
+    _require_admin(current)
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    res = await repair_wallet(db, user_id)
+    await db.commit()
+    return WalletRepairOut(
+        user_id=res.user_id,
+        posted_cents_before=res.posted_cents_before,
+        holds_cents_before=res.holds_cents_before,
+        posted_cents=res.posted_cents,
+        holds_cents=res.holds_cents,
+        changed=res.changed,
     )
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 import uuid
 from typing import Optional, List, Literal, Annotated
 from datetime import datetime, timezone
@@ -11,8 +12,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from ...auth.deps import get_current_user
-from ...db import get_db
+from ...auth.principal_cache import invalidate_principal
+from ...db import get_db, SessionLocal
 from ...models import User, Wallet, LedgerEntry, Registration, Session as SessionModel
+from ...repos import counts, keyset
+from ...repos.ledger_checkpoints import balances_after
 
 router = APIRouter(prefix="/admin/users", tags=["admin:users"])
 
@@ -37,6 +41,8 @@ class AdminUserRow(BaseModel):
 class AdminUserListOut(BaseModel):
     items: List[AdminUserRow]
     total: int
+    total_is_estimate: bool = False      # planner estimate for large result sets
+    next_cursor: Optional[str] = None    # pass as ?cursor= for the next page
 
 class AdminUserWallet(BaseModel):
     posted_cents: int
@@ -50,6 +56,7 @@ class AdminLedgerRow(BaseModel):
     session_id: Optional[uuid.UUID] = None
     registration_id: Optional[uuid.UUID] = None
     created_at: str
+    balance_after_cents: Optional[int] = None  # posted balance right after this entry
 
 class AdminRegistrationRow(BaseModel):
     registration_id: uuid.UUID
@@ -75,6 +82,10 @@ class AdminUserDetailOut(BaseModel):
     wallet: AdminUserWallet
     ledger: List[AdminLedgerRow]
     registrations: List[AdminRegistrationRow]
+    ledger_next_cursor: Optional[str] = None          # pass as ?ledger_cursor=
+    registrations_next_cursor: Optional[str] = None   # pass as ?reg_cursor=
+    ledger_count: Optional[int] = None                # summary mode only
+    registrations_count: Optional[int] = None         # summary mode only
 
 class AdminUserUpdateIn(BaseModel):
     name: Optional[Annotated[str, StringConstraints(min_length=2, strip_whitespace=True)]] = None
@@ -91,29 +102,29 @@ class AdminUserUpdateIn(BaseModel):
 async def admin_list_users(
     q: Optional[str] = Query(None, description="search name or email"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True, description="ignored when cursor is given"),
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
+    """
+    Newest first, keyset-paged on (created_at, id). The substring search matches
+    lower(name) / lower(email) with LIKE, served by the pg_trgm GIN indexes.
+    `total` is exact below 1000 matches and a planner estimate above that.
+    """
     _require_admin(current)
 
-    # base query
-    # cond = []
-    # if q:
-    #     qs = f"%{q.lower()}%"
-    #     cond.append(sa.or_(func.lower(User.name).like(qs), func.lower(User.email).like(qs)))
-    
-    # List (add User.deleted_at.is_(None) to the WHERE)
     cond = [User.deleted_at.is_(None)]
-    if q:
-        qs = f"%{q.lower()}%"
-        cond.append(sa.or_(func.lower(User.name).like(qs), func.lower(User.email).like(qs)))
+    if q and q.strip():
+        pattern = keyset.like_pattern(q.strip().lower())
+        cond.append(sa.or_(
+            func.lower(User.name).like(pattern, escape="\\"),
+            func.lower(sa.cast(User.email, sa.Text)).like(pattern, escape="\\"),
+        ))
 
-    # total
-    total = (await db.execute(select(func.count()).select_from(select(User.id).where(*cond).subquery()))).scalar_one()
+    total, total_is_estimate = await counts.estimated_count(db, select(User.id).where(*cond))
 
-    # rows with wallet join
-    rows = await db.execute(
+    page = (
         select(
             User.id, User.name, User.email, User.phone, User.is_admin, User.status, User.created_at,
             func.coalesce(Wallet.posted_cents, 0),
@@ -123,42 +134,119 @@ async def admin_list_users(
         .select_from(User)
         .join(Wallet, Wallet.user_id == User.id, isouter=True)
         .where(*cond)
-        .order_by(User.created_at.desc())
-        .limit(limit).offset(offset)
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(limit)
     )
+    if cursor:
+        try:
+            after = keyset.decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+        except keyset.InvalidCursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+        page = page.where(keyset.after_desc((User.created_at, User.id), after))
+    elif offset:
+        page = page.offset(offset)
+
+    rows = (await db.execute(page)).all()
     items = [
         AdminUserRow(
             id=r[0], name=r[1], email=r[2], phone=r[3], is_admin=r[4], status=r[5], created_at=r[6].isoformat(),
             posted_cents=r[7] or 0, holds_cents=r[8] or 0, available_cents=r[9] or 0
         )
-        for r in rows.all()
+        for r in rows
     ]
+    next_cursor = keyset.encode_cursor(rows[-1][6].isoformat(), rows[-1][0]) if len(rows) == limit else None
 
-    return AdminUserListOut(items=items, total=total)
+    return AdminUserListOut(items=items, total=total, total_is_estimate=total_is_estimate, next_cursor=next_cursor)
+
+
+async def _load_user(user_id: uuid.UUID):
+    async with SessionLocal() as db:
+        urow = await db.execute(
+            select(
+                User.id, User.name, User.email, User.phone, User.is_admin, User.status, User.created_at,
+                func.coalesce(Wallet.posted_cents, 0), func.coalesce(Wallet.holds_cents, 0)
+            )
+            .join(Wallet, Wallet.user_id == User.id, isouter=True)
+            .where(User.id == user_id)
+
+            # If don't want to let the Admin look up deleted account, Uncomment this, and replace with above.
+            # .where(User.id == user_id, User.deleted_at.is_(None))
+        )
+        return urow.first()
+
+
+async def _load_ledger(user_id: uuid.UUID, *, limit: int, before_id: Optional[int], with_count: bool):
+    # newest first on ix_ledger_user_id_id; count(*) OVER () is taken before LIMIT
+    async with SessionLocal() as db:
+        q = (
+            select(
+                LedgerEntry.id, LedgerEntry.kind, LedgerEntry.amount_cents,
+                LedgerEntry.session_id, LedgerEntry.registration_id, LedgerEntry.created_at,
+                func.count().over() if with_count else sa.null(),
+            )
+            .where(LedgerEntry.user_id == user_id)
+            .order_by(LedgerEntry.id.desc())
+            .limit(limit)
+        )
+        if before_id is not None:
+            q = q.where(LedgerEntry.id < before_id)
+        rows = (await db.execute(q)).all()
+        return rows, await balances_after(db, [(r[0], user_id) for r in rows])
+
+
+async def _load_registrations(user_id: uuid.UUID, *, limit: int, after, with_count: bool):
+    async with SessionLocal() as db:
+        q = (
+            select(
+                Registration.id, Registration.session_id, SessionModel.title, SessionModel.starts_at,
+                SessionModel.timezone, Registration.seats, Registration.guest_names, Registration.state,
+                Registration.waitlist_pos, Registration.created_at, Registration.canceled_at,
+                func.count().over() if with_count else sa.null(),
+            )
+            .join(SessionModel, SessionModel.id == Registration.session_id)
+            .where(Registration.host_user_id == user_id)
+            .order_by(Registration.created_at.desc(), Registration.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            q = q.where(keyset.after_desc((Registration.created_at, Registration.id), after))
+        return (await db.execute(q)).all()
 
 
 @router.get("/{user_id}", response_model=AdminUserDetailOut)
 async def admin_get_user(
     user_id: uuid.UUID,
     ledger_limit: int = Query(100, ge=1, le=500),
-    db: AsyncSession = Depends(get_db),
+    ledger_cursor: Optional[str] = Query(None, description="ledger_next_cursor from the previous page"),
+    reg_limit: int = Query(100, ge=1, le=500),
+    reg_cursor: Optional[str] = Query(None, description="registrations_next_cursor from the previous page"),
+    summary: bool = Query(False, description="counts + latest summary_items of each section"),
+    summary_items: int = Query(5, ge=1, le=50),
     current: User = Depends(get_current_user),
 ):
+    """
+    User + wallet, one page of ledger (newest first, by id) and one page of registrations
+    (newest first, by (created_at, id)); each section has its own cursor. The three queries
+    run concurrently, each on its own pooled connection.
+    """
     _require_admin(current)
 
-    # user + wallet
-    urow = await db.execute(
-        select(
-            User.id, User.name, User.email, User.phone, User.is_admin, User.status, User.created_at,
-            func.coalesce(Wallet.posted_cents, 0), func.coalesce(Wallet.holds_cents, 0)
-        )
-        .join(Wallet, Wallet.user_id == User.id, isouter=True)
-        .where(User.id == user_id)
-        
-        # If don't want to let the Admin look up deleted account, Uncomment this, and replace with above.
-        # .where(User.id == user_id, User.deleted_at.is_(None))
+    before_id = after = None
+    try:
+        if ledger_cursor and not summary:
+            (before_id,) = keyset.decode_cursor(ledger_cursor, int)
+        if reg_cursor and not summary:
+            after = keyset.decode_cursor(reg_cursor, datetime.fromisoformat, uuid.UUID)
+    except keyset.InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    if summary:
+        ledger_limit = reg_limit = summary_items
+
+    u, (lrows, balances), rrows = await asyncio.gather(
+        _load_user(user_id),
+        _load_ledger(user_id, limit=ledger_limit, before_id=before_id, with_count=summary),
+        _load_registrations(user_id, limit=reg_limit, after=after, with_count=summary),
     )
-    u = urow.first()
     if not u:
         raise HTTPException(status_code=404, detail="user not found")
 
@@ -167,57 +255,45 @@ async def admin_get_user(
         holds_cents=u[8] or 0,
         available_cents=(u[7] or 0) - (u[8] or 0),
     )
-
-    # ledger (most recent first)
-    lrows = await db.execute(
-        select(LedgerEntry)
-        .where(LedgerEntry.user_id == user_id)
-        .order_by(LedgerEntry.id.desc())
-        .limit(ledger_limit)
-    )
     ledger = [
         AdminLedgerRow(
-            id=le.id,
-            kind=le.kind,
-            amount_cents=le.amount_cents,
-            session_id=le.session_id,
-            registration_id=le.registration_id,
-            created_at=le.created_at.isoformat(),
+            id=r[0], kind=r[1], amount_cents=r[2], session_id=r[3], registration_id=r[4],
+            created_at=r[5].isoformat(), balance_after_cents=balances.get(r[0]),
         )
-        for le in lrows.scalars().all()
+        for r in lrows
     ]
-
-    # registrations with session info
-    rrows = await db.execute(
-        select(Registration, SessionModel)
-        .join(SessionModel, SessionModel.id == Registration.session_id)
-        .where(Registration.host_user_id == user_id)
-        .order_by(Registration.created_at.desc())
-    )
-    regs: list[AdminRegistrationRow] = []
-    for reg, sess in rrows.all():
-        regs.append(
-            AdminRegistrationRow(
-                registration_id=reg.id,
-                session_id=sess.id,
-                session_title=getattr(sess, "title", None),
-                starts_at_utc=sess.starts_at.isoformat(),
-                timezone=sess.timezone,
-                seats=reg.seats,
-                guest_names=reg.guest_names or [],
-                state=reg.state,
-                waitlist_pos=reg.waitlist_pos,
-                created_at=reg.created_at.isoformat(),
-                canceled_at=reg.canceled_at.isoformat() if reg.canceled_at else None,
-            )
+    regs = [
+        AdminRegistrationRow(
+            registration_id=r[0],
+            session_id=r[1],
+            session_title=r[2],
+            starts_at_utc=r[3].isoformat(),
+            timezone=r[4],
+            seats=r[5],
+            guest_names=r[6] or [],
+            state=r[7],
+            waitlist_pos=r[8],
+            created_at=r[9].isoformat(),
+            canceled_at=r[10].isoformat() if r[10] else None,
         )
+        for r in rrows
+    ]
 
-    return AdminUserDetailOut(
+    out = AdminUserDetailOut(
         id=u[0], name=u[1], email=u[2], phone=u[3], is_admin=u[4], status=u[5], created_at=u[6].isoformat(),
         wallet=wallet,
         ledger=ledger,
         registrations=regs,
     )
+    if summary:
+        out.ledger_count = lrows[0][6] if lrows else 0
+        out.registrations_count = rrows[0][11] if rrows else 0
+    else:
+        if len(lrows) == ledger_limit:
+            out.ledger_next_cursor = keyset.encode_cursor(lrows[-1][0])
+        if len(rrows) == reg_limit:
+            out.registrations_next_cursor = keyset.encode_cursor(rrows[-1][9].isoformat(), rrows[-1][0])
+    return out
 
 @router.patch("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def admin_update_user(
@@ -276,6 +352,7 @@ async def admin_update_user(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email or phone already in use",
         )
+    await invalidate_principal(user_id)
 
     # 204 No Content; admin UI should refetch the detail view
     return
@@ -313,4 +390,5 @@ async def admin_soft_delete_user(
     target.deleted_at = datetime.now(timezone.utc)
 
     await db.commit()
+    await invalidate_principal(user_id)
     return
\ No newline at end of file
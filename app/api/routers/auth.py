@@ -15,6 +15,7 @@ from ...models import User
 from ...repos import users as users_repo
 from ...auth.jwt import create_jwt
 from ...auth.deps import _cookie_opts, get_current_user
+from ...auth.principal_cache import invalidate_principal
 from ...services.otp_sender import send_otp_via_email
 from fastapi import Request
 from ...services.rate_limit import limit_otp_request, limit_otp_verify
@@ -218,6 +219,7 @@ async def verify_otp_new(
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        await invalidate_principal(user.id)
         
         # Clean up Redis
         await redis.delete(signup_key)
@@ -265,6 +267,8 @@ async def verify_otp(payload: VerifyOtpIn, response: Response, db: AsyncSession
 
     user = await users_repo.upsert_by_email(db, email=payload.email, name=payload.name, phone=payload.phone)
     await db.commit()
+    # upsert may have changed name/phone on an existing user
+    await invalidate_principal(user.id)
 
     token = create_jwt(
         {"sub": str(user.id), "email": user.email, "is_admin": user.is_admin, "name": user.name},
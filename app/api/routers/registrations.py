@@ -9,14 +9,16 @@ from fastapi import APIRouter, Depends, HTTPException, Header, status, Query
 from pydantic import BaseModel, Field, conint, validator
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, asc
+from sqlalchemy import select
 
 from ...auth.deps import get_current_user
 from ...db import get_db
 from ...models import User, Session as SessionModel, Registration, User
 from ...redis_client import redis
 from ...services.cancellation import cancel_registration
-from fastapi import Request
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from ...services import participants
 from ...services.rate_limit import check_backlog_or_429, inc_backlog, limit_registration
 from ...services.guest_update import update_guest_list, Forbidden as GUForbidden, NotFound as GUNotFound, InvalidChange as GUInvalidChange, TooLate as GUTooLate
 from ...observability.metrics import REG_ENQUEUED
@@ -228,40 +230,32 @@ async def cancel(
     return CancelOut(refund_cents=refund_cents, penalty_cents=penalty_cents, state=state)
 
 # List registrations for a session (participants + waitlist)
-# Add a read endpoint so the UI can display the current participants & waitlist.
 # This endpoint is public; add Depends(get_current_user) if you want to require auth to view participants.
-# Restart the API after these changes.
 @router.get("/sessions/{session_id}/registrations", response_model=list[RegRowOut])
-async def list_regs_for_session(session_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    rows = await db.execute(
-        select(Registration, User.name)
-        .join(User, User.id == Registration.host_user_id)
-        .where(Registration.session_id == session_id)
-        .order_by(
-            # confirmed first by time, then waitlist order
-            asc(Registration.created_at)
-        )
-    )
-    result: list[RegRowOut] = []
-    for reg, host_name in rows.all():
-        result.append(
-            RegRowOut(
-                registration_id=reg.id,
-                host_user_id=reg.host_user_id,
-                host_name=host_name,
-                seats=reg.seats,
-                guest_names=reg.guest_names or [],
-                waitlist_pos=reg.waitlist_pos,
-                state=reg.state,
-                group_key=reg.group_key,
-                is_host=bool(reg.is_host),
-                canceled_at=reg.canceled_at,
-                canceled_from_state=reg.canceled_from_state,
-            )
-        )
-    # stable ordering for UI: confirmed first, then waitlist by pos
-    result.sort(key=lambda r: (0 if r.state=="confirmed" else 1, r.waitlist_pos or 0))
-    return result
+async def list_regs_for_session(
+    session_id: uuid.UUID,
+    since_version: Optional[int] = Query(default=None, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Served from the Redis participants projection (see services.participants) with no SQL;
+    a missing projection is rebuilt from Postgres once. Rows come confirmed first, then
+    waitlist by position, each with "v" = version it last changed at; the current version
+    is in X-Participants-Version. With ?since_version=N the response is
+    {"version": V, "rows": [rows with v > N]} for clients merging by registration_id.
+    """
+    snap = await participants.read_projection(session_id)
+    if snap is None:
+        snap = await participants.rebuild(db, session_id)
+        if snap is None:
+            return []
+    version, rows_json = snap
+    headers = {"X-Participants-Version": str(version)}
+    if since_version is None:
+        # already JSON in API order: hand it over as-is
+        return Response(content=rows_json, media_type="application/json", headers=headers)
+    changed = [r for r in json.loads(rows_json) if r["v"] > since_version]
+    return JSONResponse({"version": version, "rows": changed}, headers=headers)
 
 @router.patch("/registrations/{registration_id}/guests", response_model=GuestsUpdateOut)
 async def patch_guests(
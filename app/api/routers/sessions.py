@@ -1,21 +1,28 @@
 from __future__ import annotations
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timezone
 from zoneinfo import ZoneInfo
 from typing import Optional, Literal, Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from pydantic import BaseModel, Field, field_validator, StringConstraints
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, StringConstraints
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db import get_db
 from ...models import User, Session as SessionModel
 from ...auth.deps import get_current_user
 from ...repos import session_repo as sess_repo
+from ...repos import session_financials
+from ...repos.outbox import add_outbox_event
+from ...repos.keyset import InvalidCursor, decode_cursor, encode_cursor
 from ...services.promotion import enqueue_promotion_check
 from ...services.session_lifecycle import admin_update_session, InvalidTransition, CapacityBelowConfirmed, NotFound
 from ...domain.schemas.registration import AdminPreregItemIn, AdminPreregResultOut
 from ...services.admin_prereg_service import prereg_batch_on_create
+from ...services.session_schedules import sync_session_schedules
+from ...services.session_series import create_series, lock_series, materialize_series, SeriesNotFound
+from ...services import session_versions
+from ...services.ttl_cache import MISSING
 
 router = APIRouter(tags=["sessions"])
 
@@ -77,6 +84,32 @@ class SessionWithStatsOut(SessionOut):
     waitlist_seats: int
 
 
+class SessionFinancialsOut(BaseModel):
+    captured_cents: int = 0           # fees captured
+    refunded_cents: int = 0
+    penalties_cents: int = 0
+    holds_outstanding_cents: int = 0  # held, not yet captured or released
+    net_cents: int = 0                # captured + penalties - refunded
+
+    @classmethod
+    def from_rollup(cls, f: session_financials.Financials) -> "SessionFinancialsOut":
+        return cls(
+            captured_cents=f.captured_cents,
+            refunded_cents=f.refunded_cents,
+            penalties_cents=f.penalties_cents,
+            holds_outstanding_cents=f.holds_outstanding_cents,
+            net_cents=f.net_cents,
+        )
+
+
+class SessionHistoryOut(SessionWithStatsOut):
+    financials: SessionFinancialsOut
+
+
+class SessionFinancialsTotalsOut(SessionFinancialsOut):
+    sessions: int
+
+
 class SessionPatchIn(BaseModel):
     capacity: Annotated[int, Field(ge=0)] | None = None
     status: str | None = Field(default=None, description="'scheduled' | 'closed' | 'canceled'")
@@ -93,49 +126,232 @@ class SessionCreateWithPreregOut(BaseModel):
     session: SessionOut
     prereg_result: list[AdminPreregResultOut] = []
 
+class SessionSeriesIn(BaseModel):
+    title: str | None = None
+    timezone: str
+    weekdays: Annotated[list[Annotated[int, Field(ge=0, le=6)]], Field(min_length=1)]  # 0=Mon .. 6=Sun
+    local_time: time                                  # wall-clock start in `timezone`
+    starts_on: date
+    exceptions: list[date] = Field(default_factory=list, description="local dates to skip")
+    capacity: Annotated[int, Field(ge=1)]
+    fee_cents: Annotated[int, Field(ge=0)]
+    preregistrations: list[AdminPreregItemIn] = Field(default_factory=list)
+    count: Annotated[int, Field(ge=0, le=52)] = 10  # sessions to materialize now
+
+    @field_validator("timezone")
+    def valid_tz(cls, v: str):
+        try:
+            ZoneInfo(v)
+        except Exception:
+            raise ValueError("invalid IANA timezone")
+        return v
+
+    @field_validator("local_time")
+    def naive_time(cls, v: time):
+        if v.tzinfo is not None:
+            raise ValueError("local_time is wall-clock time in `timezone`; drop the offset")
+        return v
+
+
+class SessionSeriesMaterializeIn(BaseModel):
+    count: Annotated[int, Field(ge=1, le=52)]
+
+
+class SessionSeriesOut(BaseModel):
+    id: uuid.UUID
+    title: str | None
+    timezone: str
+    weekdays: list[int]
+    local_time: time
+    starts_on: date
+    exceptions: list[date]
+    capacity: int
+    fee_cents: int
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, s) -> "SessionSeriesOut":
+        return cls(
+            id=s.id,
+            title=s.title,
+            timezone=s.timezone,
+            weekdays=s.weekdays,
+            local_time=s.local_time,
+            starts_on=s.starts_on,
+            exceptions=s.exceptions,
+            capacity=s.capacity,
+            fee_cents=s.fee_cents,
+            created_at=s.created_at,
+        )
+
+
+class SessionSeriesMaterializedOut(BaseModel):
+    series: SessionSeriesOut
+    sessions: list[SessionCreateWithPreregOut] = []
+
+
 # ---------- Helpers ----------
 def _require_admin(u: User) -> None:
     if not u.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
 
 
+def _as_utc(v: Optional[datetime]) -> Optional[datetime]:
+    # query-string datetimes without an offset are taken as UTC
+    if v is not None and v.tzinfo is None:
+        return v.replace(tzinfo=timezone.utc)
+    return v
+
+
 def _to_stats(s: SessionModel, confirmed: int, waitlist: int) -> SessionWithStatsOut:
     remaining = max(0, s.capacity - confirmed)
     base = SessionOut.from_model(s).dict()
     return SessionWithStatsOut(**base, confirmed_seats=confirmed, remaining_seats=remaining, waitlist_seats=waitlist)
 
 
+_SESSION_LIST = TypeAdapter(list[SessionWithStatsOut])
+
+
+def _cached_json(body: bytes, etag: str) -> Response:
+    # no-cache: browsers keep the body but revalidate every time (cheap 304s)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
 # ---------- Public ----------
 @router.get("/sessions", response_model=list[SessionWithStatsOut])
 async def list_sessions(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     limit: Annotated[int, Field(ge=0, le=200)] = Query(default=50),
 ):
+    """
+    ETag is the list version (bumped by the outbox dispatcher on any session event):
+    a matching If-None-Match gets a 304 and an unchanged list is served from the
+    per-process body cache, both without touching Postgres.
+    """
+    version = await session_versions.list_version()
+    etag = f'"l{version}.{limit}"'
+    if version is not None:
+        if session_versions.etag_matches(request.headers.get("if-none-match"), etag):
+            return _not_modified(etag)
+        body = session_versions.cached_body(("list", limit, version))
+        if body is not MISSING:
+            return _cached_json(body, etag)
+
     now_utc = datetime.now(timezone.utc)
     rows = await sess_repo.list_upcoming(db, now_utc=now_utc, limit=limit)
-    return [_to_stats(s, confirmed, waitlist) for (s, confirmed, waitlist) in rows]
+    out = [_to_stats(s, confirmed, waitlist) for (s, confirmed, waitlist) in rows]
+    if version is None:
+        return out
+    # version was read first, so the body is at least as new as the version it's filed under
+    body = _SESSION_LIST.dump_json(out)
+    session_versions.cache_body(("list", limit, version), body)
+    return _cached_json(body, etag)
 
 
 @router.get("/sessions/{session_id}", response_model=SessionWithStatsOut)
-async def get_session(session_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+async def get_session(session_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    version = await session_versions.session_version(session_id)
+    etag = f'"s{version}"'
+    if version is not None:
+        if session_versions.etag_matches(request.headers.get("if-none-match"), etag):
+            return _not_modified(etag)
+        body = session_versions.cached_body(("session", session_id, version))
+        if body is not MISSING:
+            return _cached_json(body, etag)
+
     row = await sess_repo.get_with_counts(db, session_id=session_id)
     if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="session not found")
     s, confirmed, waitlist = row
-    return _to_stats(s, confirmed, waitlist)
+    out = _to_stats(s, confirmed, waitlist)
+    if version is None:
+        return out
+    body = out.model_dump_json().encode()
+    session_versions.cache_body(("session", session_id, version), body)
+    return _cached_json(body, etag)
 
 
 # ---------- Admin ----------
-@router.get("/admin/sessions/history", response_model=list[SessionWithStatsOut])
+@router.get("/admin/sessions/history", response_model=list[SessionHistoryOut])
 async def list_admin_session_history(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
-    limit: Annotated[int, Field(ge=0, le=200)] = Query(default=50),
+    limit: Annotated[int, Field(ge=1, le=200)] = Query(default=50),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    status_: list[Literal["scheduled", "closed", "canceled"]] = Query(default=["closed"], alias="status"),
+    starts_from: Optional[datetime] = Query(default=None, description="starts_at >= (inclusive)"),
+    starts_before: Optional[datetime] = Query(default=None, description="starts_at < (exclusive)"),
+    q: Optional[Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=100)]] = Query(
+        default=None, description="title substring"
+    ),
 ):
+    """
+    Newest first, keyset-paged on (starts_at, id). When more rows may follow, the
+    X-Next-Cursor response header carries the cursor for the next page. Each row
+    carries the session's financials rollup.
+    """
     _require_admin(current)
-    now_utc = datetime.now(timezone.utc)
-    rows = await sess_repo.list_closed(db, now_utc=now_utc, limit=limit)
-    return [_to_stats(s, confirmed, waitlist) for (s, confirmed, waitlist) in rows]
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+        except InvalidCursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    rows = await sess_repo.list_history(
+        db,
+        statuses=status_,
+        starts_from=_as_utc(starts_from),
+        starts_before=_as_utc(starts_before),
+        title_q=q,
+        after=after,
+        limit=limit,
+    )
+    if len(rows) == limit:
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.starts_at.isoformat(), last.id)
+    money = await session_financials.get_many(db, [s.id for (s, _, _) in rows])
+    return [
+        SessionHistoryOut(
+            **_to_stats(s, confirmed, waitlist).model_dump(),
+            financials=SessionFinancialsOut.from_rollup(money[s.id]),
+        )
+        for (s, confirmed, waitlist) in rows
+    ]
+
+
+@router.get("/admin/sessions/financials", response_model=SessionFinancialsTotalsOut)
+async def admin_sessions_financials(
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+    status_: list[Literal["scheduled", "closed", "canceled"]] = Query(default=["closed"], alias="status"),
+    starts_from: Optional[datetime] = Query(default=None, description="starts_at >= (inclusive)"),
+    starts_before: Optional[datetime] = Query(default=None, description="starts_at < (exclusive)"),
+):
+    """Summed financials over every session in the range (revenue dashboards)."""
+    _require_admin(current)
+    count, total = await session_financials.totals(
+        db, statuses=status_, starts_from=_as_utc(starts_from), starts_before=_as_utc(starts_before)
+    )
+    return SessionFinancialsTotalsOut(sessions=count, **SessionFinancialsOut.from_rollup(total).model_dump())
+
+
+@router.get("/admin/sessions/{session_id}/financials", response_model=SessionFinancialsOut)
+async def admin_session_financials(
+    session_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    _require_admin(current)
+    if await db.get(SessionModel, session_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="session not found")
+    money = await session_financials.get_many(db, [session_id])
+    return SessionFinancialsOut.from_rollup(money[session_id])
 
 
 @router.post("/admin/sessions", response_model=SessionCreateWithPreregOut)
@@ -159,8 +375,14 @@ async def create_session(
     # 2) optional preregistrations
     items = payload.preregistrations or []
     results: list[AdminPreregResultOut] = await prereg_batch_on_create(db, session=s, items=items)
+    await add_outbox_event(
+        db,
+        channel=f"session:{s.id}",
+        payload={"type": "session_created", "session_id": str(s.id)},
+    )
 
     await db.commit()
+    await sync_session_schedules(s)
     return SessionCreateWithPreregOut(
         session=SessionOut.from_model(s),
         prereg_result=results,
@@ -193,6 +415,8 @@ async def patch_session(
     except InvalidTransition as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
+    if payload.status is not None:
+        await sync_session_schedules(s)
     return SessionOut.from_model(s)
 
 
@@ -223,3 +447,57 @@ async def patch_session(
 #     await db.commit()
 #     await enqueue_promotion_check(s.id)
 #     return SessionOut.from_model(s)
+
+
+# ---------- Admin: recurring series ----------
+async def _materialized_out(db: AsyncSession, series, count: int) -> SessionSeriesMaterializedOut:
+    created = await materialize_series(db, series, count=count)
+    await db.commit()
+    for sess, _ in created:
+        await sync_session_schedules(sess)
+    return SessionSeriesMaterializedOut(
+        series=SessionSeriesOut.from_model(series),
+        sessions=[
+            SessionCreateWithPreregOut(session=SessionOut.from_model(sess), prereg_result=results)
+            for sess, results in created
+        ],
+    )
+
+
+@router.post("/admin/session-series", response_model=SessionSeriesMaterializedOut)
+async def create_session_series(
+    payload: SessionSeriesIn,
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    """Create a weekly series and materialize its first `count` sessions in one transaction."""
+    _require_admin(current)
+    series = await create_series(
+        db,
+        title=payload.title,
+        timezone_name=payload.timezone,
+        weekdays=payload.weekdays,
+        local_time=payload.local_time,
+        starts_on=payload.starts_on,
+        exceptions=payload.exceptions,
+        capacity=payload.capacity,
+        fee_cents=payload.fee_cents,
+        preregistrations=payload.preregistrations,
+    )
+    return await _materialized_out(db, series, payload.count)
+
+
+@router.post("/admin/session-series/{series_id}/materialize", response_model=SessionSeriesMaterializedOut)
+async def materialize_session_series(
+    series_id: uuid.UUID,
+    payload: SessionSeriesMaterializeIn,
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    """Append the next `count` sessions after the series' latest one (standing preregs applied)."""
+    _require_admin(current)
+    try:
+        series = await lock_series(db, series_id)
+    except SeriesNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="series not found")
+    return await _materialized_out(db, series, payload.count)
@@ -11,6 +11,7 @@ from ...models import User, LedgerEntry, Session as SessionModel
 from ...auth.deps import get_current_user
 from ...repos.wallets import get_wallet_summary
 from ...repos import ledger_repo as ledger_repo
+from ...repos.ledger_checkpoints import balances_after
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
 
@@ -30,9 +31,12 @@ class LedgerOut(BaseModel):
     created_at: str
     session_title: Optional[str] = None
     starts_at_utc: Optional[str] = None
+    balance_after_cents: Optional[int] = None  # posted balance right after this entry
 
     @classmethod
-    def from_row(cls, e: LedgerEntry, sess_title: Optional[str], sess_starts) -> "LedgerOut":
+    def from_row(
+        cls, e: LedgerEntry, sess_title: Optional[str], sess_starts, balance_after: Optional[int] = None
+    ) -> "LedgerOut":
         return cls(
             id=e.id,
             kind=e.kind,
@@ -42,6 +46,7 @@ class LedgerOut(BaseModel):
             created_at=e.created_at.isoformat(),
             session_title=sess_title,
             starts_at_utc=sess_starts.isoformat() if sess_starts else None,
+            balance_after_cents=balance_after,
         )
 
 
@@ -68,5 +73,6 @@ async def my_ledger(
     if before_id:
         q = q.where(LedgerEntry.id < before_id)
 
-    rows = await db.execute(q)
-    return [LedgerOut.from_row(e, title, starts) for (e, title, starts) in rows.all()]
+    rows = (await db.execute(q)).all()
+    balances = await balances_after(db, [(e.id, e.user_id) for (e, _, _) in rows])
+    return [LedgerOut.from_row(e, title, starts, balances.get(e.id)) for (e, title, starts) in rows]
@@ -8,6 +8,8 @@ from ..config import get_settings
 from ..db import get_db
 from ..models import User
 from .jwt import verify_jwt
+from .principal_cache import get_cached_principal, cache_principal
+from ..middleware.request_context import JWT_CLAIMS
 
 S = get_settings()
 
@@ -40,17 +42,29 @@ async def get_current_user(request: Request, db: AsyncSession = Depends(get_db))
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    try:
-        claims = verify_jwt(token)
-    except Exception:
+    # RequestContextMiddleware already decoded this cookie (None = invalid)
+    state = request.scope.get("state") or {}
+    if JWT_CLAIMS in state:
+        claims = state[JWT_CLAIMS]
+    else:
+        try:
+            claims = verify_jwt(token)
+        except Exception:
+            claims = None
+    if claims is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session")
 
     user_id = claims.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session")
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # cached principal first (LRU, then Redis); the DB is only hit on a miss
+    user = await get_cached_principal(user_id)
+    if user is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user is not None:
+            await cache_principal(user)
     if not user or user.status != "active":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found")
     
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..config import get_settings
+from ..models import User
+from ..redis_client import redis
+from ..services.ttl_cache import LRUTTLCache, MISSING
+
+S = get_settings()
+log = logging.getLogger("app.principal_cache")
+
+# A write leaves a tombstone so a request that read the old row before the write
+# committed cannot put it back into Redis (fills use SET NX).
+TOMBSTONE = "-"
+TOMBSTONE_TTL_SEC = 5
+
+_FIELDS = ("id", "name", "email", "phone", "is_admin", "status", "avatar_url", "created_at", "deleted_at")
+_DATETIMES = ("created_at", "deleted_at")
+
+_local: LRUTTLCache[Dict[str, Any]] = LRUTTLCache(S.PRINCIPAL_CACHE_SIZE, S.PRINCIPAL_CACHE_TTL_SEC)
+
+
+def k_principal(user_id: uuid.UUID | str) -> str:
+    return f"principal:{user_id}"
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {f: getattr(user, f) for f in _FIELDS}
+
+
+def _to_user(snap: Dict[str, Any]) -> User:
+    # transient (never added to a db session): callers only read attributes
+    return User(**snap)
+
+
+def _dumps(snap: Dict[str, Any]) -> str:
+    out = dict(snap)
+    out["id"] = str(out["id"])
+    for f in _DATETIMES:
+        out[f] = out[f].isoformat() if out[f] else None
+    return json.dumps(out, separators=(",", ":"))
+
+
+def _loads(raw: str) -> Dict[str, Any]:
+    snap = json.loads(raw)
+    snap["id"] = uuid.UUID(snap["id"])
+    for f in _DATETIMES:
+        snap[f] = datetime.fromisoformat(snap[f]) if snap[f] else None
+    return snap
+
+
+async def get_cached_principal(user_id: str) -> Optional[User]:
+    """Local LRU first, then Redis (refilling the LRU). None on a miss or if Redis is unavailable."""
+    snap = _local.get(user_id)
+    if snap is not MISSING:
+        return _to_user(snap)
+    try:
+        raw = await redis.get(k_principal(user_id))
+    except Exception as e:
+        log.debug("principal cache read failed: %s", e)
+        return None
+    if not raw or raw == TOMBSTONE:
+        return None
+    snap = _loads(raw)
+    _local.set(user_id, snap)
+    return _to_user(snap)
+
+
+async def cache_principal(user: User) -> None:
+    snap = _snapshot(user)
+    key = str(user.id)
+    try:
+        # NX: never overwrite a tombstone left by a concurrent write
+        stored = await redis.set(k_principal(key), _dumps(snap), ex=S.PRINCIPAL_REDIS_TTL_SEC, nx=True)
+    except Exception as e:
+        log.debug("principal cache write failed: %s", e)
+        return
+    if stored:
+        _local.set(key, snap)
+
+
+async def invalidate_principal(user_id: uuid.UUID | str) -> None:
+    """Call after committing a change to a user row. Other processes drop their LRU copy within PRINCIPAL_CACHE_TTL_SEC."""
+    key = str(user_id)
+    _local.pop(key)
+    await redis.set(k_principal(key), TOMBSTONE, ex=TOMBSTONE_TTL_SEC)
@@ -26,6 +26,9 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "dev-secret-change-me"  # set a strong random value in prod
     JWT_EXPIRE_MINUTES: int = 60 * 60 * 24 * 7      # 7 days
     SESSION_COOKIE_NAME: str = "session"
+    PRINCIPAL_CACHE_SIZE: int = 10_000      # in-process LRU of authenticated users
+    PRINCIPAL_CACHE_TTL_SEC: float = 5.0    # bounds how long another process may still see a disabled user
+    PRINCIPAL_REDIS_TTL_SEC: int = 120      # shared copy in Redis (dropped explicitly on user writes)
 
     # Gmail OAuth & Pub/Sub (loaded from .env)
     GOOGLE_CLIENT_ID: str | None = None
@@ -48,18 +51,66 @@ class Settings(BaseSettings):
     SLOW_QUERY_MS: int = 300          # warn if a DB query exceeds this
     METRICS_ENABLED: bool = True
     REQUEST_ID_HEADER: str = "X-Request-ID"
+    WORKER_METRICS_PORT: int | None = None  # workers serve Prometheus metrics here when set
     
     FRONTEND_ORIGIN: str = "http://localhost:5173"  # vite dev server
     FRONTEND_DEPLOYED_domain_1: str = "birdie-buddies-a32af.web.app"
     FRONTEND_DEPLOYED_domain_2: str = "birdie-buddies-a32af.firebaseapp.com"
-    AUTO_CLOSE_INTERVAL_SEC: int = 30      # how often the worker scans
-    AUTO_CLOSE_BATCH: int = 200            # max sessions to close per scan
+    AUTO_CLOSE_INTERVAL_SEC: int = 600     # backstop table scan; on-time closes come from the delay queue
+    AUTO_CLOSE_BATCH: int = 200            # max sessions to close per scan / queue pass
     AUTO_CLOSE_LOCK_TTL_SEC: int = 25      # Redis lock TTL (must be < interval)
+    AUTO_CLOSE_POLL_SEC: float = 5.0       # max sleep before re-reading the head of the delay queue
+
+    # Outbox dispatcher
+    OUTBOX_BATCH: int = 500                # rows locked + published per round trip
+    OUTBOX_RETRY_BASE_SEC: float = 1.0     # first retry delay; doubles per failed attempt
+    OUTBOX_RETRY_MAX_SEC: int = 300        # cap for the retry delay
+    OUTBOX_PARTITIONS: int = 1             # channel hash buckets; one active dispatcher per bucket
+    OUTBOX_RETENTION_DAYS: int = 7         # daily table partitions older than this are dropped
+    OUTBOX_PREMAKE_DAYS: int = 3           # daily partitions created ahead of time
+    OUTBOX_ARCHIVE_DIR: str | None = None  # if set, dropped partitions are written here as .ndjson.gz
+    OUTBOX_MAINTENANCE_INTERVAL_SEC: int = 3600
+
+    # Public session reads (ETag / 304 + versioned response cache)
+    SESSION_CACHE_SIZE: int = 2048         # rendered bodies kept per process, keyed by version
+    SESSION_CACHE_TTL_SEC: float = 30.0    # bounds memory only; a version change is a new key
+    PARTICIPANTS_STREAM_MAXLEN: int = 100_000  # approximate cap on sessions:events (projector input)
+    PARTICIPANTS_TTL_SEC: int = 14 * 24 * 3600  # idle participant projections expire; rebuilt on demand
+
+    # Ledger running-balance checkpoints (workers/ledger_checkpointer.py)
+    LEDGER_CHECKPOINT_EVERY: int = 100          # entries per user between checkpoints (bounds each balance SUM)
+    LEDGER_CHECKPOINT_INTERVAL_SEC: int = 60
+    LEDGER_CHECKPOINT_BATCH: int = 5000         # ledger ids scanned per pass
+
+    # Wallet reconciliation (workers/wallet_reconciler.py)
+    RECONCILE_INTERVAL_SEC: int = 30
+    RECONCILE_BATCH: int = 5000            # ledger ids folded into wallet_shadows per pass
+    RECONCILE_SWEEP: int = 200             # wallets re-checked per pass even without new ledger rows
+    WALLET_TOTALS_VERIFY_SEC: int = 3600   # full SUM(wallets) check of the maintained admin totals
 
     # Twilio SMS
     TWILIO_ACCOUNT_SID: str | None = None
     TWILIO_AUTH_TOKEN: str | None = None
     TWILIO_FROM_NUMBER: str | None = None
+    TWILIO_API_BASE_URL: str | None = None  # override (e.g. http://127.0.0.1:8099) to hit a local fake
+
+    # SMS notifier (durable stream + consumer group)
+    SMS_STREAM_MAXLEN: int = 100_000       # approximate cap on sms:events
+    SMS_MAX_ATTEMPTS: int = 6              # then the message goes to sms:events:dead
+    SMS_RETRY_BASE_SEC: float = 5.0        # first retry delay; doubles per failed attempt
+    SMS_RETRY_MAX_SEC: int = 600
+    SMS_CLAIM_IDLE_SEC: int = 900          # reclaim messages left pending by a dead replica (> SMS_RETRY_MAX_SEC)
+    SMS_DEDUPE_TTL_SEC: int = 7 * 24 * 3600
+    SMS_CACHE_SIZE: int = 10_000           # LRU entries for session titles / host phones
+    SMS_CACHE_TTL_SEC: int = 300
+    SMS_SEND_CONCURRENCY: int = 8          # sends in flight (Twilio thread pool size)
+    SMS_RATE_PER_SEC: float = 1.0          # account throughput (long code: 1/s, toll-free: 3/s, short code: 100/s)
+    SMS_RATE_BURST: int = 5
+    SMS_PER_PHONE_INTERVAL_SEC: float = 1.0  # min spacing between texts to the same number
+    SMS_SEND_QUEUE_MAX: int = 1000
+    SMS_REMINDER_HOURS: float = 3.0        # pre-session reminder lead time (0 = no reminders)
+    SMS_REMINDER_RETRY_SEC: int = 60       # re-run a session's reminder after a failed send
+    SMS_COALESCE_WINDOW_SEC: float = 5.0   # merge a host's events for one session into one text (0 = per batch only)
     
     @field_validator("SYNC_DATABASE_URL", mode="before")
     @classmethod
@@ -1,61 +1,98 @@
 from __future__ import annotations
 import logging
 import time
+import uuid
 from datetime import datetime, timezone
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from ..observability.logging import get_request_id, bind_record
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+
+from ..observability.logging import bind_record
 from ..config import get_settings
 from ..auth.jwt import verify_jwt
 
 S = get_settings()
 log = logging.getLogger("app.request")
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        rid = get_request_id(request)
+# scope["state"] key holding the decoded session cookie: a claims dict, or None when the
+# cookie is missing/invalid. get_current_user reuses it instead of decoding again.
+JWT_CLAIMS = "jwt_claims"
+
+_RID_HEADER = S.REQUEST_ID_HEADER.lower().encode("latin-1")
+_RID_HEADER_NAME = S.REQUEST_ID_HEADER
+
+
+def _header(scope, name: bytes) -> str | None:
+    for k, v in scope["headers"]:
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI: request id, one JWT decode per request (shared via scope["state"]),
+    and one access-log record. The record goes through a queue handler (see
+    setup_logging), so formatting and stdout writes happen off the event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         start = time.perf_counter()
-        timestamp = datetime.now(timezone.utc).isoformat()
-
-        # Extract user info from JWT if available
-        user_id = None
-        user_email = None
-        user_name = None
-        token = request.cookies.get(S.SESSION_COOKIE_NAME)
-        if token:
-            try:
-                claims = verify_jwt(token)
-                user_id = claims.get("sub")
-                user_email = claims.get("email")
-                user_name = claims.get("name")
-            except Exception:
-                # Invalid/expired token - user info will remain None
-                pass
-
-        # Build user info string for logging
-        user_info = f"user_id={user_id or 'anonymous'}"
-        if user_name:
-            user_info += f" name={user_name}"
-        if user_email:
-            user_info += f" email={user_email}"
-
-        # response
+        started_at = time.time()
+        rid = _header(scope, _RID_HEADER) or uuid.uuid4().hex
+
+        claims = None
+        cookie = _header(scope, b"cookie")
+        if cookie:
+            token = cookie_parser(cookie).get(S.SESSION_COOKIE_NAME)
+            if token:
+                try:
+                    claims = verify_jwt(token)
+                except Exception:
+                    # Invalid/expired token - user info will remain None
+                    pass
+        scope.setdefault("state", {})[JWT_CLAIMS] = claims
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)[_RID_HEADER_NAME] = rid
+            await send(message)
+
         try:
-            response = await call_next(request)
-        except Exception as e:
-            dur_ms = int((time.perf_counter() - start) * 1000)
-            rec = bind_record(logging.LogRecord(
-                name=log.name, level=logging.ERROR, pathname=__file__, lineno=0,
-                msg="unhandled_error", args=(), exc_info=None
-            ), request_id=rid, extra=f"timestamp={timestamp} path={request.url.path} method={request.method} ms={dur_ms} {user_info}")
-            log.handle(rec)
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            self._log(logging.ERROR, "unhandled_error", scope, rid, claims, start, started_at, None)
             raise
+        self._log(logging.INFO, "request", scope, rid, claims, start, started_at, status_code)
 
+    @staticmethod
+    def _log(level, msg, scope, rid, claims, start, started_at, status_code) -> None:
+        if not log.isEnabledFor(level):
+            return
         dur_ms = int((time.perf_counter() - start) * 1000)
-        response.headers[S.REQUEST_ID_HEADER] = rid
-        rec = bind_record(logging.LogRecord(
-            name=log.name, level=logging.INFO, pathname=__file__, lineno=0,
-            msg="request", args=(), exc_info=None
-        ), request_id=rid, extra=f"timestamp={timestamp} path={request.url.path} method={request.method} status={response.status_code} ms={dur_ms} {user_info}")
+        user_info = f"user_id={(claims or {}).get('sub') or 'anonymous'}"
+        if claims:
+            if claims.get("name"):
+                user_info += f" name={claims['name']}"
+            if claims.get("email"):
+                user_info += f" email={claims['email']}"
+        status = f" status={status_code}" if status_code is not None else ""
+        rec = bind_record(
+            log.makeRecord(log.name, level, __file__, 0, msg, (), None),
+            request_id=rid,
+            extra=(
+                f"timestamp={datetime.fromtimestamp(started_at, timezone.utc).isoformat()} path={scope['path']} "
+                f"method={scope['method']}{status} ms={dur_ms} {user_info}"
+            ),
+        )
         log.handle(rec)
-        return response
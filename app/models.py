@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime, time
 from typing import List, Optional
 
 import sqlalchemy as sa
@@ -58,6 +58,47 @@ class User(Base):
         CheckConstraint("status in ('active','disabled')", name="users_status"),
         # MARK: optional index for faster admin filtering; harmless if you skip
         Index("ix_users_deleted_at", "deleted_at"),
+        # admin search: substring LIKE on lower(name) / lower(email) via pg_trgm
+        Index("ix_users_name_trgm", sa.text("lower(name) gin_trgm_ops"), postgresql_using="gin"),
+        Index("ix_users_email_trgm", sa.text("lower(email::text) gin_trgm_ops"), postgresql_using="gin"),
+        # admin list: newest-first keyset pages over live users
+        Index("ix_users_live_created_at_id", "created_at", "id", postgresql_where=sa.text("deleted_at IS NULL")),
+    )
+
+
+# ---------- SESSION SERIES (weekly templates) ----------
+class SessionSeries(Base):
+    __tablename__ = "session_series"
+
+    id: Mapped[uuid.UUID] = mapped_column(pg.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    title: Mapped[Optional[str]] = mapped_column(sa.Text, nullable=True)
+    timezone: Mapped[str] = mapped_column(sa.Text, nullable=False)  # IANA name; rule is in local time
+
+    weekdays: Mapped[List[int]] = mapped_column(pg.ARRAY(sa.SmallInteger), nullable=False)  # 0=Mon .. 6=Sun
+    local_time: Mapped[time] = mapped_column(sa.Time, nullable=False)
+    starts_on: Mapped[date] = mapped_column(sa.Date, nullable=False)
+    exceptions: Mapped[List[date]] = mapped_column(
+        pg.ARRAY(sa.Date), nullable=False, default=list, server_default=sa.text("'{}'")
+    )  # local dates skipped by the rule
+
+    capacity: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    fee_cents: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    # standing prereg list: [{"user_id", "seats", "guest_names"}], applied to every materialized session
+    preregistrations: Mapped[list] = mapped_column(
+        pg.JSONB, nullable=False, default=list, server_default=sa.text("'[]'::jsonb")
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
+    __table_args__ = (
+        CheckConstraint("capacity > 0", name="session_series_capacity_pos"),
+        CheckConstraint("fee_cents >= 0", name="session_series_fee_nonneg"),
+        CheckConstraint(
+            "cardinality(weekdays) > 0 AND weekdays <@ ARRAY[0,1,2,3,4,5,6]::smallint[]",
+            name="session_series_weekdays",
+        ),
     )
 
 
@@ -81,6 +122,10 @@ class Session(Base):
         server_default=sa.text("'scheduled'"),
     )  # 'scheduled' | 'closed' | 'canceled'
 
+    series_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        pg.UUID(as_uuid=True), ForeignKey("session_series.id", ondelete="SET NULL"), nullable=True
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
     )
@@ -90,6 +135,16 @@ class Session(Base):
         CheckConstraint("fee_cents >= 0", name="sessions_fee_nonneg"),
         CheckConstraint("status in ('scheduled','closed','canceled')", name="sessions_status"),
         Index("ix_sessions_starts_at", "starts_at"),
+        # admin history: filter by status, keyset-page on (starts_at, id)
+        Index("ix_sessions_status_starts_at_id", "status", "starts_at", "id"),
+        # one session per series occurrence; re-materializing the same dates is a no-op
+        Index(
+            "ux_sessions_series_starts_at",
+            "series_id",
+            "starts_at",
+            unique=True,
+            postgresql_where=sa.text("series_id IS NOT NULL"),
+        ),
     )
 
 
@@ -142,6 +197,7 @@ class Registration(Base):
             postgresql_where=sa.text("state <> 'canceled'"),
         ),
         Index("ix_reg_session_state_pos", "session_id", "state", "waitlist_pos"),
+        Index("ix_reg_host_created_at_id", "host_user_id", "created_at", "id"),
     )
 
 
@@ -181,7 +237,7 @@ class LedgerEntry(Base):
             name="ledger_kind",
         ),
         CheckConstraint("status in ('posted','void')", name="ledger_status"),
-        Index("ix_ledger_user", "user_id"),
+        Index("ix_ledger_user_id_id", "user_id", "id"),  # per-user history, newest first
         Index("ix_ledger_session", "session_id"),
         Index("ix_ledger_registration", "registration_id"),
     )
@@ -200,7 +256,119 @@ class Wallet(Base):
         pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
     )
 
+# Running totals right after one of the user's ledger entries, appended every
+# LEDGER_CHECKPOINT_EVERY entries by workers/ledger_checkpointer.py. The PK
+# (user_id, ledger_id) is also the "nearest checkpoint at or before id" index.
+class LedgerBalanceCheckpoint(Base):
+    __tablename__ = "ledger_balance_checkpoints"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    ledger_id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
+# Highest visible ledger id paired with the snapshot xmax at the time it was read;
+# see repos/ledger_checkpoints.py settled_upto().
+class LedgerSettleMark(Base):
+    __tablename__ = "ledger_settle_marks"
+
+    xid: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    max_ledger_id: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
+# High-water marks of incremental ledger consumers (e.g. "wallet_reconcile").
+class LedgerCursor(Base):
+    __tablename__ = "ledger_cursors"
+
+    name: Mapped[str] = mapped_column(sa.Text, primary_key=True)
+    last_id: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    updated_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
+
+# Wallet totals re-derived from ledger_entries up to the "wallet_reconcile" cursor
+# (services/wallet_reconciliation.py), and the drift last measured against wallets.
+class WalletShadow(Base):
+    __tablename__ = "wallet_shadows"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        pg.UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    drift_posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    drift_holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    mismatch_since: Mapped[Optional[datetime]] = mapped_column(pg.TIMESTAMP(timezone=True), nullable=True)
+    checked_at: Mapped[Optional[datetime]] = mapped_column(pg.TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_wallet_shadows_mismatch",
+            "mismatch_since",
+            postgresql_where=sa.text("mismatch_since IS NOT NULL"),
+        ),
+    )
+
+# Global wallet sums for GET /admin/wallets/summary (repos/wallet_totals.py): one row,
+# plus the deltas every wallet write appends and the reconciler folds into it.
+class WalletTotals(Base):
+    __tablename__ = "wallet_totals"
+
+    id: Mapped[int] = mapped_column(sa.SmallInteger, primary_key=True, server_default=sa.text("1"))
+    posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    updated_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+    verified_at: Mapped[Optional[datetime]] = mapped_column(pg.TIMESTAMP(timezone=True), nullable=True)
+    drift_posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    drift_holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+
+    __table_args__ = (
+        CheckConstraint("id = 1", name="wallet_totals_single_row"),
+    )
+
+
+class WalletTotalDelta(Base):
+    __tablename__ = "wallet_total_deltas"
+
+    id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True, autoincrement=True)
+    posted_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    holds_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
+# Per-session money rollup (repos/session_financials.py), from the club's side:
+# captured fees and penalties are positive; net = captured + penalties - refunded.
+class SessionFinancials(Base):
+    __tablename__ = "session_financials"
+
+    session_id: Mapped[uuid.UUID] = mapped_column(
+        pg.UUID(as_uuid=True), ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True
+    )
+    captured_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    refunded_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    penalties_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    holds_outstanding_cents: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    net_cents: Mapped[int] = mapped_column(
+        sa.BigInteger, sa.Computed("captured_cents + penalties_cents - refunded_cents", persisted=True)
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")
+    )
+
 # ---------- EVENTS OUTBOX ----------
+# Partitioned by RANGE (created_at), one partition per UTC day (see migration 0020 and
+# services/outbox_retention.py); Postgres requires the partition key in the primary key.
 class EventsOutbox(Base):
     __tablename__ = "events_outbox"
 
@@ -211,7 +379,16 @@ class EventsOutbox(Base):
     sent_at: Mapped[Optional[datetime]] = mapped_column(pg.TIMESTAMP(timezone=True), nullable=True)
     attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
     error: Mapped[Optional[str]] = mapped_column(sa.Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()"))
+    created_at: Mapped[datetime] = mapped_column(
+        pg.TIMESTAMP(timezone=True), primary_key=True, nullable=False, server_default=sa.text("now()")
+    )
+
+    __table_args__ = (
+        Index("ix_outbox_unsent_id", "id", postgresql_where=sa.text("sent_at IS NULL")),
+        Index("ix_outbox_ready", "available_at", "id", postgresql_where=sa.text("sent_at IS NULL")),
+        Index("ix_outbox_unsent_channel_id", "channel", "id", postgresql_where=sa.text("sent_at IS NULL")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 # ---------- GMAIL OAUTH TOKENS ----------
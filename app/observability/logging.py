@@ -1,10 +1,11 @@
 from __future__ import annotations
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import time
-import uuid
 from pythonjsonlogger import jsonlogger
-from fastapi import Request
 from ..config import get_settings
 
 S = get_settings()
@@ -23,14 +24,21 @@ def setup_logging() -> None:
     root.addHandler(handler)
     root.setLevel(S.LOG_LEVEL)
 
+    # access log: the request path only enqueues the record; a listener thread
+    # formats it and writes to stdout
+    access = logging.getLogger("app.request")
+    for h in list(access.handlers):
+        access.removeHandler(h)
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    access.addHandler(logging.handlers.QueueHandler(q))
+    access.propagate = False
+    listener = logging.handlers.QueueListener(q, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
     # quiet noisy loggers if desired
     logging.getLogger("uvicorn.access").setLevel("WARNING")
 
-def get_request_id(req: Request) -> str:
-    hdr = S.REQUEST_ID_HEADER
-    rid = req.headers.get(hdr)
-    return rid if rid else uuid.uuid4().hex
-
 def bind_record(record: logging.LogRecord, **extra):
     # attach arbitrary fields to a log record (safe for missing attrs)
     for k, v in extra.items():
@@ -45,6 +45,30 @@ REG_CANCELED  = Counter("reg_canceled_total",  "Registrations canceled",  ["sess
 PROMOTED      = Counter("reg_promoted_total",  "Registrations promoted",  ["session_id"], registry=getattr(REGISTRY, "__class__", None) and REGISTRY)
 SESSIONS_AUTOCLOSED = Counter("sessions_autoclosed_total", "Sessions auto-closed after start", registry=REGISTRY)
 
+OUTBOX_PUBLISHED = Counter("outbox_published_total", "Outbox events published to Redis", registry=REGISTRY)
+OUTBOX_FAILED    = Counter("outbox_failed_total",    "Outbox publishes that failed and were rescheduled", registry=REGISTRY)
+OUTBOX_LAG       = Gauge("outbox_lag_seconds", "Age of the oldest ready outbox event per dispatcher partition", ["partition"], registry=REGISTRY)
+
+WALLET_DRIFT_WALLETS  = Gauge("wallet_drift_wallets", "Wallets whose totals disagree with the ledger", registry=REGISTRY)
+WALLET_DRIFT_CENTS    = Gauge("wallet_drift_cents", "Sum of |drift| over flagged wallets", ["bucket"], registry=REGISTRY)
+WALLET_DRIFT_DETECTED = Counter("wallet_drift_detected_total", "Wallets newly flagged by the reconciler", registry=REGISTRY)
+WALLET_TOTALS_DRIFT   = Gauge("wallet_totals_drift_cents", "Last correction of the maintained wallet totals", ["bucket"], registry=REGISTRY)
+WALLET_TOTALS_PENDING = Gauge("wallet_totals_pending_deltas", "Wallet total deltas not folded yet", registry=REGISTRY)
+LEDGER_RECONCILE_LAG  = Gauge("ledger_reconcile_lag_ids", "Ledger ids not yet folded into wallet_shadows", registry=REGISTRY)
+
+SMS_QUEUE_DEPTH   = Gauge("sms_send_queue_depth", "SMS sends waiting for a sender slot", registry=REGISTRY)
+SMS_SEND_LATENCY  = Histogram("sms_send_duration_seconds", "Twilio send latency", registry=REGISTRY)
+SMS_SEND_FAILURES = Counter("sms_send_failures_total", "SMS sends that failed", registry=REGISTRY)
+SMS_SENT          = Counter("sms_sent_total", "SMS sends accepted by Twilio", registry=REGISTRY)
+
+# ---------- worker processes ----------
+def start_worker_metrics_server(port: int | None) -> None:
+    """Expose REGISTRY on its own port from a worker process (the API serves /metrics itself)."""
+    if not port or not S.METRICS_ENABLED or not PROM_AVAILABLE:
+        return
+    from prometheus_client import start_http_server
+    start_http_server(port, registry=REGISTRY)
+
 # ---------- /metrics endpoint factory ----------
 def metrics_app():
     async def _metrics(_: Request):
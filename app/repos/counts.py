@@ -0,0 +1,36 @@
+from __future__ import annotations
+import json
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class _ExplainJson(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON) <stmt>`, compiled with the statement's bind parameters kept as binds."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt: sa.Select) -> None:
+        self.stmt = stmt
+
+
+@compiles(_ExplainJson, "postgresql")
+def _compile_explain_json(element: _ExplainJson, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+async def estimated_count(db: AsyncSession, stmt: sa.Select, *, exact_below: int = 1000) -> tuple[int, bool]:
+    """
+    Row count of `stmt` as (count, is_estimate). The planner's estimate (EXPLAIN, no
+    execution) is returned when it is at least `exact_below`; smaller results are
+    counted exactly, which is cheap at that size.
+    """
+    raw = (await db.execute(_ExplainJson(stmt))).scalar_one()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate >= exact_below:
+        return estimate, True
+    exact = (await db.execute(sa.select(sa.func.count()).select_from(stmt.subquery()))).scalar_one()
+    return int(exact), False
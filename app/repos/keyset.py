@@ -0,0 +1,49 @@
+from __future__ import annotations
+import base64
+import json
+from typing import Any, Sequence
+
+import sqlalchemy as sa
+
+# Opaque keyset cursors: the sort key of the last row on a page, as base64url JSON.
+# Pages continue with a row-value comparison, e.g. (starts_at, id) < (:starts_at, :id),
+# which Postgres answers from a matching btree index without OFFSET scans.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*parts: Any) -> str:
+    raw = json.dumps([str(p) for p in parts], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decode and convert each part with the matching callable (e.g. datetime.fromisoformat, uuid.UUID)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        parts = json.loads(raw)
+        if not isinstance(parts, list) or len(parts) != len(types):
+            raise InvalidCursor("malformed cursor")
+        return tuple(t(p) for t, p in zip(types, parts))
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("malformed cursor") from e
+
+
+def after_desc(cols: Sequence, values: Sequence) -> sa.ColumnElement[bool]:
+    """Rows strictly after the cursor in a DESC, DESC, ... ordering."""
+    return sa.tuple_(*cols) < sa.tuple_(*values)
+
+
+def after_asc(cols: Sequence, values: Sequence) -> sa.ColumnElement[bool]:
+    """Rows strictly after the cursor in an ASC, ASC, ... ordering."""
+    return sa.tuple_(*cols) > sa.tuple_(*values)
+
+
+def like_pattern(q: str) -> str:
+    # substring pattern with LIKE wildcards in the user's text escaped (ESCAPE '\\')
+    esc = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{esc}%"
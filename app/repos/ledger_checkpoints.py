@@ -0,0 +1,186 @@
+from __future__ import annotations
+import uuid
+from typing import Dict, Iterable, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .ledger_repo import HOLD_KINDS
+
+# Running balances over ledger_balance_checkpoints. A checkpoint holds a user's
+# posted/holds totals right after one of their entries; the running balance after
+# any entry is the nearest earlier checkpoint plus a windowed SUM over the entries
+# in between, so its cost is bounded by the checkpoint spacing, not history length.
+
+_KINDS = pg.ARRAY(sa.Text)
+
+# Ledger ids are taken before commit, so a row can become visible after higher ids
+# already have. Each call records a settle mark: the highest visible id plus the
+# snapshot's xmax. Every ledger writer locks the user's wallet (which assigns its xid)
+# before taking an id, so any transaction that still holds an id below the mark has an
+# xid below that xmax; once no other transaction older than the mark is running, every
+# id up to it is final.
+_MARK = text(
+    """
+    WITH snap AS (
+        SELECT pg_current_snapshot() AS s, pg_current_xact_id_if_assigned() AS own
+    ),
+    oldest AS (
+        SELECT coalesce(
+            (SELECT min(x::text::bigint) FROM snap, unnest(pg_snapshot_xip(snap.s)) AS x
+             WHERE x IS DISTINCT FROM snap.own),
+            (SELECT pg_snapshot_xmax(s)::text::bigint FROM snap)
+        ) AS xid
+    ),
+    mark AS (
+        INSERT INTO ledger_settle_marks (xid, max_ledger_id)
+        SELECT pg_snapshot_xmax(s)::text::bigint, (SELECT coalesce(max(id), 0) FROM ledger_entries)
+        FROM snap
+        ON CONFLICT (xid) DO UPDATE
+        SET max_ledger_id = greatest(ledger_settle_marks.max_ledger_id, EXCLUDED.max_ledger_id)
+        RETURNING xid, max_ledger_id
+    )
+    SELECT (SELECT xid FROM oldest),
+           greatest(
+               (SELECT max(max_ledger_id) FROM ledger_settle_marks WHERE xid <= (SELECT xid FROM oldest)),
+               (SELECT max(max_ledger_id) FROM mark WHERE xid <= (SELECT xid FROM oldest))
+           )
+    """
+)
+
+# Marks older than the newest settled one are never needed again.
+_PRUNE_MARKS = text(
+    """
+    DELETE FROM ledger_settle_marks
+    WHERE xid < (SELECT max(xid) FROM ledger_settle_marks WHERE xid <= :oldest)
+    """
+)
+
+_UPTO = text(
+    """
+    SELECT max(id) FROM (
+        SELECT id FROM ledger_entries
+        WHERE id > :after AND id <= :bound
+        ORDER BY id
+        LIMIT :batch
+    ) s
+    """
+)
+
+_WRITE = text(
+    """
+    WITH touched AS (
+        SELECT DISTINCT user_id FROM ledger_entries WHERE id > :after AND id <= :upto
+    ),
+    base AS (
+        SELECT t.user_id,
+               coalesce(c.ledger_id, 0)    AS from_id,
+               coalesce(c.posted_cents, 0) AS posted,
+               coalesce(c.holds_cents, 0)  AS holds
+        FROM touched t
+        LEFT JOIN LATERAL (
+            SELECT ledger_id, posted_cents, holds_cents
+            FROM ledger_balance_checkpoints c
+            WHERE c.user_id = t.user_id
+            ORDER BY c.ledger_id DESC
+            LIMIT 1
+        ) c ON true
+    ),
+    run AS (
+        SELECT e.user_id, e.id,
+               b.posted + sum(CASE WHEN e.kind = ANY(:hold_kinds) THEN 0 ELSE e.amount_cents END) OVER w AS posted_cents,
+               b.holds  + sum(CASE WHEN e.kind = ANY(:hold_kinds) THEN e.amount_cents ELSE 0 END) OVER w AS holds_cents,
+               row_number() OVER w AS n
+        FROM base b
+        JOIN ledger_entries e ON e.user_id = b.user_id AND e.id > b.from_id AND e.id <= :upto
+        WINDOW w AS (PARTITION BY e.user_id ORDER BY e.id)
+    )
+    INSERT INTO ledger_balance_checkpoints (user_id, ledger_id, posted_cents, holds_cents)
+    SELECT user_id, id, posted_cents, holds_cents FROM run WHERE mod(n, :every) = 0
+    ON CONFLICT DO NOTHING
+    """
+).bindparams(sa.bindparam("hold_kinds", type_=_KINDS))
+
+_BALANCES = text(
+    """
+    WITH page AS (
+        SELECT * FROM unnest(:uids, :los, :his) AS p(user_id, lo, hi)
+    ),
+    base AS (
+        SELECT p.user_id, p.hi, coalesce(c.ledger_id, 0) AS from_id, coalesce(c.posted_cents, 0) AS posted
+        FROM page p
+        LEFT JOIN LATERAL (
+            SELECT ledger_id, posted_cents
+            FROM ledger_balance_checkpoints c
+            WHERE c.user_id = p.user_id AND c.ledger_id < p.lo
+            ORDER BY c.ledger_id DESC
+            LIMIT 1
+        ) c ON true
+    )
+    SELECT e.id,
+           b.posted + sum(CASE WHEN e.kind = ANY(:hold_kinds) THEN 0 ELSE e.amount_cents END)
+                      OVER (PARTITION BY e.user_id ORDER BY e.id) AS balance_after
+    FROM base b
+    JOIN ledger_entries e ON e.user_id = b.user_id AND e.id > b.from_id AND e.id <= b.hi
+    """
+).bindparams(
+    sa.bindparam("uids", type_=pg.ARRAY(pg.UUID(as_uuid=True))),
+    sa.bindparam("los", type_=pg.ARRAY(sa.BigInteger)),
+    sa.bindparam("his", type_=pg.ARRAY(sa.BigInteger)),
+    sa.bindparam("hold_kinds", type_=_KINDS),
+)
+
+
+async def settled_upto(db: AsyncSession, *, after_id: int, batch: int) -> int:
+    """
+    Highest of the next `batch` ledger ids after `after_id` that can no longer be
+    joined by a lower id from a still-running transaction, or `after_id` when there
+    is none yet. Incremental ledger scans stop here so late commits are not skipped;
+    under constant write load the bound trails by about one pass. Caller commits.
+    """
+    oldest, bound = (await db.execute(_MARK)).one()
+    if bound is None or bound <= after_id:
+        return after_id
+    await db.execute(_PRUNE_MARKS, {"oldest": oldest})
+    upto = (await db.execute(_UPTO, {"after": after_id, "bound": bound, "batch": batch})).scalar_one()
+    return after_id if upto is None else int(upto)
+
+
+async def write_checkpoints(db: AsyncSession, *, after_id: int, every: int, batch: int) -> Tuple[int, int]:
+    """
+    Append checkpoints for users with entries in (after_id, upto], upto being
+    settled_upto(). Each touched user is summed from their last checkpoint, and
+    every `every`-th entry since then gets one.
+    Returns (upto, checkpoints written); upto == after_id when nothing settled. Caller commits.
+    """
+    upto = await settled_upto(db, after_id=after_id, batch=batch)
+    if upto == after_id:
+        return after_id, 0
+    res = await db.execute(
+        _WRITE, {"after": after_id, "upto": upto, "every": every, "hold_kinds": list(HOLD_KINDS)}
+    )
+    return upto, res.rowcount or 0
+
+
+async def balances_after(db: AsyncSession, entries: Iterable[Tuple[int, uuid.UUID]]) -> Dict[int, int]:
+    """Posted balance right after each (ledger id, user_id), in one query for a whole page."""
+    wanted: Dict[int, uuid.UUID] = dict(entries)
+    if not wanted:
+        return {}
+    span: Dict[uuid.UUID, list] = {}
+    for lid, uid in wanted.items():
+        lo_hi = span.setdefault(uid, [lid, lid])
+        lo_hi[0], lo_hi[1] = min(lo_hi[0], lid), max(lo_hi[1], lid)
+    uids = list(span)
+    rows = await db.execute(
+        _BALANCES,
+        {
+            "uids": uids,
+            "los": [span[u][0] for u in uids],
+            "his": [span[u][1] for u in uids],
+            "hold_kinds": list(HOLD_KINDS),
+        },
+    )
+    return {lid: int(balance) for lid, balance in rows.all() if lid in wanted}
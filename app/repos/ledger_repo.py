@@ -1,11 +1,19 @@
 from __future__ import annotations
-from typing import Optional, Sequence, Literal
+from collections import defaultdict
+from typing import Any, Mapping, Optional, Sequence, Literal
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, update, insert, func
+from sqlalchemy import select, desc, update, insert, func, text
 from sqlalchemy.exc import IntegrityError
 from ..models import LedgerEntry, Wallet
+from .wallet_totals import add_delta
+from . import session_financials
 import uuid
 
+# Kinds that move Wallet.holds_cents; every other kind moves posted_cents
+HOLD_KINDS = ("hold", "hold_release")
+
 # EXPECTED status per kind
 _KIND_STATUS = {
     "hold": "held",
@@ -43,6 +51,8 @@ async def apply_ledger_entry(
       - 'hold' affects holds_cents (increase); 'hold_release' decreases holds_cents.
       - 'deposit_in' / 'refund' increase posted_cents.
       - 'fee_capture' / 'penalty' decrease posted_cents.
+    The global wallet totals (wallet_total_deltas) and the session's
+    session_financials row are updated in the same transaction.
     """
     if kind not in _KIND_STATUS:
         raise ValueError(f"unknown ledger kind: {kind}")
@@ -125,6 +135,8 @@ async def apply_ledger_entry(
             updated_at   = func.now(),
         )
     )
+    await add_delta(db, delta_posted, delta_holds)
+    await session_financials.apply_entries(db, [(session_id, kind, amount_cents)])
 
     # NEW: fetch and return the ledger row we just wrote (or the one that already existed)
     res = await db.execute(
@@ -138,6 +150,103 @@ async def apply_ledger_entry(
         raise RuntimeError("Ledger entry was not created")
     return entry
 
+def _checked_amount(kind: str, amount_cents) -> int:
+    if kind not in _KIND_STATUS:
+        raise ValueError(f"unknown ledger kind: {kind}")
+    try:
+        amount_cents = int(amount_cents)
+    except Exception:
+        raise ValueError("amount_cents must be int cents")
+    expected = _KIND_SIGN[kind]
+    if expected == +1 and amount_cents <= 0:
+        raise ValueError(f"{kind} must use positive amount_cents")
+    if expected == -1 and amount_cents >= 0:
+        raise ValueError(f"{kind} must use negative amount_cents")
+    return amount_cents
+
+
+_UUIDS = pg.ARRAY(pg.UUID(as_uuid=True))
+
+_BULK_WALLET_UPDATE = text(
+    """
+    UPDATE wallets AS w
+    SET posted_cents = w.posted_cents + d.dp,
+        holds_cents  = w.holds_cents  + d.dh,
+        updated_at   = now()
+    FROM unnest(:uids, :dp, :dh) AS d(user_id, dp, dh)
+    WHERE w.user_id = d.user_id
+    """
+).bindparams(
+    sa.bindparam("uids", type_=_UUIDS),
+    sa.bindparam("dp", type_=pg.ARRAY(sa.Integer)),
+    sa.bindparam("dh", type_=pg.ARRAY(sa.Integer)),
+)
+
+
+async def apply_ledger_entries(db: AsyncSession, entries: Sequence[Mapping[str, Any]]) -> list:
+    """Set-based apply_ledger_entry for many rows, in a constant number of statements.
+
+    Each entry has user_id, kind, amount_cents, idempotency_key and optionally
+    session_id / registration_id; the same kind/sign rules apply. Rows whose
+    idempotency_key already exists are skipped (ON CONFLICT DO NOTHING) and do
+    not touch wallets. Wallet deltas are summed per user and applied in one UPDATE,
+    after locking the wallets in user_id order; wallet totals and session_financials
+    follow in one statement each. Caller commits.
+    Returns the inserted rows (id, user_id, kind, amount_cents, session_id, registration_id).
+    """
+    if not entries:
+        return []
+    rows = []
+    for e in entries:
+        kind = e["kind"]
+        rows.append({
+            "user_id": e["user_id"],
+            "session_id": e.get("session_id"),
+            "registration_id": e.get("registration_id"),
+            "idempotency_key": e["idempotency_key"],
+            "kind": kind,
+            "amount_cents": _checked_amount(kind, e["amount_cents"]),
+            "status": _KIND_STATUS[kind],
+        })
+
+    user_ids = sorted({r["user_id"] for r in rows})
+    await db.execute(
+        pg.insert(Wallet)
+        .values([{"user_id": u, "posted_cents": 0, "holds_cents": 0} for u in user_ids])
+        .on_conflict_do_nothing(index_elements=[Wallet.user_id])
+    )
+    await db.execute(
+        select(Wallet.user_id)
+        .where(Wallet.user_id == sa.any_(sa.bindparam("uids", user_ids, type_=_UUIDS)))
+        .order_by(Wallet.user_id)
+        .with_for_update()
+    )
+
+    res = await db.execute(
+        pg.insert(LedgerEntry)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[LedgerEntry.idempotency_key])
+        .returning(
+            LedgerEntry.id, LedgerEntry.user_id, LedgerEntry.kind, LedgerEntry.amount_cents,
+            LedgerEntry.session_id, LedgerEntry.registration_id,
+        )
+    )
+    inserted = list(res.all())
+
+    deltas: dict = defaultdict(lambda: [0, 0])  # user_id -> [posted, holds]
+    for r in inserted:
+        deltas[r.user_id][1 if r.kind in HOLD_KINDS else 0] += r.amount_cents
+    if deltas:
+        uids = list(deltas)
+        await db.execute(
+            _BULK_WALLET_UPDATE,
+            {"uids": uids, "dp": [deltas[u][0] for u in uids], "dh": [deltas[u][1] for u in uids]},
+        )
+        await add_delta(db, sum(d[0] for d in deltas.values()), sum(d[1] for d in deltas.values()))
+    await session_financials.apply_entries(db, [(r.session_id, r.kind, r.amount_cents) for r in inserted])
+    return inserted
+
+
 LedgerKind = Literal["deposit_in","fee_hold","fee_capture","hold_release","refund","penalty"]
 async def list_ledger_for_user(
     db: AsyncSession,
@@ -1,5 +1,10 @@
 from __future__ import annotations
 from datetime import datetime, timezone
+from typing import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql as pg
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import EventsOutbox
 
@@ -8,3 +13,64 @@ async def add_outbox_event(db: AsyncSession, *, channel: str, payload: dict) ->
     db.add(evt)
     # no commit here; caller’s transaction should commit
     return evt
+
+
+async def add_outbox_events(db: AsyncSession, events: Sequence[tuple[str, dict]]) -> None:
+    """Write many (channel, payload) events with one multi-row INSERT. Caller commits."""
+    if not events:
+        return
+    await db.execute(
+        sa.insert(EventsOutbox).values([{"channel": ch, "payload": payload} for ch, payload in events])
+    )
+
+
+def _ids_param(ids: Sequence[int]):
+    # single array bind -> "id = ANY(:ids)" (one statement regardless of batch size)
+    return sa.any_(sa.bindparam("ids", list(ids), type_=pg.ARRAY(sa.BigInteger)))
+
+
+async def mark_sent(db: AsyncSession, ids: Sequence[int]) -> None:
+    """Acknowledge a batch of published rows with one UPDATE."""
+    if not ids:
+        return
+    await db.execute(
+        update(EventsOutbox)
+        .where(EventsOutbox.id == _ids_param(ids))
+        .values(
+            sent_at=sa.func.now(),
+            attempts=EventsOutbox.attempts + 1,
+            error=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def mark_failed(
+    db: AsyncSession,
+    ids: Sequence[int],
+    *,
+    error: str,
+    base_delay_sec: float,
+    max_delay_sec: int,
+) -> None:
+    """
+    Record a failed publish and push available_at out with exponential backoff:
+    delay = min(max_delay, base * 2^attempts). sent_at stays NULL so the row is retried.
+    The exponent is capped at 20 so a row that keeps failing cannot overflow power().
+    """
+    if not ids:
+        return
+    delay_sec = sa.func.least(
+        sa.literal(max_delay_sec, sa.Float),
+        sa.literal(base_delay_sec, sa.Float) * sa.func.power(2, sa.func.least(EventsOutbox.attempts, 20)),
+    )
+    await db.execute(
+        update(EventsOutbox)
+        .where(EventsOutbox.id == _ids_param(ids))
+        .values(
+            attempts=EventsOutbox.attempts + 1,
+            error=error[:500],
+            available_at=sa.func.now() + sa.func.make_interval(0, 0, 0, 0, 0, 0, delay_sec),
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Session, SessionFinancials
+
+# session_financials is kept in step by the ledger write path (ledger_repo calls
+# apply_entries in the same transaction). Ledger amounts are from the member's side,
+# so captures and penalties flip sign here; holds keep theirs (hold +, release -).
+
+_UUIDS = pg.ARRAY(pg.UUID(as_uuid=True))
+_BIGINTS = pg.ARRAY(sa.BigInteger)
+
+_UPSERT = text(
+    """
+    INSERT INTO session_financials AS f
+        (session_id, captured_cents, refunded_cents, penalties_cents, holds_outstanding_cents)
+    SELECT * FROM unnest(:sids, :captured, :refunded, :penalties, :holds)
+    ON CONFLICT (session_id) DO UPDATE
+    SET captured_cents          = f.captured_cents          + EXCLUDED.captured_cents,
+        refunded_cents          = f.refunded_cents          + EXCLUDED.refunded_cents,
+        penalties_cents         = f.penalties_cents         + EXCLUDED.penalties_cents,
+        holds_outstanding_cents = f.holds_outstanding_cents + EXCLUDED.holds_outstanding_cents,
+        updated_at              = now()
+    """
+).bindparams(
+    sa.bindparam("sids", type_=_UUIDS),
+    sa.bindparam("captured", type_=_BIGINTS),
+    sa.bindparam("refunded", type_=_BIGINTS),
+    sa.bindparam("penalties", type_=_BIGINTS),
+    sa.bindparam("holds", type_=_BIGINTS),
+)
+
+# kind -> (column index in [captured, refunded, penalties, holds], sign)
+_KIND_COLUMN = {
+    "fee_capture": (0, -1),
+    "refund": (1, +1),
+    "penalty": (2, -1),
+    "hold": (3, +1),
+    "hold_release": (3, +1),
+}
+
+
+@dataclass
+class Financials:
+    captured_cents: int = 0
+    refunded_cents: int = 0
+    penalties_cents: int = 0
+    holds_outstanding_cents: int = 0
+
+    @property
+    def net_cents(self) -> int:
+        return self.captured_cents + self.penalties_cents - self.refunded_cents
+
+
+async def apply_entries(db: AsyncSession, entries: Iterable[Tuple[Optional[uuid.UUID], str, int]]) -> None:
+    """Add (session_id, kind, amount_cents) ledger rows to their sessions' rollups; one upsert. Caller commits."""
+    deltas: Dict[uuid.UUID, list] = defaultdict(lambda: [0, 0, 0, 0])
+    for session_id, kind, amount_cents in entries:
+        col = _KIND_COLUMN.get(kind)
+        if session_id is None or col is None:
+            continue
+        deltas[session_id][col[0]] += col[1] * amount_cents
+    if not deltas:
+        return
+    sids = sorted(deltas)  # fixed row order: concurrent writers can't deadlock on two sessions
+    await db.execute(_UPSERT, {
+        "sids": sids,
+        "captured": [deltas[s][0] for s in sids],
+        "refunded": [deltas[s][1] for s in sids],
+        "penalties": [deltas[s][2] for s in sids],
+        "holds": [deltas[s][3] for s in sids],
+    })
+
+
+async def get_many(db: AsyncSession, session_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, Financials]:
+    """Rollups by primary key; sessions without ledger activity get zeros."""
+    out = {sid: Financials() for sid in session_ids}
+    if not out:
+        return out
+    rows = await db.execute(
+        select(SessionFinancials).where(
+            SessionFinancials.session_id == sa.any_(sa.bindparam("sids", list(out), type_=_UUIDS))
+        )
+    )
+    for f in rows.scalars().all():
+        out[f.session_id] = Financials(
+            f.captured_cents, f.refunded_cents, f.penalties_cents, f.holds_outstanding_cents
+        )
+    return out
+
+
+async def totals(
+    db: AsyncSession,
+    *,
+    statuses: Sequence[str],
+    starts_from: Optional[datetime] = None,
+    starts_before: Optional[datetime] = None,
+) -> Tuple[int, Financials]:
+    """(sessions, summed rollups) over sessions in a status/start-time range: one join on indexed keys."""
+    conds = [Session.status == sa.any_(sa.bindparam("statuses", list(statuses), type_=pg.ARRAY(sa.Text)))]
+    if starts_from is not None:
+        conds.append(Session.starts_at >= starts_from)
+    if starts_before is not None:
+        conds.append(Session.starts_at < starts_before)
+    f = SessionFinancials
+    row = (await db.execute(
+        select(
+            sa.func.count(Session.id),
+            sa.func.coalesce(sa.func.sum(f.captured_cents), 0),
+            sa.func.coalesce(sa.func.sum(f.refunded_cents), 0),
+            sa.func.coalesce(sa.func.sum(f.penalties_cents), 0),
+            sa.func.coalesce(sa.func.sum(f.holds_outstanding_cents), 0),
+        )
+        .select_from(Session)
+        .outerjoin(f, f.session_id == Session.id)
+        .where(*conds)
+    )).one()
+    return int(row[0]), Financials(*(int(v) for v in row[1:]))
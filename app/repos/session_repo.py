@@ -6,8 +6,11 @@ from typing import Optional, Sequence, Tuple
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.orm import aliased
 
 from ..models import Session, Registration
+from . import keyset
 
 
 def _confirmed_seats_scalar(session_id_col) -> sa.sql.elements.ColumnElement[int]:
@@ -69,23 +72,61 @@ async def list_upcoming(
     res = await db.execute(q)
     return list(res.all())
 
-async def list_closed(
+async def list_history(
     db: AsyncSession,
     *,
-    now_utc: datetime,
+    statuses: Sequence[str] = ("closed",),
+    starts_from: Optional[datetime] = None,
+    starts_before: Optional[datetime] = None,
+    title_q: Optional[str] = None,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
     limit: int = 50,
 ) -> Sequence[Tuple[Session, int, int]]:
-    # Return (Session, confirmed_seats, waitlist_seats) for all closed sessions
-    csum = _confirmed_seats_scalar(Session.id).label("confirmed_seats")
-    wsum = _waitlist_seats_scalar(Session.id).label("waitlist_seats")
-    q = (
-        select(Session, csum, wsum)
-        .where(Session.status == "closed")
-        .order_by(Session.starts_at.desc())
+    """
+    (Session, confirmed_seats, waitlist_seats) newest first, keyset-paged on (starts_at, id)
+    from `after` (the last row of the previous page). The page is picked first on
+    ix_sessions_status_starts_at_id; seat totals for just those rows come from one
+    grouped join over registrations.
+    """
+    conds = [Session.status == sa.any_(sa.bindparam("statuses", list(statuses), type_=pg.ARRAY(sa.Text)))]
+    if starts_from is not None:
+        conds.append(Session.starts_at >= starts_from)
+    if starts_before is not None:
+        conds.append(Session.starts_at < starts_before)
+    if title_q:
+        conds.append(Session.title.ilike(keyset.like_pattern(title_q), escape="\\"))
+    if after is not None:
+        conds.append(keyset.after_desc((Session.starts_at, Session.id), after))
+
+    page = (
+        select(Session)
+        .where(*conds)
+        .order_by(Session.starts_at.desc(), Session.id.desc())
         .limit(limit)
+        .subquery("page")
+    )
+    page_session = aliased(Session, page)
+    agg = (
+        select(
+            Registration.session_id,
+            func.sum(Registration.seats).filter(Registration.state == "confirmed").label("confirmed_seats"),
+            func.sum(Registration.seats).filter(Registration.state == "waitlisted").label("waitlist_seats"),
+        )
+        .where(Registration.session_id.in_(select(page.c.id)))
+        .group_by(Registration.session_id)
+        .subquery("agg")
+    )
+    q = (
+        select(
+            page_session,
+            func.coalesce(agg.c.confirmed_seats, 0),
+            func.coalesce(agg.c.waitlist_seats, 0),
+        )
+        .outerjoin(agg, agg.c.session_id == page_session.id)
+        .order_by(page_session.starts_at.desc(), page_session.id.desc())
     )
     res = await db.execute(q)
-    return list(res.all())
+    return [(s, int(c), int(w)) for s, c, w in res.all()]
 
 
 async def get_with_counts(
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import WalletTotalDelta
+
+# Global SUM(wallets) kept as one wallet_totals row plus pending deltas.
+# Wallet writers call add_delta() in their own transaction; it only INSERTs, so
+# concurrent (SERIALIZABLE) writers never update a shared row. fold_deltas() moves
+# deltas into the row, deleting exactly what it adds; read_totals() is the row plus
+# whatever is still pending, both read in one statement.
+
+_READ = text(
+    """
+    SELECT coalesce(t.posted_cents, 0) + d.posted,
+           coalesce(t.holds_cents, 0) + d.holds,
+           d.n,
+           t.verified_at
+    FROM (
+        SELECT coalesce(sum(posted_cents), 0) AS posted, coalesce(sum(holds_cents), 0) AS holds, count(*) AS n
+        FROM wallet_total_deltas
+    ) d
+    LEFT JOIN wallet_totals t ON t.id = 1
+    """
+)
+
+_FOLD = text(
+    """
+    WITH gone AS (
+        DELETE FROM wallet_total_deltas
+        WHERE id IN (SELECT id FROM wallet_total_deltas ORDER BY id LIMIT :batch)
+        RETURNING posted_cents, holds_cents
+    ),
+    s AS (
+        SELECT coalesce(sum(posted_cents), 0) AS posted, coalesce(sum(holds_cents), 0) AS holds, count(*) AS n
+        FROM gone
+    ),
+    up AS (
+        INSERT INTO wallet_totals AS t (id, posted_cents, holds_cents)
+        SELECT 1, s.posted, s.holds FROM s WHERE s.n > 0
+        ON CONFLICT (id) DO UPDATE
+        SET posted_cents = t.posted_cents + EXCLUDED.posted_cents,
+            holds_cents  = t.holds_cents  + EXCLUDED.holds_cents,
+            updated_at   = now()
+    )
+    SELECT n FROM s
+    """
+)
+
+_VERIFY = text(
+    """
+    SELECT w.posted - coalesce(t.posted_cents, 0) - d.posted,
+           w.holds  - coalesce(t.holds_cents, 0)  - d.holds
+    FROM (SELECT coalesce(sum(posted_cents), 0) AS posted, coalesce(sum(holds_cents), 0) AS holds FROM wallets) w
+    CROSS JOIN (
+        SELECT coalesce(sum(posted_cents), 0) AS posted, coalesce(sum(holds_cents), 0) AS holds
+        FROM wallet_total_deltas
+    ) d
+    LEFT JOIN wallet_totals t ON t.id = 1
+    """
+)
+
+# Verifiers serialize on the row: a second replica's _VERIFY then runs after the
+# first one's correction committed (READ COMMITTED takes a new snapshot per statement)
+# and finds nothing left to correct, instead of applying the same drift twice.
+_SEED = text("INSERT INTO wallet_totals (id, posted_cents, holds_cents) VALUES (1, 0, 0) ON CONFLICT (id) DO NOTHING")
+_LOCK = text("SELECT 1 FROM wallet_totals WHERE id = 1 FOR UPDATE")
+
+_CORRECT = text(
+    """
+    INSERT INTO wallet_totals AS t (id, posted_cents, holds_cents, verified_at, drift_posted_cents, drift_holds_cents)
+    VALUES (1, :dp, :dh, now(), :dp, :dh)
+    ON CONFLICT (id) DO UPDATE
+    SET posted_cents       = t.posted_cents + EXCLUDED.drift_posted_cents,
+        holds_cents        = t.holds_cents  + EXCLUDED.drift_holds_cents,
+        verified_at        = now(),
+        drift_posted_cents = EXCLUDED.drift_posted_cents,
+        drift_holds_cents  = EXCLUDED.drift_holds_cents
+    """
+)
+
+
+@dataclass
+class WalletTotalsSummary:
+    posted_cents: int
+    holds_cents: int
+    pending_deltas: int
+    verified_at: Optional[datetime] = None
+
+    @property
+    def available_cents(self) -> int:
+        return self.posted_cents - self.holds_cents
+
+
+async def add_delta(db: AsyncSession, posted_cents: int, holds_cents: int) -> None:
+    """Record a change of SUM(wallets); call in the transaction that changes the wallets."""
+    if posted_cents or holds_cents:
+        await db.execute(insert(WalletTotalDelta).values(posted_cents=posted_cents, holds_cents=holds_cents))
+
+
+async def read_totals(db: AsyncSession) -> WalletTotalsSummary:
+    posted, holds, n, verified_at = (await db.execute(_READ)).one()
+    return WalletTotalsSummary(int(posted), int(holds), int(n), verified_at)
+
+
+async def fold_deltas(db: AsyncSession, *, batch: int = 10_000) -> int:
+    """Fold up to `batch` pending deltas into wallet_totals. Returns how many were folded. Caller commits."""
+    return int((await db.execute(_FOLD, {"batch": batch})).scalar_one())
+
+
+async def verify_totals(db: AsyncSession) -> Tuple[int, int]:
+    """
+    Compare the maintained totals with a full SUM over wallets (one snapshot) and
+    correct the row by the difference. Returns the (posted, holds) drift; (0, 0)
+    when the write path kept them in step. Holds the wallet_totals row lock until the
+    caller commits, so concurrent verifiers (and folds) wait instead of double-correcting.
+    """
+    await db.execute(_SEED)
+    await db.execute(_LOCK)
+    dp, dh = (int(v) for v in (await db.execute(_VERIFY)).one())
+    await db.execute(_CORRECT, {"dp": dp, "dh": dh})
+    return dp, dh
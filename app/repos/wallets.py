@@ -72,3 +72,22 @@ async def get_wallet_summary(db: AsyncSession, user_id: uuid.UUID) -> WalletSumm
     if not w:
         return WalletSummary(0, 0)
     return WalletSummary(w.posted_cents, w.holds_cents)
+
+
+async def ensure_and_lock_wallets(db: AsyncSession, user_ids) -> dict[uuid.UUID, WalletSummary]:
+    """Batch ensure_and_lock_wallet: one insert-if-missing, one SELECT ... FOR UPDATE in user_id order."""
+    ids = sorted(set(user_ids))
+    if not ids:
+        return {}
+    await db.execute(
+        pg_insert(Wallet)
+        .values([{"user_id": u} for u in ids])
+        .on_conflict_do_nothing(index_elements=[Wallet.__table__.c.user_id])
+    )
+    rows = await db.execute(
+        select(Wallet.user_id, Wallet.posted_cents, Wallet.holds_cents)
+        .where(Wallet.user_id.in_(ids))
+        .order_by(Wallet.user_id)
+        .with_for_update()
+    )
+    return {uid: WalletSummary(posted, holds) for uid, posted, holds in rows.all()}
@@ -1,121 +1,125 @@
+import uuid
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert
 
 from ..domain.errors import *
 from ..domain.schemas.registration import AdminPreregItemIn, AdminPreregResultOut
 from ..repos import ledger_repo
-from ..repos.wallets import ensure_and_lock_wallet, get_wallet_summary
+from ..repos.wallets import ensure_and_lock_wallets
 from ..models import User, Session as SessionModel, Registration
 
 async def prereg_batch_on_create(db: AsyncSession, *, session, items: list[AdminPreregItemIn]) -> list[AdminPreregResultOut]:
-    results = []
-    for item in items:
-        results.append(await _preregister_one(db, session=session, item=item))
-    return results
-
-async def _preregister_one(
-    db: AsyncSession,
-    *,
-    session: SessionModel,
-    item: AdminPreregItemIn,
-) -> AdminPreregResultOut:
-    # A) user must exist and be active/not deleted
-    urow = await db.execute(select(User).where(User.id == item.user_id))
-    user = urow.scalar_one_or_none()
-    if not user or getattr(user, "deleted_at", None) is not None or user.status != "active":
-        return AdminPreregResultOut(user_id=item.user_id, state="rejected", error="user_disabled_or_missing")
+    """
+    Preregister a list of users in one pass, with a constant number of round trips:
+    load users / existing registrations / wallets for all items, lock the session row once,
+    decide confirmations and waitlist positions in memory in item order, then bulk-insert
+    registrations and ledger rows. Same rules and error codes as one-by-one preregistration.
+    Caller commits.
+    """
+    if not items:
+        return []
 
     # B) session must be schedulable
     if session.status != "scheduled":
-        return AdminPreregResultOut(user_id=item.user_id, state="rejected", error=f"session_{session.status}")
+        return [
+            AdminPreregResultOut(user_id=item.user_id, state="rejected", error=f"session_{session.status}")
+            for item in items
+        ]
 
-    # C) prevent duplicate active reg by same host
-    dup = await db.execute(
-        select(Registration.id).where(
-            Registration.session_id == session.id,
-            Registration.host_user_id == item.user_id,
-            Registration.state != "canceled",
-        )
+    user_ids = list({item.user_id for item in items})
+
+    # A) users must exist and be active/not deleted
+    urows = await db.execute(
+        select(User.id).where(User.id.in_(user_ids), User.status == "active", User.deleted_at.is_(None))
     )
-    if dup.scalar_one_or_none():
-        return AdminPreregResultOut(user_id=item.user_id, state="rejected", error="already_registered_or_waitlisted")
+    active_users = set(urows.scalars().all())
 
     # D) lock session row → deterministic seat math
     srow = await db.execute(
-        select(SessionModel).where(SessionModel.id == session.id).with_for_update()
+        select(SessionModel.capacity, SessionModel.fee_cents).where(SessionModel.id == session.id).with_for_update()
     )
-    s_locked = srow.scalar_one()
+    capacity, fee_cents = srow.one()
 
-    # E) compute remaining confirmed seats
-    used = await db.execute(
-        select(func.coalesce(func.sum(Registration.seats), 0)).where(
-            Registration.session_id == s_locked.id,
-            Registration.state == "confirmed",
+    # C) existing active regs by the same hosts, E) confirmed seats, G) current waitlist tail
+    dup_rows = await db.execute(
+        select(Registration.host_user_id).where(
+            Registration.session_id == session.id,
+            Registration.host_user_id.in_(user_ids),
+            Registration.state != "canceled",
         )
     )
-    confirmed_seats = int(used.scalar_one())
-    remaining = max(0, s_locked.capacity - confirmed_seats)
-    will_confirm = item.seats <= remaining
+    taken_by = set(dup_rows.scalars().all())
+    agg = await db.execute(
+        select(
+            func.coalesce(func.sum(Registration.seats).filter(Registration.state == "confirmed"), 0),
+            func.coalesce(func.max(Registration.waitlist_pos).filter(Registration.state == "waitlisted"), 0),
+        ).where(Registration.session_id == session.id)
+    )
+    confirmed_seats, last_pos = (int(v) for v in agg.one())
 
-    # F) strict funds required
-    total_fee = s_locked.fee_cents * item.seats
-    await ensure_and_lock_wallet(db, item.user_id)  # creates & locks wallet row
-    summary = await get_wallet_summary(db, item.user_id)
-    if summary.available_cents < total_fee:
-        return AdminPreregResultOut(user_id=item.user_id, state="rejected", error="insufficient_funds")
+    # F) strict funds required: lock every wallet once (user_id order)
+    wallets = await ensure_and_lock_wallets(db, [uid for uid in user_ids if uid in active_users])
+    available = {uid: w.available_cents for uid, w in wallets.items()}
 
-    # G) waitlist position if needed
-    waitlist_pos = None
-    if not will_confirm:
-        wrow = await db.execute(
-            select(func.coalesce(func.max(Registration.waitlist_pos), 0)).where(
-                Registration.session_id == s_locked.id,
-                Registration.state == "waitlisted",
-            )
-        )
-        waitlist_pos = int(wrow.scalar_one()) + 1
+    results: list[AdminPreregResultOut] = []
+    regs: list[dict] = []
+    entries: list[dict] = []
+    for item in items:
+        if item.user_id not in active_users:
+            results.append(AdminPreregResultOut(user_id=item.user_id, state="rejected", error="user_disabled_or_missing"))
+            continue
+        if item.user_id in taken_by:
+            results.append(AdminPreregResultOut(user_id=item.user_id, state="rejected", error="already_registered_or_waitlisted"))
+            continue
 
-    # H) create registration
-    reg = Registration(
-        session_id=s_locked.id,
-        host_user_id=item.user_id,
-        is_host=True,
-        seats=item.seats,
-        guest_names=item.guest_names,
-        state="confirmed" if will_confirm else "waitlisted",
-        waitlist_pos=None if will_confirm else waitlist_pos,
-    )
-    db.add(reg)
-    await db.flush()  # need reg.id for ledger linkage
+        total_fee = fee_cents * item.seats
+        if available.get(item.user_id, 0) < total_fee:
+            results.append(AdminPreregResultOut(user_id=item.user_id, state="rejected", error="insufficient_funds"))
+            continue
 
-    # I) ledger / wallet movements (negative amounts = charge user)
-    if will_confirm:
-        await ledger_repo.apply_ledger_entry(
-            db,
-            user_id=item.user_id,
-            session_id=s_locked.id,
-            registration_id=reg.id,
-            kind="fee_capture",
-            amount_cents=-total_fee,
-            idempotency_key=item.idempotency_key,
-        )
-    else:
-        await ledger_repo.apply_ledger_entry(
-            db,
+        will_confirm = item.seats <= max(0, capacity - confirmed_seats)
+        waitlist_pos = None
+        if will_confirm:
+            confirmed_seats += item.seats
+        else:
+            last_pos += 1
+            waitlist_pos = last_pos
+
+        reg_id = uuid.uuid4()
+        taken_by.add(item.user_id)
+        available[item.user_id] -= total_fee
+        regs.append({
+            "id": reg_id,
+            "session_id": session.id,
+            "host_user_id": item.user_id,
+            "is_host": True,
+            "seats": item.seats,
+            "guest_names": item.guest_names,
+            "state": "confirmed" if will_confirm else "waitlisted",
+            "waitlist_pos": waitlist_pos,
+        })
+        # I) ledger / wallet movements: capture when confirmed, hold when waitlisted
+        if total_fee > 0:
+            entries.append({
+                "user_id": item.user_id,
+                "session_id": session.id,
+                "registration_id": reg_id,
+                "kind": "fee_capture" if will_confirm else "hold",
+                "amount_cents": -total_fee if will_confirm else total_fee,
+                "idempotency_key": item.idempotency_key or f"prereg:{session.id}:{item.user_id}",
+            })
+        results.append(AdminPreregResultOut(
             user_id=item.user_id,
-            session_id=s_locked.id,
-            registration_id=reg.id,
-            kind="hold",
-            amount_cents=-total_fee,
-            idempotency_key=item.idempotency_key,
-        )
+            registration_id=reg_id,
+            state="confirmed" if will_confirm else "waitlisted",
+            waitlist_pos=waitlist_pos,
+            error=None,
+        ))
 
-    # (Optional) enqueue outbox event for realtime updates, e.g. session:{id}
+    # H) create registrations, then their ledger rows
+    if regs:
+        await db.execute(insert(Registration).values(regs))
+    await ledger_repo.apply_ledger_entries(db, entries)
 
-    return AdminPreregResultOut(
-        user_id=item.user_id,
-        registration_id=reg.id,
-        state="confirmed" if will_confirm else "waitlisted",
-        waitlist_pos=None if will_confirm else waitlist_pos,
-        error=None,
-    )
+    return results
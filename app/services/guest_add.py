@@ -165,7 +165,7 @@ async def add_guest_registration(
         await add_outbox_event(
             db,
             channel=f"session:{sess.id}",
-            payload={"type": "registration_waitlisted", "session_id": str(sess.id), "registration_id": str(g.id), "seats": 1, "waitlist_pos": pos},
+            payload={"type": "registration_waitlisted", "session_id": str(sess.id), "registration_id": str(g.id), "host_user_id": str(host_reg.host_user_id), "is_host": False, "seats": 1, "waitlist_pos": pos},
         )
         await db.commit()
         return (g.id, "waitlisted", pos)
@@ -184,7 +184,7 @@ async def add_guest_registration(
     await add_outbox_event(
         db,
         channel=f"session:{sess.id}",
-        payload={"type": "registration_confirmed", "session_id": str(sess.id), "registration_id": str(g.id), "seats": 1},
+        payload={"type": "registration_confirmed", "session_id": str(sess.id), "registration_id": str(g.id), "host_user_id": str(host_reg.host_user_id), "is_host": False, "seats": 1},
     )
     await db.commit()
     return (g.id, "confirmed", None)
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Registration, Session as SessionModel
 from ..repos import ledger_repo as ledger_repo
+from ..repos.outbox import add_outbox_event
 from .tx import begin_serializable_tx
 from .promotion import enqueue_promotion_check
 from .cancellation import _compute_policy  # reuse same policy logic
@@ -21,6 +22,21 @@ class InvalidChange(GuestUpdateError): ...
 class TooLate(GuestUpdateError): ...
 
 
+async def _add_updated_event(db: AsyncSession, reg: Registration) -> None:
+    # keeps session read versions / the participants projection in step with guest edits
+    await add_outbox_event(
+        db,
+        channel=f"session:{reg.session_id}",
+        payload={
+            "type": "registration_updated",
+            "session_id": str(reg.session_id),
+            "registration_id": str(reg.id),
+            "seats": reg.seats,
+            "guest_names": list(reg.guest_names or []),
+        },
+    )
+
+
 async def update_guest_list(
     db: AsyncSession,
     *,
@@ -83,6 +99,7 @@ async def update_guest_list(
     if target_seats == old_seats:
         reg.guest_names = new_guest_names
         await db.flush()
+        await _add_updated_event(db, reg)
         await db.commit()
         return (old_seats, target_seats, 0, 0, reg.state)
 
@@ -133,6 +150,7 @@ async def update_guest_list(
     reg.seats = target_seats
     reg.guest_names = new_guest_names
     await db.flush()
+    await _add_updated_event(db, reg)
     await db.commit()
 
     # if confirmed shrank, free seats may enable promotions
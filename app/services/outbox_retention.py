@@ -0,0 +1,238 @@
+from __future__ import annotations
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+log = logging.getLogger("app.outbox_retention")
+
+PARENT = "events_outbox"
+DEFAULT = "events_outbox_default"  # catch-all for rows whose day has no partition yet
+_PART_RE = re.compile(r"^events_outbox_p(\d{8})$")
+ARCHIVE_CHUNK = 5000
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT}_p{day:%Y%m%d}"
+
+
+async def list_day_partitions(db: AsyncSession) -> list[tuple[str, date]]:
+    """Return [(partition_name, day)] for the daily partitions attached to events_outbox."""
+    rows = await db.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :parent
+            """
+        ),
+        {"parent": PARENT},
+    )
+    out: list[tuple[str, date]] = []
+    for (name,) in rows.all():
+        m = _PART_RE.match(name)
+        if m:
+            out.append((name, datetime.strptime(m.group(1), "%Y%m%d").date()))
+    out.sort(key=lambda t: t[1])
+    return out
+
+
+def _day_range(day: date) -> tuple[str, str]:
+    nxt = day + timedelta(days=1)
+    return f"'{day:%Y-%m-%d} 00:00:00+00'", f"'{nxt:%Y-%m-%d} 00:00:00+00'"
+
+
+def _in_day(day: date) -> str:
+    lo, hi = _day_range(day)
+    return f"created_at >= {lo} AND created_at < {hi}"
+
+
+async def create_day_partition(db: AsyncSession, day: date) -> int:
+    """
+    Create the partition for `day`. If the DEFAULT partition already holds rows of that
+    day (Postgres would reject the CREATE), they are moved into the new table before it
+    is attached; DEFAULT is write-locked meanwhile. Returns the number of rows moved.
+    Caller commits.
+    """
+    name = partition_name(day)
+    lo, hi = _day_range(day)
+    stray = await db.execute(text(f"SELECT 1 FROM {DEFAULT} WHERE {_in_day(day)} LIMIT 1"))
+    if not stray.first():
+        await db.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} FOR VALUES FROM ({lo}) TO ({hi})")
+        )
+        return 0
+    await db.execute(text(f"LOCK TABLE {DEFAULT} IN EXCLUSIVE MODE"))
+    await db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = await db.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT} WHERE {_in_day(day)}"))
+    await db.execute(text(f"DELETE FROM {DEFAULT} WHERE {_in_day(day)}"))
+    await db.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ({lo}) TO ({hi})"))
+    log.warning("moved %d outbox rows from %s into new partition %s", moved.rowcount, DEFAULT, name)
+    return moved.rowcount
+
+
+async def ensure_partitions(db: AsyncSession, *, today: date, ahead_days: int) -> list[str]:
+    """Create missing daily partitions for today .. today+ahead_days. Caller commits."""
+    existing = {name for name, _ in await list_day_partitions(db)}
+    created: list[str] = []
+    for i in range(ahead_days + 1):
+        day = today + timedelta(days=i)
+        name = partition_name(day)
+        if name in existing:
+            continue
+        await create_day_partition(db, day)
+        created.append(name)
+    return created
+
+
+def _write_lines(path: str, lines: list[str]) -> None:
+    with gzip.open(path, "at", encoding="utf-8") as fh:
+        fh.writelines(lines)
+
+
+async def _archive_partition(
+    db: AsyncSession, name: str, archive_dir: str, *, where: str = "TRUE", file_stem: Optional[str] = None
+) -> str:
+    """Stream a partition's rows (matching `where`) to <archive_dir>/<file_stem>.ndjson.gz (via .tmp, then renamed)."""
+    os.makedirs(archive_dir, exist_ok=True)
+    final_path = os.path.join(archive_dir, f"{file_stem or name}.ndjson.gz")
+    tmp_path = final_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    last_id = 0
+    while True:
+        rows = await db.execute(
+            text(
+                f"SELECT id, channel, payload, available_at, sent_at, attempts, error, created_at "
+                f"FROM {name} WHERE ({where}) AND id > :last ORDER BY id LIMIT :n"
+            ),
+            {"last": last_id, "n": ARCHIVE_CHUNK},
+        )
+        chunk = rows.all()
+        if not chunk:
+            break
+        lines = [
+            json.dumps(
+                {
+                    "id": r.id,
+                    "channel": r.channel,
+                    "payload": r.payload,
+                    "available_at": r.available_at.isoformat() if r.available_at else None,
+                    "sent_at": r.sent_at.isoformat() if r.sent_at else None,
+                    "attempts": r.attempts,
+                    "error": r.error,
+                    "created_at": r.created_at.isoformat(),
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+            for r in chunk
+        ]
+        # file I/O off the event loop
+        await asyncio.to_thread(_write_lines, tmp_path, lines)
+        last_id = chunk[-1].id
+
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, final_path)
+    return final_path
+
+
+async def drop_expired_partitions(
+    db: AsyncSession,
+    *,
+    today: date,
+    retention_days: int,
+    archive_dir: Optional[str] = None,
+) -> list[str]:
+    """
+    Drop daily partitions whose whole day is older than the retention window.
+    A partition that still holds unsent rows is kept (and logged) so nothing is lost.
+    Each partition is archived/dropped in its own transaction.
+    """
+    cutoff = today - timedelta(days=retention_days)
+    dropped: list[str] = []
+    for name, day in await list_day_partitions(db):
+        if day >= cutoff:
+            break
+        pending = await db.execute(text(f"SELECT 1 FROM {name} WHERE sent_at IS NULL LIMIT 1"))
+        if pending.first():
+            log.warning("outbox partition %s has unsent rows; keeping it", name)
+            await db.rollback()
+            continue
+        if archive_dir:
+            path = await _archive_partition(db, name, archive_dir)
+            log.info("archived outbox partition %s to %s", name, path)
+        await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        await db.commit()
+        dropped.append(name)
+    return dropped
+
+
+async def drain_default(
+    db: AsyncSession,
+    *,
+    today: date,
+    retention_days: int,
+    archive_dir: Optional[str] = None,
+) -> tuple[list[str], int]:
+    """
+    Empty the DEFAULT partition day by day (it only fills when partitions were not
+    premade, or with history carried over by migration 0020). Days inside the retention
+    window move into their own partition; sent rows of expired days are archived like
+    an expired partition and deleted, unsent ones stay until they are sent.
+    Each day runs in its own transaction. Returns (partitions created, rows deleted).
+    """
+    cutoff = today - timedelta(days=retention_days)
+    days = await db.execute(
+        text(f"SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::date AS day FROM {DEFAULT} ORDER BY day")
+    )
+    created: list[str] = []
+    deleted = 0
+    for (day,) in days.all():
+        if day >= cutoff:
+            await create_day_partition(db, day)
+            created.append(partition_name(day))
+        else:
+            expired = f"{_in_day(day)} AND sent_at IS NOT NULL"
+            first = (await db.execute(text(f"SELECT min(id) FROM {DEFAULT} WHERE {expired}"))).scalar_one()
+            if first is not None:
+                if archive_dir:
+                    path = await _archive_partition(
+                        db, DEFAULT, archive_dir, where=expired, file_stem=f"{DEFAULT}_{day:%Y%m%d}_{first}"
+                    )
+                    log.info("archived expired %s rows of %s to %s", DEFAULT, day, path)
+                res = await db.execute(text(f"DELETE FROM {DEFAULT} WHERE {expired}"))
+                deleted += res.rowcount
+            pending = await db.execute(text(f"SELECT 1 FROM {DEFAULT} WHERE {_in_day(day)} LIMIT 1"))
+            if pending.first():
+                log.warning("outbox default partition has unsent rows for %s; keeping them", day)
+        await db.commit()
+    return created, deleted
+
+
+async def run_maintenance(
+    db: AsyncSession,
+    *,
+    retention_days: int,
+    ahead_days: int,
+    archive_dir: Optional[str] = None,
+) -> tuple[list[str], list[str]]:
+    """Drain DEFAULT, premake upcoming partitions, then drop expired ones. Returns (created, dropped)."""
+    today = datetime.now(timezone.utc).date()
+    created, _ = await drain_default(db, today=today, retention_days=retention_days, archive_dir=archive_dir)
+    created += await ensure_partitions(db, today=today, ahead_days=ahead_days)
+    await db.commit()
+    dropped = await drop_expired_partitions(
+        db, today=today, retention_days=retention_days, archive_dir=archive_dir
+    )
+    return created, dropped
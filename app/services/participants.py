@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..domain.schemas.registration import RegRowOut
+from ..models import Registration, Session as SessionModel, User
+from ..redis_client import redis
+from .session_versions import K_SESSION_VERSIONS
+
+S = get_settings()
+
+# Read model of GET /sessions/{id}/registrations, kept per session in one HASH:
+#   version -> outbox id of the latest session event reflected in `rows`
+#   rows    -> JSON array already in API order; each row carries "v", the version
+#              at which it last changed (drives ?since_version= deltas)
+# The outbox dispatcher XADDs every session event to PARTICIPANTS_STREAM; the
+# participants_projector worker rebuilds the touched sessions from Postgres.
+PARTICIPANTS_STREAM = "sessions:events"
+PARTICIPANTS_GROUP = "participants"
+
+
+def k_participants(session_id) -> str:
+    return f"participants:{session_id}"
+
+
+# Write only if not older than what is stored, so replicas racing on one session
+# (or an on-demand rebuild) can never move the projection backwards.
+_WRITE_LUA = """
+local cur = tonumber(redis.call('HGET', KEYS[1], 'version') or '-1')
+if tonumber(ARGV[1]) < cur then
+  return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'rows', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+_script = None
+
+
+def _write_script():
+    global _script
+    if _script is None:
+        _script = redis.register_script(_WRITE_LUA)
+    return _script
+
+
+async def load_rows(db: AsyncSession, session_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, List[dict]]:
+    """Participant rows for many sessions with one query, in API order (confirmed, then waitlist by pos)."""
+    ids = list(session_ids)
+    if not ids:
+        return {}
+    rows = await db.execute(
+        select(Registration, User.name)
+        .join(User, User.id == Registration.host_user_id)
+        .where(Registration.session_id == sa.any_(
+            sa.bindparam("sids", ids, type_=pg.ARRAY(pg.UUID(as_uuid=True)))
+        ))
+        .order_by(
+            Registration.session_id,
+            (Registration.state != "confirmed").asc(),
+            sa.func.coalesce(Registration.waitlist_pos, 0).asc(),
+            Registration.created_at.asc(),
+        )
+    )
+    out: Dict[uuid.UUID, List[dict]] = {sid: [] for sid in ids}
+    for reg, host_name in rows.all():
+        out[reg.session_id].append(
+            RegRowOut(
+                registration_id=reg.id,
+                host_user_id=reg.host_user_id,
+                host_name=host_name,
+                seats=reg.seats,
+                guest_names=reg.guest_names or [],
+                waitlist_pos=reg.waitlist_pos,
+                state=reg.state,
+                group_key=reg.group_key,
+                is_host=bool(reg.is_host),
+                canceled_at=reg.canceled_at,
+                canceled_from_state=reg.canceled_from_state,
+            ).model_dump(mode="json")
+        )
+    return out
+
+
+def _stamp(rows: List[dict], previous: Optional[str], version: int) -> List[dict]:
+    # keep a row's "v" while its content is unchanged; anything new or different gets `version`
+    before: Dict[str, dict] = {}
+    if previous:
+        for r in json.loads(previous):
+            before[r["registration_id"]] = r
+    for r in rows:
+        old = before.get(r["registration_id"])
+        if old is not None and {k: v for k, v in old.items() if k != "v"} == r:
+            r["v"] = old["v"]
+        else:
+            r["v"] = version
+    return rows
+
+
+async def refresh(db: AsyncSession, versions: Dict[uuid.UUID, int]) -> None:
+    """Rebuild the projection of each session at (at least) the given version: one SQL query, two Redis round trips."""
+    if not versions:
+        return
+    await _write(versions, await load_rows(db, versions))
+
+
+async def _write(versions: Dict[uuid.UUID, int], rows_by_session: Dict[uuid.UUID, List[dict]]) -> None:
+    sids = list(versions)
+
+    pipe = redis.pipeline(transaction=False)
+    for sid in sids:
+        pipe.hget(k_participants(sid), "rows")
+    previous = await pipe.execute()
+
+    script = _write_script()
+    pipe = redis.pipeline(transaction=False)
+    for sid, prev in zip(sids, previous):
+        rows = _stamp(rows_by_session[sid], prev, versions[sid])
+        await script(
+            keys=[k_participants(sid)],
+            args=[versions[sid], json.dumps(rows, separators=(",", ":")), S.PARTICIPANTS_TTL_SEC],
+            client=pipe,
+        )
+    await pipe.execute()
+
+
+async def read_projection(session_id: uuid.UUID) -> Optional[Tuple[int, str]]:
+    """(version, rows JSON) straight from Redis, or None when the session has no projection yet."""
+    version, rows = await redis.hmget(k_participants(session_id), ["version", "rows"])
+    if version is None or rows is None:
+        return None
+    return int(version), rows
+
+
+async def rebuild(db: AsyncSession, session_id: uuid.UUID) -> Optional[Tuple[int, str]]:
+    """
+    On-demand rebuild from Postgres (cache miss, expired key, Redis flush).
+    The version is read before the query, so the rows are at least as new as it.
+    Returns None for unknown sessions (nothing is stored for them).
+    """
+    version = int(await redis.hget(K_SESSION_VERSIONS, str(session_id)) or 0)
+    rows = (await load_rows(db, [session_id]))[session_id]
+    if not rows:
+        exists = await db.scalar(select(sa.literal(True)).where(SessionModel.id == session_id))
+        if not exists:
+            return None
+    await _write({session_id: version}, {session_id: rows})
+    return await read_projection(session_id)
@@ -1,24 +1,97 @@
 from __future__ import annotations
+import math
+import time
 import uuid
+from dataclasses import dataclass
 from typing import Optional
 from fastapi import HTTPException, Request, status
 from ..config import get_settings
 from ..redis_client import redis
+from .ttl_cache import LRUTTLCache, MISSING
 
 S = get_settings()
 
-# ---- generic token counter (fixed window) ----
-async def _hit(key: str, window_sec: int, limit: int) -> None:
-    count = await redis.incr(key)
-    if count == 1:
-        await redis.expire(key, window_sec)
-    if count > limit:
-        ttl = await redis.ttl(key)
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="rate limit exceeded",
-            headers={"Retry-After": str(max(ttl, 1)) if ttl and ttl > 0 else "10"},
-        )
+# ---- GCRA limiter (token bucket as a single "theoretical arrival time" per key) ----
+# A bucket allows `limit` requests in any `window_sec` (burst included) and refills
+# smoothly, so there is no 2x burst at a fixed-window boundary. All buckets of one
+# check are evaluated in a single EVALSHA: if any is over its limit nothing is
+# consumed and the wait per bucket is returned (ms, 0 = fine); otherwise every
+# bucket is charged and an empty list comes back.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local n = #KEYS
+local tats = {}
+local waits = {}
+local denied = false
+for i = 1, n do
+  local interval = tonumber(ARGV[2 * i - 1])
+  local window = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or '0')
+  if tat < now then tat = now end
+  local new_tat = tat + interval
+  local over = new_tat - window - now
+  if over > 0 then
+    denied = true
+    waits[i] = over
+  else
+    waits[i] = 0
+  end
+  tats[i] = new_tat
+end
+if denied then return waits end
+for i = 1, n do
+  redis.call('SET', KEYS[i], tats[i], 'PX', tats[i] - now)
+end
+return {}
+"""
+
+
+@dataclass(frozen=True)
+class Bucket:
+    key: str
+    limit: int
+    window_sec: float
+
+
+_script = None
+# key -> monotonic time before which Redis is known to reject it (in-process pre-filter)
+_blocked: LRUTTLCache[float] = LRUTTLCache(10_000, 60)
+
+
+def _too_many(retry_after_sec: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="rate limit exceeded",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_sec)))},
+    )
+
+
+async def check_limits(*buckets: Bucket) -> None:
+    """Charge one request against every bucket, or raise 429 with the precise Retry-After."""
+    global _script
+    now = time.monotonic()
+    # a rejection only says "not before t", so a local copy of it is always safe to reuse
+    wait = 0.0
+    for b in buckets:
+        until = _blocked.get(b.key)
+        if until is not MISSING and until > now:
+            wait = max(wait, until - now)
+    if wait > 0:
+        raise _too_many(wait)
+
+    if _script is None:
+        _script = redis.register_script(_GCRA_LUA)
+    args: list = []
+    for b in buckets:
+        window_ms = int(b.window_sec * 1000)
+        args += [window_ms // max(b.limit, 1), window_ms]
+    waits_ms = [int(w) for w in await _script(keys=[b.key for b in buckets], args=args)]
+    if waits_ms:
+        for b, w in zip(buckets, waits_ms):
+            if w > 0:
+                _blocked.set(b.key, now + w / 1000)
+        raise _too_many(max(waits_ms) / 1000)
 
 def _client_ip(req: Request) -> str:
     # prefer X-Forwarded-For (first hop), fallback to uvicorn client
@@ -30,17 +103,19 @@ def _client_ip(req: Request) -> str:
 # ---- public helpers ----
 async def limit_otp_request(req: Request) -> None:
     ip = _client_ip(req)
-    await _hit(f"rl:otp:req:ip:{ip}", window_sec=10, limit=S.RL_OTP_REQ_PER_IP_10S)
+    await check_limits(Bucket(f"rl:otp:req:ip:{ip}", S.RL_OTP_REQ_PER_IP_10S, 10))
 
 async def limit_otp_verify(req: Request) -> None:
     ip = _client_ip(req)
-    await _hit(f"rl:otp:verify:ip:{ip}", window_sec=10, limit=S.RL_OTP_VERIFY_PER_IP_10S)
+    await check_limits(Bucket(f"rl:otp:verify:ip:{ip}", S.RL_OTP_VERIFY_PER_IP_10S, 10))
 
 async def limit_registration(req: Request, user_id: uuid.UUID) -> None:
     ip = _client_ip(req)
-    # per-IP and per-user buckets
-    await _hit(f"rl:reg:ip:{ip}", window_sec=10, limit=S.RL_REG_PER_IP_10S)
-    await _hit(f"rl:reg:user:{user_id}", window_sec=10, limit=S.RL_REG_PER_USER_10S)
+    # per-IP and per-user buckets, one round trip
+    await check_limits(
+        Bucket(f"rl:reg:ip:{ip}", S.RL_REG_PER_IP_10S, 10),
+        Bucket(f"rl:reg:user:{user_id}", S.RL_REG_PER_USER_10S, 10),
+    )
 
 # ---- backlog cap for registration queue ----
 def _k_backlog(session_id: uuid.UUID) -> str:
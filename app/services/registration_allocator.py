@@ -161,7 +161,7 @@ async def process_registration_request(
             await add_outbox_event(
                 db,
                 channel=f"session:{session_id}",
-                payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(host_reg.id), "seats": 1},
+                payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(host_reg.id), "host_user_id": str(user_id), "is_host": True, "seats": 1},
             )
         except Exception:
             pass
@@ -182,7 +182,7 @@ async def process_registration_request(
                 await add_outbox_event(
                     db,
                     channel=f"session:{session_id}",
-                    payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(g_reg.id), "seats": 1},
+                    payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(g_reg.id), "host_user_id": str(user_id), "is_host": False, "seats": 1},
                 )
             except Exception:
                 pass
@@ -210,7 +210,7 @@ async def process_registration_request(
             await add_outbox_event(
                 db,
                 channel=f"session:{session_id}",
-                payload={"type": "registration_waitlisted", "session_id": str(session_id), "registration_id": str(host_reg.id), "seats": 1, "waitlist_pos": pos},
+                payload={"type": "registration_waitlisted", "session_id": str(session_id), "registration_id": str(host_reg.id), "host_user_id": str(user_id), "is_host": True, "seats": 1, "waitlist_pos": pos},
             )
         except Exception:
             pass
@@ -236,6 +236,8 @@ async def process_registration_request(
                         "type": "registration_waitlisted",
                         "session_id": str(session_id),
                         "registration_id": str(g_reg.id),
+                        "host_user_id": str(user_id),
+                        "is_host": False,
                         "seats": 1,
                         "waitlist_pos": pos,
                     },
@@ -266,7 +268,7 @@ async def process_registration_request(
         await add_outbox_event(
             db,
             channel=f"session:{session_id}",
-            payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(host_reg.id), "seats": 1},
+            payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(host_reg.id), "host_user_id": str(user_id), "is_host": True, "seats": 1},
         )
     except Exception:
         pass
@@ -293,7 +295,7 @@ async def process_registration_request(
             await add_outbox_event(
                 db,
                 channel=f"session:{session_id}",
-                payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(g_reg.id), "seats": 1},
+                payload={"type": "registration_confirmed", "session_id": str(session_id), "registration_id": str(g_reg.id), "host_user_id": str(user_id), "is_host": False, "seats": 1},
             )
         except Exception:
             pass
@@ -323,6 +325,8 @@ async def process_registration_request(
                         "type": "registration_waitlisted",
                         "session_id": str(session_id),
                         "registration_id": str(g_reg.id),
+                        "host_user_id": str(user_id),
+                        "is_host": False,
                         "seats": 1,
                         "waitlist_pos": pos + idx,
                     },
@@ -1,78 +1,143 @@
 from __future__ import annotations
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import select
+from typing import Optional, Sequence
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql as pg
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Session as SessionModel
 from ..models import Registration
 from ..repos import ledger_repo
-from ..repos.outbox import add_outbox_event
-from .tx import begin_serializable_tx
+from ..repos.outbox import add_outbox_events
+from ..redis_client import redis
 
 from ..observability.metrics import SESSIONS_AUTOCLOSED
 
-async def close_due_sessions(db: AsyncSession, *, batch: int = 200) -> list[str]:
+CLOSE_AFTER = timedelta(hours=2)
+
+# Delay queue: ZSET session_id -> epoch seconds at which the session is due to close
+K_CLOSE_QUEUE = "sessions:close_at"
+
+
+def close_due_at(starts_at: datetime) -> float:
+    return (starts_at + CLOSE_AFTER).timestamp()
+
+
+async def sync_close_queue(sess: SessionModel) -> None:
+    """Keep the delay queue in line with a session row; call after the write commits."""
+    if sess.status == "scheduled":
+        await redis.zadd(K_CLOSE_QUEUE, {str(sess.id): close_due_at(sess.starts_at)})
+    else:
+        await redis.zrem(K_CLOSE_QUEUE, str(sess.id))
+
+
+async def backfill_close_queue(db: AsyncSession) -> int:
+    """Add scheduled sessions missing from the delay queue (existing entries untouched)."""
+    rows = await db.execute(
+        select(SessionModel.id, SessionModel.starts_at).where(SessionModel.status == "scheduled")
+    )
+    mapping = {str(sid): close_due_at(starts_at) for sid, starts_at in rows.all()}
+    if not mapping:
+        return 0
+    return int(await redis.zadd(K_CLOSE_QUEUE, mapping, nx=True))
+
+
+async def close_due_sessions(
+    db: AsyncSession,
+    *,
+    batch: int = 200,
+    session_ids: Optional[Sequence[uuid.UUID]] = None,
+) -> list[str]:
     """
     Close at most `batch` sessions whose starts_at are at least 2 hours in the past
     (starts_at + 2h <= now) and status == 'scheduled'. Returns list of session_id
-    strings closed in this run.
+    strings closed in this run. `session_ids` restricts the candidates (delay queue).
+
+    Set-based, in one short READ COMMITTED transaction with a fixed number of statements:
+    close sessions (UPDATE ... RETURNING, SKIP LOCKED), cancel their waitlist (one UPDATE),
+    release the holds (bulk ledger insert + one wallet UPDATE), one multi-row outbox insert.
+    Row locks replace serializable isolation: a registration or cancellation racing with
+    the close waits on the same rows and re-checks their state afterwards. Objects already
+    loaded in `db` are kept in sync (synchronize_session="fetch" rides on RETURNING).
     """
     now = datetime.now(timezone.utc)
-    close_cutoff = now - timedelta(hours=2)
-    closed: list[str] = []
+    close_cutoff = now - CLOSE_AFTER
 
-    # Start a fresh tx; SELECT ... FOR UPDATE SKIP LOCKED to avoid races with admins
-    await begin_serializable_tx(db)
+    # End any auto-begun tx from earlier reads on the same session
+    if db.in_transaction():
+        await db.rollback()
 
-    rows = await db.execute(
-        select(SessionModel)
+    due = (
+        select(SessionModel.id)
         .where(SessionModel.status == "scheduled", SessionModel.starts_at <= close_cutoff)
         .order_by(SessionModel.starts_at.asc())
         .limit(batch)
         .with_for_update(skip_locked=True)
     )
-    sessions = list(rows.scalars().all())
+    if session_ids is not None:
+        due = due.where(SessionModel.id == sa.any_(
+            sa.bindparam("ids", list(session_ids), type_=pg.ARRAY(pg.UUID(as_uuid=True)))
+        ))
+    rows = await db.execute(
+        update(SessionModel)
+        .where(SessionModel.id.in_(due))
+        .values(status="closed")
+        .returning(SessionModel.id, SessionModel.fee_cents)
+        .execution_options(synchronize_session="fetch")
+    )
+    sessions = rows.all()
     if not sessions:
         await db.rollback()
-        return closed
-
-    for s in sessions:
-        # Transition allowed by our lifecycle rules (scheduled -> closed)
-        s.status = "closed"
-        SESSIONS_AUTOCLOSED.inc()
-        closed.append(str(s.id))
-
-        # Refund/release any waitlisted holds; waitlists are moot once closed.
-        waitlisted = (
-            await db.execute(
-                select(Registration)
-                .where(Registration.session_id == s.id, Registration.state == "waitlisted")
-                .with_for_update()
-            )
-        ).scalars().all()
-
-        for reg in waitlisted:
-            hold_cents = reg.seats * s.fee_cents
-            await ledger_repo.apply_ledger_entry(
-                db,
-                user_id=reg.host_user_id,
-                kind="hold_release",
-                amount_cents=-hold_cents,  # decrease holds
-                session_id=s.id,
-                registration_id=reg.id,
-                idempotency_key=f"release_auto_close:{reg.id}",
+        return []
+    fee_by_session = {sid: fee for sid, fee in sessions}
+
+    # Refund/release any waitlisted holds; waitlists are moot once closed.
+    canceled = (
+        await db.execute(
+            update(Registration)
+            .where(
+                Registration.session_id == sa.any_(
+                    sa.bindparam("sids", list(fee_by_session), type_=pg.ARRAY(pg.UUID(as_uuid=True)))
+                ),
+                Registration.state == "waitlisted",
             )
-            reg.state = "canceled"
-            reg.canceled_at = now
-            reg.waitlist_pos = None
-
-        # Outbox: notify listeners
-        await add_outbox_event(
-            db,
-            channel=f"session:{s.id}",
-            payload={"type": "session_status_changed", "session_id": str(s.id), "old_status": "scheduled", "new_status": "closed"},
+            .values(state="canceled", canceled_at=now, waitlist_pos=None, canceled_from_state="waitlisted")
+            .returning(Registration.id, Registration.session_id, Registration.host_user_id, Registration.seats)
+            .execution_options(synchronize_session="fetch")
         )
+    ).all()
+
+    await ledger_repo.apply_ledger_entries(
+        db,
+        [
+            {
+                "user_id": reg.host_user_id,
+                "kind": "hold_release",
+                "amount_cents": -(reg.seats * fee_by_session[reg.session_id]),  # decrease holds
+                "session_id": reg.session_id,
+                "registration_id": reg.id,
+                "idempotency_key": f"release_auto_close:{reg.id}",
+            }
+            for reg in canceled
+            if fee_by_session[reg.session_id] > 0
+        ],
+    )
+
+    # Outbox: notify listeners
+    await add_outbox_events(
+        db,
+        [
+            (
+                f"session:{sid}",
+                {"type": "session_status_changed", "session_id": str(sid), "old_status": "scheduled", "new_status": "closed"},
+            )
+            for sid in fee_by_session
+        ],
+    )
 
-    await db.flush()
     await db.commit()
-    return closed
+    SESSIONS_AUTOCLOSED.inc(len(sessions))
+    return [str(sid) for sid in fee_by_session]
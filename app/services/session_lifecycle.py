@@ -11,7 +11,7 @@ from ..models import Session as SessionModel, Registration
 from ..repos import ledger_repo as ledger_repo
 from .tx import begin_serializable_tx
 from .promotion import enqueue_promotion_check
-from ..repos.outbox import add_outbox_event
+from ..repos.outbox import add_outbox_event, add_outbox_events
 
 
 class LifecycleError(Exception): ...
@@ -32,7 +32,8 @@ async def admin_update_session(
       - capacity cannot drop below confirmed seats
       - status transitions enforced
       - capacity increase -> enqueue promotion
-      - status=canceled -> bulk cancel (refund/release) all active regs
+      - status=canceled -> bulk cancel (refund/release) all active regs: one UPDATE,
+        bulk ledger writes, one outbox insert with a result per registration + a summary
     Returns the updated session row.
     """
     await begin_serializable_tx(db)
@@ -62,6 +63,8 @@ async def admin_update_session(
 
     # Status transition rules
     old_status = sess.status
+    # the bulk UPDATE below synchronizes `sess`, so keep what the capacity was before it
+    old_capacity = sess.capacity
     if new_status is not None and new_status != old_status:
         if old_status == "canceled":
             await db.rollback()
@@ -102,50 +105,61 @@ async def admin_update_session(
     if new_status == "canceled":
         now = datetime.now(timezone.utc)
 
-        # Fetch all active regs
+        # One UPDATE for all active regs; RETURNING gives what each one was before
         regs = (await db.execute(
-            select(Registration)
+            update(Registration)
             .where(Registration.session_id == session_id, Registration.state != "canceled")
-            .with_for_update()
-        )).scalars().all()
-
+            .values(state="canceled", canceled_at=now, canceled_from_state=Registration.state)
+            .returning(Registration.id, Registration.host_user_id, Registration.seats, Registration.canceled_from_state)
+            .execution_options(synchronize_session="fetch")
+        )).all()
+
+        entries = []
+        events = []
+        refunded = released = 0
         for reg in regs:
             total_fee = reg.seats * sess.fee_cents
-            if reg.state == "confirmed":
+            result = {"refund_cents": 0, "released_cents": 0}
+            if total_fee > 0 and reg.canceled_from_state == "confirmed":
                 # Full refund (positive), no penalty on session cancel
-                await ledger_repo.apply_ledger_entry(
-                    db,
-                    user_id=reg.host_user_id,
-                    kind="refund",
-                    amount_cents=total_fee,
-                    session_id=sess.id,
-                    registration_id=reg.id,
-                    idempotency_key=f"refund_sess_cancel:{reg.id}",
-                )
                 # nothing to release: confirmed entries already released their hold earlier
-            elif reg.state == "waitlisted":
+                entries.append({
+                    "user_id": reg.host_user_id, "kind": "refund", "amount_cents": total_fee,
+                    "session_id": sess.id, "registration_id": reg.id,
+                    "idempotency_key": f"refund_sess_cancel:{reg.id}",
+                })
+                result["refund_cents"] = total_fee
+                refunded += total_fee
+            elif total_fee > 0 and reg.canceled_from_state == "waitlisted":
                 # Release the outstanding hold
-                await ledger_repo.apply_ledger_entry(
-                    db,
-                    user_id=reg.host_user_id,
-                    kind="hold_release",
-                    amount_cents=-total_fee,  # decrease holds
-                    session_id=sess.id,
-                    registration_id=reg.id,
-                    idempotency_key=f"release_sess_cancel:{reg.id}",
-                )
-
-            reg.state = "canceled"
-            reg.canceled_at = now
-            
-        await db.flush()
-
-        await add_outbox_event(
-            db,
-            channel=f"session:{session_id}",
-            payload={"type": "session_canceled", "session_id": str(session_id)},
-        )
-        
+                entries.append({
+                    "user_id": reg.host_user_id, "kind": "hold_release", "amount_cents": -total_fee,
+                    "session_id": sess.id, "registration_id": reg.id,
+                    "idempotency_key": f"release_sess_cancel:{reg.id}",
+                })
+                result["released_cents"] = total_fee
+                released += total_fee
+            # per-user result, so each client can update its own row live
+            events.append((f"session:{session_id}", {
+                "type": "registration_canceled",
+                "session_id": str(session_id),
+                "registration_id": str(reg.id),
+                "host_user_id": str(reg.host_user_id),
+                "seats": reg.seats,
+                "reason": "session_canceled",
+                **result,
+                "ts": now.isoformat(),
+            }))
+        await ledger_repo.apply_ledger_entries(db, entries)
+
+        events.append((f"session:{session_id}", {
+            "type": "session_canceled",
+            "session_id": str(session_id),
+            "registrations_canceled": len(regs),
+            "refunded_cents": refunded,
+            "released_cents": released,
+        }))
+        await add_outbox_events(db, events)
 
         await db.commit()
         # No promotions when canceled
@@ -156,34 +170,31 @@ async def admin_update_session(
         now = datetime.now(timezone.utc)
 
         waitlisted = (await db.execute(
-            select(Registration)
+            update(Registration)
             .where(Registration.session_id == session_id, Registration.state == "waitlisted")
-            .with_for_update()
-        )).scalars().all()
+            .values(state="canceled", canceled_at=now, waitlist_pos=None, canceled_from_state="waitlisted")
+            .returning(Registration.id, Registration.host_user_id, Registration.seats)
+            .execution_options(synchronize_session="fetch")
+        )).all()
+
+        if sess.fee_cents > 0:
+            await ledger_repo.apply_ledger_entries(db, [
+                {
+                    "user_id": reg.host_user_id, "kind": "hold_release",
+                    "amount_cents": -(reg.seats * sess.fee_cents),  # decrease holds
+                    "session_id": sess.id, "registration_id": reg.id,
+                    "idempotency_key": f"release_close:{reg.id}",
+                }
+                for reg in waitlisted
+            ])
 
-        for reg in waitlisted:
-            total_fee = reg.seats * sess.fee_cents
-            await ledger_repo.apply_ledger_entry(
-                db,
-                user_id=reg.host_user_id,
-                kind="hold_release",
-                amount_cents=-total_fee,  # decrease holds
-                session_id=sess.id,
-                registration_id=reg.id,
-                idempotency_key=f"release_close:{reg.id}",
-            )
-            reg.state = "canceled"
-            reg.canceled_at = now
-            reg.waitlist_pos = None
-
-        await db.flush()
         await db.commit()
         return sess
 
     # 2) Capacity increased while still scheduled → enqueue promotion
     if new_capacity is not None and new_capacity > confirmed and (new_status or old_status) == "scheduled":
         
-        if new_capacity is not None and new_capacity != sess.capacity:
+        if new_capacity != old_capacity:
             await add_outbox_event(
                 db,
                 channel=f"session:{session_id}",
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Session as SessionModel
+from ..redis_client import redis
+
+S = get_settings()
+
+# ZSET session_id -> epoch seconds at which the pre-session reminder goes out
+K_REMINDERS = "sms:reminders"
+
+
+def reminder_due_at(starts_at: datetime) -> float:
+    return (starts_at - timedelta(hours=S.SMS_REMINDER_HOURS)).timestamp()
+
+
+async def sync_session_reminder(sess: SessionModel) -> None:
+    """
+    Keep the reminder schedule in line with a session row; call after the write commits.
+    Scheduled sessions that have not started get (or move) their entry, anything else is dropped.
+    A session created inside the reminder window is reminded right away.
+    """
+    if S.SMS_REMINDER_HOURS <= 0:
+        return
+    if sess.status != "scheduled" or sess.starts_at <= datetime.now(timezone.utc):
+        await redis.zrem(K_REMINDERS, str(sess.id))
+        return
+    await redis.zadd(K_REMINDERS, {str(sess.id): max(time.time(), reminder_due_at(sess.starts_at))})
+
+
+async def backfill_reminders(db: AsyncSession, *, now: Optional[datetime] = None) -> int:
+    """
+    Add upcoming scheduled sessions that are missing from the schedule (e.g. created
+    before reminders existed). Existing entries are left alone. Returns how many were added.
+    """
+    if S.SMS_REMINDER_HOURS <= 0:
+        return 0
+    now = now or datetime.now(timezone.utc)
+    rows = await db.execute(
+        select(SessionModel.id, SessionModel.starts_at)
+        .where(SessionModel.status == "scheduled", SessionModel.starts_at > now)
+    )
+    mapping = {
+        str(sid): max(now.timestamp(), reminder_due_at(starts_at))
+        for sid, starts_at in rows.all()
+    }
+    if not mapping:
+        return 0
+    return int(await redis.zadd(K_REMINDERS, mapping, nx=True))
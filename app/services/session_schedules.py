@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from ..models import Session as SessionModel
+from .session_auto_close import sync_close_queue
+from .session_reminders import sync_session_reminder
+
+
+async def sync_session_schedules(sess: SessionModel) -> None:
+    """
+    Refresh every Redis schedule derived from a session row (close delay queue,
+    pre-session SMS reminder). Call after the create/reschedule/status change commits.
+    """
+    await sync_close_queue(sess)
+    await sync_session_reminder(sess)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..domain.schemas.registration import AdminPreregItemIn, AdminPreregResultOut
+from ..models import Session as SessionModel, SessionSeries
+from ..repos.outbox import add_outbox_events
+from .admin_prereg_service import prereg_batch_on_create
+
+
+class SeriesNotFound(Exception):
+    pass
+
+
+def occurrences(
+    *,
+    timezone_name: str,
+    weekdays: Sequence[int],
+    local_time: time,
+    starts_on: date,
+    exceptions: Sequence[date] = (),
+    after: datetime,
+    count: int,
+) -> list[datetime]:
+    """
+    The next `count` start times (UTC) of a weekly rule strictly after `after`.
+    The rule lives in local wall-clock time, so a 19:00 session stays at 19:00 across DST;
+    `exceptions` are local dates to skip.
+    """
+    tz = ZoneInfo(timezone_name)
+    days = set(weekdays)
+    skip = set(exceptions)
+    if not days or count <= 0:
+        return []
+
+    out: list[datetime] = []
+    day = max(starts_on, after.astimezone(tz).date())
+    while len(out) < count:
+        if day.weekday() in days and day not in skip:
+            starts_at = datetime.combine(day, local_time, tzinfo=tz).astimezone(timezone.utc)
+            if starts_at > after:
+                out.append(starts_at)
+        day += timedelta(days=1)
+    return out
+
+
+def standing_items(series: SessionSeries) -> list[AdminPreregItemIn]:
+    # idempotency keys are per session (prereg:{session}:{user}), never shared across the series
+    return [
+        AdminPreregItemIn(user_id=p["user_id"], seats=p["seats"], guest_names=p.get("guest_names") or [])
+        for p in series.preregistrations
+    ]
+
+
+async def create_series(
+    db: AsyncSession,
+    *,
+    title: Optional[str],
+    timezone_name: str,
+    weekdays: Sequence[int],
+    local_time: time,
+    starts_on: date,
+    exceptions: Sequence[date],
+    capacity: int,
+    fee_cents: int,
+    preregistrations: Sequence[AdminPreregItemIn],
+) -> SessionSeries:
+    series = SessionSeries(
+        id=uuid.uuid4(),
+        title=title,
+        timezone=timezone_name,
+        weekdays=sorted(set(weekdays)),
+        local_time=local_time,
+        starts_on=starts_on,
+        exceptions=sorted(set(exceptions)),
+        capacity=capacity,
+        fee_cents=fee_cents,
+        preregistrations=[
+            {"user_id": str(item.user_id), "seats": item.seats, "guest_names": item.guest_names}
+            for item in preregistrations
+        ],
+    )
+    db.add(series)
+    await db.flush()
+    return series
+
+
+async def materialize_series(
+    db: AsyncSession,
+    series: SessionSeries,
+    *,
+    count: int,
+    now: Optional[datetime] = None,
+) -> list[tuple[SessionModel, list[AdminPreregResultOut]]]:
+    """
+    Create the next `count` sessions of a series after the latest one it already has
+    (or after now), then run the standing prereg list against each of them.
+
+    Sessions go in with one multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING
+    (unique (series_id, starts_at), so a concurrent or repeated call cannot create
+    duplicates); each session's preregistrations are one batch (see
+    prereg_batch_on_create). Sessions are processed in start order, so when funds
+    run out the earliest sessions are the ones that get the seats. Caller commits,
+    then syncs the Redis schedules of the returned sessions.
+    """
+    now = now or datetime.now(timezone.utc)
+    last = (
+        await db.execute(select(func.max(SessionModel.starts_at)).where(SessionModel.series_id == series.id))
+    ).scalar_one()
+    starts = occurrences(
+        timezone_name=series.timezone,
+        weekdays=series.weekdays,
+        local_time=series.local_time,
+        starts_on=series.starts_on,
+        exceptions=series.exceptions,
+        after=max(last, now) if last is not None else now,
+        count=count,
+    )
+    if not starts:
+        return []
+
+    stmt = (
+        pg_insert(SessionModel)
+        .on_conflict_do_nothing(
+            index_elements=[SessionModel.series_id, SessionModel.starts_at],
+            index_where=SessionModel.series_id.isnot(None),
+        )
+        .returning(SessionModel)
+    )
+    created = (
+        await db.scalars(
+            stmt,
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "title": series.title,
+                    "starts_at": starts_at,
+                    "timezone": series.timezone,
+                    "capacity": series.capacity,
+                    "fee_cents": series.fee_cents,
+                    "status": "scheduled",
+                    "series_id": series.id,
+                }
+                for starts_at in starts
+            ],
+        )
+    ).all()
+    created = sorted(created, key=lambda s: s.starts_at)
+
+    items = standing_items(series)
+    out: list[tuple[SessionModel, list[AdminPreregResultOut]]] = []
+    for s in created:
+        out.append((s, await prereg_batch_on_create(db, session=s, items=items)))
+
+    await add_outbox_events(
+        db,
+        [(f"session:{s.id}", {"type": "session_created", "session_id": str(s.id)}) for s in created],
+    )
+    return out
+
+
+async def lock_series(db: AsyncSession, series_id: uuid.UUID) -> SessionSeries:
+    # serializes materialize calls for one series (each one starts after the latest session)
+    series = await db.get(SessionSeries, series_id, with_for_update=True, populate_existing=True)
+    if series is None:
+        raise SeriesNotFound()
+    return series
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import uuid
+from typing import Hashable, Optional
+
+from ..config import get_settings
+from ..redis_client import redis
+from .ttl_cache import LRUTTLCache
+
+S = get_settings()
+
+# Versions of public session reads, maintained by the outbox dispatcher in the same
+# pipeline as the publish. A session's version is the id of its latest published
+# "session:{id}" outbox event: every write that changes a session's public view already
+# writes one in its transaction, under the session row lock, so ids follow commit order.
+K_SESSION_VERSIONS = "sessions:versions"   # HASH session_id -> outbox id
+K_LIST_VERSION = "sessions:list_version"   # INCR per dispatcher batch carrying session events
+
+SESSION_CHANNEL_PREFIX = "session:"
+
+# Rendered JSON bodies keyed by (resource, version); a new version is simply a new key.
+_bodies: LRUTTLCache[bytes] = LRUTTLCache(S.SESSION_CACHE_SIZE, S.SESSION_CACHE_TTL_SEC)
+
+
+def session_of_channel(channel: str) -> Optional[str]:
+    if channel.startswith(SESSION_CHANNEL_PREFIX):
+        return channel[len(SESSION_CHANNEL_PREFIX):]
+    return None
+
+
+async def session_version(session_id: uuid.UUID) -> Optional[str]:
+    """Current version of one session, or None if none was published yet (serve uncached)."""
+    return await redis.hget(K_SESSION_VERSIONS, str(session_id))
+
+
+async def list_version() -> Optional[str]:
+    return await redis.get(K_LIST_VERSION)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in if_none_match.split(","))
+
+
+def cached_body(key: Hashable):
+    return _bodies.get(key)
+
+
+def cache_body(key: Hashable, body: bytes) -> None:
+    _bodies.set(key, body)
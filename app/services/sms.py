@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
 from twilio.base.exceptions import TwilioException
 from twilio.rest import Client
 
 from ..config import get_settings
+from ..observability.metrics import SMS_QUEUE_DEPTH, SMS_SEND_LATENCY, SMS_SEND_FAILURES, SMS_SENT
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,9 @@ class TwilioSMSService:
         self._from_number: Optional[str] = settings.TWILIO_FROM_NUMBER
         if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and self._from_number:
             self._client: Optional[Client] = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+            if settings.TWILIO_API_BASE_URL:
+                # e.g. the local fake (scripts/fake_twilio.py) for offline benchmarks
+                self._client.api.base_url = settings.TWILIO_API_BASE_URL
         else:
             self._client = None
             missing = [
@@ -33,6 +39,10 @@ class TwilioSMSService:
             ]
             if missing:
                 logger.info("Twilio SMS disabled; missing settings: %s", ", ".join(missing))
+        # Dedicated threads for the blocking Twilio client (never the loop's default executor)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.SMS_SEND_CONCURRENCY), thread_name_prefix="twilio-send"
+        )
 
     @property
     def enabled(self) -> bool:
@@ -47,7 +57,7 @@ class TwilioSMSService:
         loop = asyncio.get_running_loop()
         try:
             await loop.run_in_executor(
-                None,
+                self._executor,
                 lambda: self._client.messages.create(  # type: ignore[attr-defined]
                     from_=self._from_number,
                     to=to,
@@ -60,4 +70,150 @@ class TwilioSMSService:
             return False
 
 
+class TokenBucket:
+    """Async token bucket: `rate` tokens/sec, up to `burst` banked. Single event loop only."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class PerKeySpacer:
+    """Enforces a minimum interval between operations for the same key (e.g. one phone number)."""
+
+    def __init__(self, interval_sec: float) -> None:
+        self.interval = interval_sec
+        self._next_at: Dict[str, float] = {}
+
+    async def wait(self, key: str) -> None:
+        if self.interval <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_at.get(key, 0.0))
+        # reserve before sleeping so concurrent senders queue up behind each other
+        self._next_at[key] = slot + self.interval
+        if len(self._next_at) > 10_000:
+            self._next_at = {k: t for k, t in self._next_at.items() if t > now}
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+OnStart = Callable[[], Awaitable[None]]
+
+
+class SmsSenderPool:
+    """
+    Bounded pool of sender tasks in front of TwilioSMSService.
+
+    - `concurrency` sends in flight at most (matches the Twilio thread pool)
+    - global token bucket sized to the account's messages/sec
+    - separate spacing per destination number
+    - `submit` awaits the result; it blocks when the queue is full (backpressure)
+    - `on_start` runs once the send is actually due (after queueing and rate limiting);
+      raising from it cancels the send and fails the submit
+    """
+
+    def __init__(
+        self,
+        service: TwilioSMSService,
+        *,
+        concurrency: int,
+        rate_per_sec: float,
+        burst: int,
+        per_phone_interval_sec: float,
+        queue_max: int,
+    ) -> None:
+        self.service = service
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.per_phone = PerKeySpacer(per_phone_interval_sec)
+        self.queue_max = queue_max
+        self._queue: Optional[asyncio.Queue[Tuple[str, str, Optional[OnStart], asyncio.Future]]] = None
+        self._workers: list[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def backlog_sec(self) -> float:
+        """Rough wait for a send submitted now: queued sends drained at the account rate."""
+        return (self._queue.qsize() if self._queue is not None else 0) / self.bucket.rate
+
+    async def submit(self, *, to: str, body: str, on_start: Optional[OnStart] = None) -> bool:
+        self._ensure_started()
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((to, body, on_start, fut))
+        SMS_QUEUE_DEPTH.set(self._queue.qsize())
+        return await fut
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            to, body, on_start, fut = await self._queue.get()
+            SMS_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self.per_phone.wait(to)
+                await self.bucket.acquire()
+                if on_start is not None:
+                    await on_start()
+                t0 = time.perf_counter()
+                try:
+                    ok = await self.service.send_sms(to=to, body=body)
+                finally:
+                    SMS_SEND_LATENCY.observe(time.perf_counter() - t0)
+                (SMS_SENT if ok else SMS_SEND_FAILURES).inc()
+                if not fut.done():
+                    fut.set_result(ok)
+            except asyncio.CancelledError:
+                if not fut.done():
+                    fut.cancel()
+                raise
+            except Exception as exc:
+                SMS_SEND_FAILURES.inc()
+                if not fut.done():
+                    fut.set_exception(exc)
+            finally:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        """Cancel the workers; sends still queued or in flight fail with CancelledError."""
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _to, _body, _on_start, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.cancel()
+        self._workers = []
+        self._queue = None
+
+
 sms_service = TwilioSMSService()
+
+_S = get_settings()
+sms_sender = SmsSenderPool(
+    sms_service,
+    concurrency=_S.SMS_SEND_CONCURRENCY,
+    rate_per_sec=_S.SMS_RATE_PER_SEC,
+    burst=_S.SMS_RATE_BURST,
+    per_phone_interval_sec=_S.SMS_PER_PHONE_INTERVAL_SEC,
+    queue_max=_S.SMS_SEND_QUEUE_MAX,
+)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from typing import Any, Dict
+
+# Durable hand-off from the outbox dispatcher to the SMS notifier.
+# The dispatcher XADDs SMS-worthy events here in the same pipeline as the
+# pub/sub publish; notifiers consume them through a consumer group.
+SMS_STREAM = "sms:events"
+SMS_DEAD_STREAM = "sms:events:dead"
+SMS_GROUP = "sms"
+
+SMS_EVENT_TYPES = frozenset({
+    "registration_confirmed",
+    "registration_promoted",
+    "registration_waitlisted",
+})
+
+
+def is_sms_event(payload: Dict[str, Any]) -> bool:
+    return isinstance(payload, dict) and payload.get("type") in SMS_EVENT_TYPES
+
+
+def stream_fields(outbox_id: int, channel: str, payload_json: str) -> Dict[str, str]:
+    return {"outbox_id": str(outbox_id), "channel": channel, "payload": payload_json}
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Iterable, TypeVar
+
+V = TypeVar("V")
+
+MISSING: Any = object()
+
+
+class LRUTTLCache(Generic[V]):
+    """
+    Small in-process LRU with a per-entry TTL. Not thread-safe; meant for a
+    single asyncio loop. `get` returns MISSING (not None) on a miss so that
+    None can be cached as a value.
+    """
+
+    def __init__(self, maxsize: int, ttl_sec: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> V:
+        item = self._data.get(key)
+        if item is None:
+            return MISSING
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_sec, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def missing(self, keys: Iterable[Hashable]) -> list:
+        """Keys (deduplicated, in order) that are not cached or have expired."""
+        out, seen = [], set()
+        for k in keys:
+            if k in seen:
+                continue
+            seen.add(k)
+            if self.get(k) is MISSING:
+                out.append(k)
+        return out
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -44,6 +44,7 @@ async def promote_waitlist_fifo(
         return []
 
     promoted: list[tuple[uuid.UUID, int]] = []
+    promoted_meta: dict[uuid.UUID, tuple[uuid.UUID, bool]] = {}  # reg_id -> (host_user_id, is_host)
 
     # Loop: pick head of waitlist (lowest waitlist_pos) each iteration
     while remaining > 0:
@@ -113,6 +114,7 @@ async def promote_waitlist_fifo(
             )
 
         promoted.append((head.id, head.seats))
+        promoted_meta[head.id] = (head.host_user_id, bool(head.is_host))
         remaining -= head.seats
 
 
@@ -123,6 +125,7 @@ async def promote_waitlist_fifo(
     if promoted:
         # publish one outbox event per promoted registration (inside the tx)
         for reg_id, seats_prom in promoted:
+            host_user_id, is_host = promoted_meta[reg_id]
             await add_outbox_event(
                 db,
                 channel=f"session:{session_id}",
@@ -130,7 +133,8 @@ async def promote_waitlist_fifo(
                     "type": "registration_promoted",
                     "session_id": str(session_id),
                     "registration_id": str(reg_id),
-                    # you can fetch host_user_id if needed, but it's not required for the UI refresh
+                    "host_user_id": str(host_user_id),
+                    "is_host": is_host,
                     "seats": seats_prom,
                     "ts": datetime.now(timezone.utc).isoformat(),
                 },
@@ -0,0 +1,235 @@
+from __future__ import annotations
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Wallet
+from ..repos.ledger_checkpoints import settled_upto
+from ..repos.ledger_repo import HOLD_KINDS
+from ..repos.wallet_totals import add_delta
+from ..repos.wallets import ensure_and_lock_wallet
+
+log = logging.getLogger(__name__)
+
+# Incremental wallet <-> ledger reconciliation.
+# wallet_shadows accumulates every ledger row up to the "wallet_reconcile" cursor;
+# a pass folds in only the rows past it (one grouped INSERT .. ON CONFLICT), then
+# compares the wallets it touched, plus a small rolling slice of all wallets, with
+# shadow + rows beyond the cursor. The comparison is a single statement, so the
+# wallet and the ledger are read from the same snapshot.
+CURSOR = "wallet_reconcile"
+
+_UUIDS = pg.ARRAY(pg.UUID(as_uuid=True))
+_KINDS = pg.ARRAY(sa.Text)
+
+_ENSURE_CURSOR = text("INSERT INTO ledger_cursors (name) VALUES (:name) ON CONFLICT (name) DO NOTHING")
+
+_FOLD = text(
+    """
+    INSERT INTO wallet_shadows AS s (user_id, posted_cents, holds_cents)
+    SELECT user_id,
+           sum(CASE WHEN kind = ANY(:hold_kinds) THEN 0 ELSE amount_cents END),
+           sum(CASE WHEN kind = ANY(:hold_kinds) THEN amount_cents ELSE 0 END)
+    FROM ledger_entries
+    WHERE id > :after AND id <= :upto
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET posted_cents = s.posted_cents + EXCLUDED.posted_cents,
+        holds_cents  = s.holds_cents  + EXCLUDED.holds_cents
+    RETURNING user_id
+    """
+).bindparams(sa.bindparam("hold_kinds", type_=_KINDS))
+
+_COMPARE = text(
+    """
+    SELECT w.user_id,
+           w.posted_cents - coalesce(s.posted_cents, 0) - coalesce(t.posted, 0) AS drift_posted,
+           w.holds_cents  - coalesce(s.holds_cents, 0)  - coalesce(t.holds, 0)  AS drift_holds,
+           s.mismatch_since IS NOT NULL AS was_flagged
+    FROM wallets w
+    LEFT JOIN wallet_shadows s ON s.user_id = w.user_id
+    LEFT JOIN LATERAL (
+        SELECT sum(CASE WHEN e.kind = ANY(:hold_kinds) THEN 0 ELSE e.amount_cents END) AS posted,
+               sum(CASE WHEN e.kind = ANY(:hold_kinds) THEN e.amount_cents ELSE 0 END) AS holds
+        FROM ledger_entries e
+        WHERE e.user_id = w.user_id AND e.id > :upto
+    ) t ON true
+    WHERE w.user_id = ANY(:uids)
+    """
+).bindparams(sa.bindparam("uids", type_=_UUIDS), sa.bindparam("hold_kinds", type_=_KINDS))
+
+_RECORD = text(
+    """
+    INSERT INTO wallet_shadows AS s (user_id, drift_posted_cents, drift_holds_cents, mismatch_since, checked_at)
+    SELECT d.user_id, d.dp, d.dh, CASE WHEN d.dp <> 0 OR d.dh <> 0 THEN now() END, now()
+    FROM unnest(:uids, :dp, :dh) AS d(user_id, dp, dh)
+    ON CONFLICT (user_id) DO UPDATE
+    SET drift_posted_cents = EXCLUDED.drift_posted_cents,
+        drift_holds_cents  = EXCLUDED.drift_holds_cents,
+        mismatch_since     = CASE WHEN EXCLUDED.mismatch_since IS NULL THEN NULL
+                                  ELSE coalesce(s.mismatch_since, EXCLUDED.mismatch_since) END,
+        checked_at         = now()
+    """
+).bindparams(
+    sa.bindparam("uids", type_=_UUIDS),
+    sa.bindparam("dp", type_=pg.ARRAY(sa.BigInteger)),
+    sa.bindparam("dh", type_=pg.ARRAY(sa.BigInteger)),
+)
+
+_DRIFT_TOTALS = text(
+    """
+    SELECT count(*), coalesce(sum(abs(drift_posted_cents)), 0), coalesce(sum(abs(drift_holds_cents)), 0)
+    FROM wallet_shadows
+    WHERE mismatch_since IS NOT NULL
+    """
+)
+
+
+@dataclass
+class ReconcileResult:
+    after: int                                 # cursor before this pass
+    upto: int                                  # cursor after this pass
+    lag_ids: int                               # ledger ids not folded in yet
+    checked: int                               # wallets compared
+    sweep_last: Optional[uuid.UUID]            # resume the rolling sweep after this user (None = wrap)
+    newly_flagged: List[Tuple[uuid.UUID, int, int]] = field(default_factory=list)  # (user, posted, holds drift)
+    flagged: int = 0                           # wallets currently flagged
+    drift_posted_cents: int = 0                # sum of |drift| over flagged wallets
+    drift_holds_cents: int = 0
+
+
+@dataclass
+class RepairResult:
+    user_id: uuid.UUID
+    posted_cents_before: int
+    holds_cents_before: int
+    posted_cents: int
+    holds_cents: int
+
+    @property
+    def changed(self) -> bool:
+        return (self.posted_cents, self.holds_cents) != (self.posted_cents_before, self.holds_cents_before)
+
+
+async def _lock_cursor(db: AsyncSession, *, share: bool = False) -> int:
+    await db.execute(_ENSURE_CURSOR, {"name": CURSOR})
+    lock = "FOR SHARE" if share else "FOR UPDATE"
+    return int((await db.execute(
+        text(f"SELECT last_id FROM ledger_cursors WHERE name = :name {lock}"), {"name": CURSOR}
+    )).scalar_one())
+
+
+async def reconcile_batch(
+    db: AsyncSession,
+    *,
+    batch: int,
+    sweep_after: Optional[uuid.UUID] = None,
+    sweep: int = 0,
+) -> ReconcileResult:
+    """
+    One pass: fold up to `batch` settled ledger rows into wallet_shadows, advance the
+    cursor, then check the wallets those rows touched and the next `sweep` wallets
+    after `sweep_after` (catches wallets changed without a ledger row). Mismatches are
+    recorded on wallet_shadows (drift_*, mismatch_since). Caller commits.
+    """
+    kinds = list(HOLD_KINDS)
+    after = await _lock_cursor(db)
+    upto = await settled_upto(db, after_id=after, batch=batch)
+    touched: List[uuid.UUID] = []
+    if upto > after:
+        res = await db.execute(_FOLD, {"after": after, "upto": upto, "hold_kinds": kinds})
+        touched = [r[0] for r in res.all()]
+        await db.execute(
+            text("UPDATE ledger_cursors SET last_id = :upto, updated_at = now() WHERE name = :name"),
+            {"upto": upto, "name": CURSOR},
+        )
+
+    swept: List[uuid.UUID] = []
+    if sweep > 0:
+        q = sa.select(Wallet.user_id).order_by(Wallet.user_id).limit(sweep)
+        if sweep_after is not None:
+            q = q.where(Wallet.user_id > sweep_after)
+        swept = list((await db.execute(q)).scalars().all())
+
+    out = ReconcileResult(
+        after=after,
+        upto=upto,
+        lag_ids=0,
+        checked=0,
+        sweep_last=swept[-1] if len(swept) == sweep and swept else None,
+    )
+    uids = list(dict.fromkeys(touched + swept))
+    if uids:
+        rows = (await db.execute(_COMPARE, {"uids": uids, "upto": upto, "hold_kinds": kinds})).all()
+        out.checked = len(rows)
+        for uid, dp, dh, was_flagged in rows:
+            if (dp or dh) and not was_flagged:
+                out.newly_flagged.append((uid, int(dp), int(dh)))
+                log.warning("wallet drift: user=%s posted=%+d holds=%+d", uid, dp, dh)
+        await db.execute(_RECORD, {
+            "uids": [r[0] for r in rows],
+            "dp": [int(r[1]) for r in rows],
+            "dh": [int(r[2]) for r in rows],
+        })
+
+    flagged, drift_posted, drift_holds = (await db.execute(_DRIFT_TOTALS)).one()
+    out.flagged, out.drift_posted_cents, out.drift_holds_cents = int(flagged), int(drift_posted), int(drift_holds)
+    max_id = (await db.execute(text("SELECT coalesce(max(id), 0) FROM ledger_entries"))).scalar_one()
+    out.lag_ids = max(0, int(max_id) - upto)
+    return out
+
+
+async def repair_wallet(db: AsyncSession, user_id: uuid.UUID) -> RepairResult:
+    """
+    Reset one user's wallet to the sums of their ledger rows (the ledger is the source
+    of truth) and their shadow to the rows up to the cursor, clearing the drift flag.
+    Holds the cursor FOR SHARE so a concurrent reconcile pass cannot fold rows in between.
+    Caller commits.
+    """
+    hwm = await _lock_cursor(db, share=True)
+    wallet = await ensure_and_lock_wallet(db, user_id)
+    before = (wallet.posted_cents, wallet.holds_cents)
+    sums = (await db.execute(
+        text(
+            """
+            SELECT coalesce(sum(amount_cents) FILTER (WHERE NOT (kind = ANY(:hold_kinds))), 0),
+                   coalesce(sum(amount_cents) FILTER (WHERE kind = ANY(:hold_kinds)), 0),
+                   coalesce(sum(amount_cents) FILTER (WHERE NOT (kind = ANY(:hold_kinds)) AND id <= :hwm), 0),
+                   coalesce(sum(amount_cents) FILTER (WHERE kind = ANY(:hold_kinds) AND id <= :hwm), 0)
+            FROM ledger_entries
+            WHERE user_id = :uid
+            """
+        ).bindparams(sa.bindparam("hold_kinds", type_=_KINDS)),
+        {"uid": user_id, "hwm": hwm, "hold_kinds": list(HOLD_KINDS)},
+    )).one()
+    posted, holds, shadow_posted, shadow_holds = (int(v) for v in sums)
+    await db.execute(
+        text("UPDATE wallets SET posted_cents = :p, holds_cents = :h, updated_at = now() WHERE user_id = :uid"),
+        {"p": posted, "h": holds, "uid": user_id},
+    )
+    await add_delta(db, posted - before[0], holds - before[1])
+    await db.execute(
+        text(
+            """
+            INSERT INTO wallet_shadows AS s (user_id, posted_cents, holds_cents, checked_at)
+            VALUES (:uid, :p, :h, now())
+            ON CONFLICT (user_id) DO UPDATE
+            SET posted_cents = EXCLUDED.posted_cents, holds_cents = EXCLUDED.holds_cents,
+                drift_posted_cents = 0, drift_holds_cents = 0, mismatch_since = NULL, checked_at = now()
+            """
+        ),
+        {"uid": user_id, "p": shadow_posted, "h": shadow_holds},
+    )
+    out = RepairResult(user_id, before[0], before[1], posted, holds)
+    if out.changed:
+        log.warning(
+            "wallet repaired: user=%s posted %d -> %d, holds %d -> %d",
+            user_id, before[0], posted, before[1], holds,
+        )
+    return out
@@ -0,0 +1,61 @@
+from __future__ import annotations
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..redis_client import redis
+from ..repos.ledger_checkpoints import write_checkpoints
+from ..observability.heartbeat import beat
+
+S = get_settings()
+log = logging.getLogger("worker.ledger_checkpointer")
+
+# Highest ledger id already folded into checkpoints. Losing it is harmless: the next
+# pass starts from 0 and every user is summed from their own last checkpoint again.
+K_HWM = "ledger:checkpoints:hwm"
+
+def _lock_key() -> str: return "lock:ledger_checkpointer"
+
+async def _acquire_lock() -> bool:
+    # One writer at a time; a second instance idles until the lock expires
+    ttl = max(30, int(S.LEDGER_CHECKPOINT_INTERVAL_SEC * 0.8))
+    return await redis.set(_lock_key(), "1", ex=ttl, nx=True) is True
+
+async def run_once() -> int:
+    """Drain settled ledger rows past the high-water mark. Returns checkpoints written."""
+    if not await _acquire_lock():
+        return 0
+    after = int(await redis.get(K_HWM) or 0)
+    total = 0
+    while True:
+        async with SessionLocal() as db:
+            upto, written = await write_checkpoints(
+                db,
+                after_id=after,
+                every=S.LEDGER_CHECKPOINT_EVERY,
+                batch=S.LEDGER_CHECKPOINT_BATCH,
+            )
+            await db.commit()
+        if upto == after:
+            break
+        await redis.set(K_HWM, upto)
+        after, total = upto, total + written
+    if total:
+        log.info("ledger checkpoints: wrote=%s hwm=%s", total, after)
+    return total
+
+async def run_forever():
+    asyncio.create_task(beat("hb:ledger_checkpointer"))
+    while True:
+        try:
+            await run_once()
+        except Exception as e:
+            log.exception("ledger_checkpointer error: %s", e)
+        await asyncio.sleep(S.LEDGER_CHECKPOINT_INTERVAL_SEC)
+
+def main():
+    asyncio.run(run_forever())
+
+if __name__ == "__main__":
+    main()
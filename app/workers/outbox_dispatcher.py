@@ -2,73 +2,234 @@ from __future__ import annotations
 import argparse
 import asyncio
 import json
+import logging
 from datetime import datetime, timezone
 
 import sqlalchemy as sa
 from sqlalchemy import select
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import get_settings
 from ..db import SessionLocal
 from ..models import EventsOutbox
 from ..redis_client import redis
+from ..repos.outbox import mark_sent, mark_failed
+from ..services.sms_stream import SMS_STREAM, is_sms_event, stream_fields
+from ..services.session_versions import K_SESSION_VERSIONS, K_LIST_VERSION, session_of_channel
+from ..services.participants import PARTICIPANTS_STREAM
 
 from ..observability.heartbeat import beat
+from ..observability.metrics import OUTBOX_PUBLISHED, OUTBOX_FAILED, OUTBOX_LAG, start_worker_metrics_server
 
 
-BATCH = 100
+S = get_settings()
+log = logging.getLogger("worker.outbox_dispatcher")
+
+BATCH = S.OUTBOX_BATCH
 SLEEP_EMPTY = 1.0  # seconds
 SLEEP_ERROR = 2.0
 
+# pg advisory lock namespace; (namespace, partition) is held for the length of one batch tx
+_ADVISORY_NS = 0x0B0C
+
+
+def _partition_of(channel_col, partitions: int):
+    # stable non-negative bucket for a channel (mask instead of abs(): abs(INT_MIN) overflows)
+    return sa.func.mod(sa.func.hashtext(channel_col).op("&")(0x7FFFFFFF), partitions)
+
+
+async def _publish_batch(events: list) -> tuple[list[int], dict[str, list[int]]]:
+    """
+    Publish every event through one non-transactional pipeline (a single round trip).
+    SMS-worthy events are also appended to the durable SMS stream in the same pipeline;
+    session events move that session's read version (and the list version) forward and
+    go to the participants projector's stream.
+
+    Any of an event's commands can fail on its own (OOM, WRONGTYPE) while the rest
+    of the pipeline goes through. Such an event is failed as a whole (its PUBLISH may
+    be repeated on retry: delivery is at-least-once), and so is every later event on
+    the same channel in this batch, so a channel is never delivered out of order.
+    Returns (sent_ids, {error_message: failed_ids}).
+    """
+    pipe = redis.pipeline(transaction=False)
+    owners: list[int] = []  # command index -> event index
+    last_session_idx = None
+    for idx, (evt_id, channel, payload, _created) in enumerate(events):
+        data = json.dumps(payload)
+        pipe.publish(channel, data)
+        owners.append(idx)
+        if is_sms_event(payload):
+            pipe.xadd(
+                SMS_STREAM,
+                stream_fields(evt_id, channel, data),
+                maxlen=S.SMS_STREAM_MAXLEN,
+                approximate=True,
+            )
+            owners.append(idx)
+        sid = session_of_channel(channel)
+        if sid is not None:
+            # ids are in channel order within a batch, so the last write wins correctly
+            pipe.hset(K_SESSION_VERSIONS, sid, evt_id)
+            owners.append(idx)
+            pipe.xadd(
+                PARTICIPANTS_STREAM,
+                {"outbox_id": str(evt_id), "session_id": sid},
+                maxlen=S.PARTICIPANTS_STREAM_MAXLEN,
+                approximate=True,
+            )
+            owners.append(idx)
+            last_session_idx = idx
+    if last_session_idx is not None:
+        pipe.incr(K_LIST_VERSION)
+        owners.append(last_session_idx)
+    try:
+        results = await pipe.execute(raise_on_error=False)
+    except Exception as e:
+        # connection-level failure: nothing is known to have gone out
+        return [], {str(e): [evt[0] for evt in events]}
+
+    errors: dict[int, str] = {}
+    for idx, res in zip(owners, results):
+        if isinstance(res, Exception) and idx not in errors:
+            errors[idx] = str(res)
 
-async def publish_once(db: AsyncSession) -> int:
-    # fetch a batch of unsent, ready events and lock them
-    rows = await db.execute(
-        select(EventsOutbox)
-        .where(EventsOutbox.sent_at.is_(None), EventsOutbox.available_at <= sa.func.now())
+    sent: list[int] = []
+    failed: dict[str, list[int]] = {}
+    broken: dict[str, int] = {}  # channel -> id of its first failed event in this batch
+    for idx, evt in enumerate(events):
+        evt_id, channel = evt[0], evt[1]
+        if idx in errors:
+            failed.setdefault(errors[idx], []).append(evt_id)
+            broken.setdefault(channel, evt_id)
+        elif channel in broken:
+            failed.setdefault(f"held back: event {broken[channel]} on this channel failed", []).append(evt_id)
+        else:
+            sent.append(evt_id)
+    return sent, failed
+
+
+async def publish_once(db: AsyncSession, *, partition: int = 0, partitions: int = 1) -> int:
+    """
+    Publish one batch for the given channel partition.
+
+    Ordering: a partition is drained by exactly one transaction at a time
+    (advisory xact lock), rows go out in id order, and a row whose channel still
+    has an earlier event waiting on retry backoff is held back.
+    """
+    label = str(partition)
+    got = await db.execute(
+        sa.select(sa.func.pg_try_advisory_xact_lock(_ADVISORY_NS, partition))
+    )
+    if not got.scalar_one():
+        # another dispatcher owns this partition right now
+        await db.rollback()
+        return 0
+
+    earlier = aliased(EventsOutbox)
+    blocked = (
+        sa.exists()
+        .where(
+            earlier.channel == EventsOutbox.channel,
+            earlier.sent_at.is_(None),
+            earlier.id < EventsOutbox.id,
+            earlier.available_at > sa.func.now(),
+        )
+    )
+    q = (
+        select(EventsOutbox.id, EventsOutbox.channel, EventsOutbox.payload, EventsOutbox.created_at)
+        .where(
+            EventsOutbox.sent_at.is_(None),
+            EventsOutbox.available_at <= sa.func.now(),
+            ~blocked,
+        )
         .order_by(EventsOutbox.id.asc())
         .limit(BATCH)
         .with_for_update(skip_locked=True)
     )
-    events = list(rows.scalars().all())
+    if partitions > 1:
+        q = q.where(_partition_of(EventsOutbox.channel, partitions) == partition)
+
+    # fetch a batch of unsent, ready events and lock them (plain tuples, no ORM identity map)
+    rows = await db.execute(q)
+    events = [tuple(r) for r in rows.all()]
     if not events:
         await db.rollback()
+        OUTBOX_LAG.labels(partition=label).set(0)
         return 0
 
-    count = 0
-    for evt in events:
-        try:
-            # publish to Redis Pub/Sub
-            await redis.publish(evt.channel, json.dumps(evt.payload))
-            evt.sent_at = datetime.now(timezone.utc)
-            evt.attempts = (evt.attempts or 0) + 1
-            evt.error = None
-            count += 1
-        except Exception as e:
-            evt.attempts = (evt.attempts or 0) + 1
-            evt.error = str(e)
-            # leave sent_at as NULL so it can be retried later
+    # oldest ready event in this partition is the first row (id order)
+    lag = (datetime.now(timezone.utc) - events[0][3]).total_seconds()
+    OUTBOX_LAG.labels(partition=label).set(max(0.0, lag))
+
+    sent, failed = await _publish_batch(events)
+
+    # one UPDATE for the acknowledged rows, one per distinct error for the rest
+    await mark_sent(db, sent)
+    for error, ids in failed.items():
+        await mark_failed(
+            db,
+            ids,
+            error=error,
+            base_delay_sec=S.OUTBOX_RETRY_BASE_SEC,
+            max_delay_sec=S.OUTBOX_RETRY_MAX_SEC,
+        )
     await db.commit()
-    return count
+
+    OUTBOX_PUBLISHED.inc(len(sent))
+    if failed:
+        n_failed = sum(len(ids) for ids in failed.values())
+        OUTBOX_FAILED.inc(n_failed)
+        log.warning("outbox publish failed for %d events in partition %s; retry scheduled", n_failed, label)
+    return len(events)
 
 
-async def run_forever():
+async def run_forever(partition: int = 0, partitions: int = 1):
     while True:
         try:
             async with SessionLocal() as db:
-                sent = await publish_once(db)
-            await asyncio.sleep(SLEEP_EMPTY if sent == 0 else 0.05)
-        except Exception:
+                handled = await publish_once(db, partition=partition, partitions=partitions)
+            # drain without sleeping while batches come back full
+            if handled == 0:
+                await asyncio.sleep(SLEEP_EMPTY)
+            elif handled < BATCH:
+                await asyncio.sleep(0.05)
+        except Exception as e:
+            log.exception("outbox_dispatcher[%s/%s] error: %s", partition, partitions, e)
             await asyncio.sleep(SLEEP_ERROR)
 
 
-async def amain():
+async def amain(partitions: int, owned: list[int]):
+    start_worker_metrics_server(S.WORKER_METRICS_PORT)
     # start heartbeat as a background task
-    asyncio.create_task(beat("hb:outbox_dispatcher:global"))
-    # then run the main loop
-    await run_forever()
+    if partitions == 1:
+        asyncio.create_task(beat("hb:outbox_dispatcher:global"))
+    else:
+        for p in owned:
+            asyncio.create_task(beat(f"hb:outbox_dispatcher:{p}of{partitions}"))
+    # then run one loop per owned partition (each on its own pooled connection)
+    await asyncio.gather(*(run_forever(p, partitions) for p in owned))
+
+
+def _parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Publish events_outbox rows to Redis")
+    ap.add_argument("--partitions", type=int, default=S.OUTBOX_PARTITIONS,
+                    help="total number of channel hash partitions (same value on every dispatcher)")
+    ap.add_argument("--partition", type=int, action="append", default=None,
+                    help="partition index owned by this process; repeatable (default: all)")
+    args = ap.parse_args(argv)
+    if args.partitions < 1:
+        ap.error("--partitions must be >= 1")
+    owned = args.partition if args.partition is not None else list(range(args.partitions))
+    for p in owned:
+        if not 0 <= p < args.partitions:
+            ap.error(f"--partition {p} out of range 0..{args.partitions - 1}")
+    return args.partitions, sorted(set(owned))
+
 
 def main():
-    asyncio.run(amain())
+    partitions, owned = _parse_args()
+    asyncio.run(amain(partitions, owned))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..redis_client import redis
+from ..services.outbox_retention import run_maintenance
+from ..observability.heartbeat import beat
+
+S = get_settings()
+log = logging.getLogger("worker.outbox_maintenance")
+
+def _lock_key() -> str: return "lock:outbox_maintenance"
+
+async def _acquire_lock() -> bool:
+    # Only one instance manages partitions; others idle
+    ttl = max(60, int(S.OUTBOX_MAINTENANCE_INTERVAL_SEC * 0.8))
+    return await redis.set(_lock_key(), "1", ex=ttl, nx=True) is True
+
+async def run_once():
+    if not await _acquire_lock():
+        return ([], [])
+    async with SessionLocal() as db:
+        created, dropped = await run_maintenance(
+            db,
+            retention_days=S.OUTBOX_RETENTION_DAYS,
+            ahead_days=S.OUTBOX_PREMAKE_DAYS,
+            archive_dir=S.OUTBOX_ARCHIVE_DIR,
+        )
+    if created or dropped:
+        log.info("outbox partitions: created=%s dropped=%s", created, dropped)
+    return (created, dropped)
+
+async def run_forever():
+    asyncio.create_task(beat("hb:outbox_maintenance"))
+    while True:
+        try:
+            await run_once()
+        except Exception as e:
+            log.exception("outbox_maintenance error: %s", e)
+        await asyncio.sleep(S.OUTBOX_MAINTENANCE_INTERVAL_SEC)
+
+def main():
+    asyncio.run(run_forever())
+
+if __name__ == "__main__":
+    main()
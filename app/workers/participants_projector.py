@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..redis_client import redis
+from ..services import participants
+from ..services.participants import PARTICIPANTS_STREAM, PARTICIPANTS_GROUP
+from ..observability.heartbeat import beat
+from ..observability.metrics import start_worker_metrics_server
+
+logger = logging.getLogger(__name__)
+S = get_settings()
+
+READ_COUNT = 500
+BLOCK_MS = 5000
+RECLAIM_EVERY_SEC = 30
+CLAIM_IDLE_MS = 60_000  # a batch is one query + two round trips; anything idle this long is orphaned
+
+
+async def _ensure_group() -> None:
+    try:
+        # start at the tail: older events are covered by on-demand rebuilds
+        await redis.xgroup_create(PARTICIPANTS_STREAM, PARTICIPANTS_GROUP, id="$", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _latest_versions(batch: List[Tuple[str, Dict[str, str]]]) -> Dict[uuid.UUID, int]:
+    # many events for one session collapse into a single rebuild at the newest version
+    versions: Dict[uuid.UUID, int] = {}
+    for _msg_id, fields in batch:
+        try:
+            sid = uuid.UUID(fields["session_id"])
+            version = int(fields["outbox_id"])
+        except (KeyError, ValueError):
+            continue
+        versions[sid] = max(version, versions.get(sid, 0))
+    return versions
+
+
+async def process_batch(batch: List[Tuple[str, Dict[str, str]]]) -> int:
+    """Rebuild every session touched by the batch, then ack it. Returns the number of sessions rebuilt."""
+    versions = _latest_versions(batch)
+    if versions:
+        async with SessionLocal() as db:
+            await participants.refresh(db, versions)
+    await redis.xack(PARTICIPANTS_STREAM, PARTICIPANTS_GROUP, *[mid for mid, _ in batch])
+    return len(versions)
+
+
+async def _claim_orphans(consumer: str) -> List[Tuple[str, Dict[str, str]]]:
+    """Adopt messages left pending by a replica that died mid-batch (rebuilds are idempotent)."""
+    resp = await redis.xautoclaim(
+        PARTICIPANTS_STREAM, PARTICIPANTS_GROUP, consumer,
+        min_idle_time=CLAIM_IDLE_MS, start_id="0-0", count=READ_COUNT,
+    )
+    return [(mid, f) for mid, f in resp[1] if f]
+
+
+async def main_loop() -> None:
+    start_worker_metrics_server(S.WORKER_METRICS_PORT)
+    await _ensure_group()
+    consumer = f"participants-{socket.gethostname()}-{os.getpid()}"
+    asyncio.create_task(beat(f"hb:participants_projector:{consumer}"))
+    logger.info("Participants projector %s consuming %s (group %s)", consumer, PARTICIPANTS_STREAM, PARTICIPANTS_GROUP)
+
+    last_reclaim = 0.0
+    while True:
+        try:
+            batch: List[Tuple[str, Dict[str, str]]] = []
+            if time.monotonic() - last_reclaim >= RECLAIM_EVERY_SEC:
+                batch += await _claim_orphans(consumer)
+                last_reclaim = time.monotonic()
+            resp = await redis.xreadgroup(
+                PARTICIPANTS_GROUP, consumer, streams={PARTICIPANTS_STREAM: ">"},
+                count=READ_COUNT, block=None if batch else BLOCK_MS,
+            )
+            for _stream, messages in resp or []:
+                batch.extend(messages)
+            if batch:
+                await process_batch(batch)
+        except Exception as exc:
+            # unacked messages stay pending; orphan reclaim retries them
+            logger.exception("participants projector loop error: %s", exc)
+            await asyncio.sleep(1.0)
+
+
+def main() -> None:
+    asyncio.run(main_loop())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,28 @@
 from __future__ import annotations
 import asyncio
 import logging
-from datetime import datetime, timezone
+import time
+import uuid
+
+from sqlalchemy import select
 
 from ..config import get_settings
 from ..db import SessionLocal
+from ..models import Session as SessionModel
 from ..redis_client import redis
-from ..services.session_auto_close import close_due_sessions
+from ..services.session_auto_close import (
+    K_CLOSE_QUEUE,
+    backfill_close_queue,
+    close_due_at,
+    close_due_sessions,
+)
 from ..observability.heartbeat import beat  # from Step 12
 
 S = get_settings()
 log = logging.getLogger("worker.session_closer")
 
+RETRY_LOCKED_SEC = 5  # a due session locked by an admin write is retried this much later
+
 def _lock_key() -> str: return "lock:session_closer"
 
 async def _acquire_lock() -> bool:
@@ -19,24 +30,81 @@ async def _acquire_lock() -> bool:
     return await redis.set(_lock_key(), "1", ex=S.AUTO_CLOSE_LOCK_TTL_SEC, nx=True) is True
 
 async def run_once():
+    """Backstop: scan the table for anything the delay queue missed, and re-seed the queue."""
     # Acquire short lock; if taken, just skip this tick
     if not await _acquire_lock():
         return 0
     async with SessionLocal() as db:
         closed = await close_due_sessions(db, batch=S.AUTO_CLOSE_BATCH)
+        added = await backfill_close_queue(db)
+    if closed:
+        await redis.zrem(K_CLOSE_QUEUE, *closed)
+        log.info(f"reconciliation scan auto-closed {len(closed)} sessions")
+    if added:
+        log.info(f"added {added} sessions to the close queue")
+    return len(closed)
+
+async def close_queued_once() -> int:
+    """Close the sessions whose queue entry is due; fix up entries that turn out stale."""
+    due = await redis.zrangebyscore(K_CLOSE_QUEUE, "-inf", time.time(), start=0, num=S.AUTO_CLOSE_BATCH)
+    ids = []
+    for d in due:
+        try:
+            ids.append(uuid.UUID(d))
+        except ValueError:
+            await redis.zrem(K_CLOSE_QUEUE, d)
+    if not ids:
+        return 0
+    async with SessionLocal() as db:
+        closed = await close_due_sessions(db, batch=len(ids), session_ids=ids)
+        closed_set = set(closed)
+        rest = [sid for sid in ids if str(sid) not in closed_set]
+        still_scheduled = {}
+        if rest:
+            rows = await db.execute(
+                select(SessionModel.id, SessionModel.starts_at)
+                .where(SessionModel.id.in_(rest), SessionModel.status == "scheduled")
+            )
+            still_scheduled = {sid: starts_at for sid, starts_at in rows.all()}
+            await db.rollback()
+
+    pipe = redis.pipeline(transaction=False)
+    for sid in closed:
+        pipe.zrem(K_CLOSE_QUEUE, sid)
+    for sid in rest:
+        if sid not in still_scheduled:
+            pipe.zrem(K_CLOSE_QUEUE, str(sid))  # closed/canceled elsewhere, or deleted
+        else:
+            # rescheduled (queue not updated) or locked right now: try again at the right time
+            pipe.zadd(K_CLOSE_QUEUE, {str(sid): max(close_due_at(still_scheduled[sid]), time.time() + RETRY_LOCKED_SEC)})
+    await pipe.execute()
     if closed:
-        log.info(f"auto-closed {len(closed)} sessions")
+        log.info(f"auto-closed {len(closed)} sessions on schedule")
     return len(closed)
 
+async def _sleep_until_next_due() -> None:
+    head = await redis.zrange(K_CLOSE_QUEUE, 0, 0, withscores=True)
+    wait = S.AUTO_CLOSE_POLL_SEC
+    if head:
+        wait = min(wait, head[0][1] - time.time())
+    await asyncio.sleep(max(0.05, wait))
+
 async def run_forever():
     # heartbeat for ops
     asyncio.create_task(beat("hb:session_closer"))
+    next_scan = 0.0
     while True:
         try:
-            await run_once()
+            if time.monotonic() >= next_scan:
+                await run_once()
+                next_scan = time.monotonic() + S.AUTO_CLOSE_INTERVAL_SEC
+            # drain while full batches come back
+            while await close_queued_once() >= S.AUTO_CLOSE_BATCH:
+                pass
+            await _sleep_until_next_due()
         except Exception as e:
             log.exception("session_closer error: %s", e)
-        await asyncio.sleep(S.AUTO_CLOSE_INTERVAL_SEC)
+            await asyncio.sleep(S.AUTO_CLOSE_POLL_SEC)
 
 def main():
     asyncio.run(run_forever())
@@ -3,17 +3,104 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
+import socket
+import time
 import uuid
-from typing import Any, Dict, Optional, Tuple
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
+import sqlalchemy as sa
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql as pg
 
+from ..config import get_settings
 from ..db import SessionLocal
 from ..models import Registration, Session as SessionModel, User
 from ..redis_client import redis
-from ..services.sms import sms_service
+from ..services.sms import sms_service, sms_sender
+from ..services.sms_stream import SMS_STREAM, SMS_DEAD_STREAM, SMS_GROUP
+from ..services.ttl_cache import LRUTTLCache, MISSING
+from ..services.session_reminders import K_REMINDERS, backfill_reminders, reminder_due_at
+from ..observability.heartbeat import beat
+from ..observability.metrics import start_worker_metrics_server
 
 logger = logging.getLogger(__name__)
+S = get_settings()
+
+READ_COUNT = 50
+BLOCK_MS = 5000
+RECLAIM_EVERY_SEC = 30
+IN_FLIGHT_TTL_SEC = 120  # dedupe claim while a send is in progress (plus the sender pool backlog)
+
+# Redis keys
+K_RETRY = "sms:retry"        # ZSET msg_id -> next attempt (epoch seconds)
+K_ATTEMPTS = "sms:attempts"  # HASH msg_id -> failed attempts so far
+def k_dedupe(registration_id: uuid.UUID, event_type: str) -> str:
+    return f"sms:sent:{registration_id}:{event_type}"
+def k_reminded(session_id: uuid.UUID, user_id: uuid.UUID) -> str:
+    return f"sms:reminded:{session_id}:{user_id}"
+
+REMINDER_BATCH = 20        # sessions claimed per pass
+REMINDER_POLL_SEC = 30     # max sleep between passes (picks up newly scheduled sessions)
+REMINDER_LEASE_SEC = 300   # a claimed session comes back after this if the replica dies mid-send
+
+
+class SendFailed(Exception):
+    """The SMS could not be delivered now; the stream message stays pending for a retry."""
+
+
+# Dedupe claims hold a per-send token until the text is out, then "sent".
+# When the sender pool finally starts the send, every claim must still be ours (an expired
+# one is re-taken if nobody else did); otherwise the send is dropped, so a claim that ran
+# out while queued behind a long backlog can never cause a second text.
+_REFRESH_LUA = """
+for _, k in ipairs(KEYS) do
+  local v = redis.call('GET', k)
+  if v and v ~= ARGV[1] then
+    return 0
+  end
+end
+for _, k in ipairs(KEYS) do
+  redis.call('SET', k, ARGV[1], 'EX', ARGV[2])
+end
+return 1
+"""
+# Release only the claims still holding our token.
+_RELEASE_LUA = """
+local n = 0
+for _, k in ipairs(KEYS) do
+  if redis.call('GET', k) == ARGV[1] then
+    n = n + redis.call('DEL', k)
+  end
+end
+return n
+"""
+_refresh_script = None
+_release_script = None
+
+
+def _claim_ttl() -> int:
+    return IN_FLIGHT_TTL_SEC + int(sms_sender.backlog_sec())
+
+
+async def _refresh_claims(keys: List[str], token: str) -> None:
+    global _refresh_script
+    if _refresh_script is None:
+        _refresh_script = redis.register_script(_REFRESH_LUA)
+    if not await _refresh_script(keys=keys, args=[token, IN_FLIGHT_TTL_SEC]):
+        raise SendFailed("dedupe claim taken over while queued")
+
+
+async def _release_claims(keys: List[str], token: str) -> None:
+    global _release_script
+    if _release_script is None:
+        _release_script = redis.register_script(_RELEASE_LUA)
+    await _release_script(keys=keys, args=[token])
+
 
 # Message templates by event type
 # Each tuple: (template_with_title, template_without_title)
@@ -32,65 +119,220 @@ MESSAGE_TEMPLATES = {
     ),
 }
 
+# Used when several seats (host + guests, or several promotions) are coalesced into one text
+GROUP_TEMPLATES = {
+    "registration_confirmed": (
+        "Birdie Buddies - {n} seats confirmed for '{title}'",
+        "Birdie Buddies - {n} seats confirmed",
+    ),
+    "registration_promoted": (
+        "Birdie Buddies - {n} seats confirmed for '{title}'",
+        "Birdie Buddies - {n} seats confirmed",
+    ),
+    "registration_waitlisted": (
+        "Birdie Buddies - {n} seats waitlisted for '{title}'",
+        "Birdie Buddies - {n} seats waitlisted",
+    ),
+}
+
+REMINDER_TEMPLATE = "Birdie Buddies - Reminder: '{title}' starts {when}"
 
-async def _get_registration_data(registration_id: uuid.UUID) -> Optional[Tuple[str, uuid.UUID, Optional[str]]]:
-    """Fetch the host phone number and session title for a registration, skipping guests."""
-    async with SessionLocal() as db:
-        row = await db.execute(
-            select(Registration, User, SessionModel)
-            .join(User, Registration.host_user_id == User.id)
-            .join(SessionModel, Registration.session_id == SessionModel.id)
-            .where(Registration.id == registration_id)
-        )
-        result = row.first()
+MAX_PENDING_EVENTS = 1000  # flush every group early once this many events are held back
 
-    if not result:
-        return None
 
-    registration, user, session = result
-    if not registration.is_host:
-        return None
-    if not user.phone:
-        logger.debug("User %s has no phone on file; skipping SMS.", registration.host_user_id)
-        return None
+@dataclass
+class SmsEvent:
+    msg_id: str
+    fields: Dict[str, str]
+    event_type: str
+    registration_id: uuid.UUID
+    host_user_id: Optional[uuid.UUID]
+    session_id: Optional[uuid.UUID]
+    is_host: Optional[bool]  # None for events emitted before payloads carried it
+    seats: int = 1
+
+
+@dataclass
+class SmsGroup:
+    """Events for one (host, session, type) collected during the coalescing window."""
+    host_user_id: uuid.UUID
+    session_id: uuid.UUID
+    event_type: str
+    due_at: float
+    events: List[SmsEvent] = field(default_factory=list)
+
+    @property
+    def has_host(self) -> bool:
+        return any(e.is_host for e in self.events)
 
-    return (user.phone, registration.host_user_id, session.title)
 
+# (host_user_id, session_id, event_type) -> group waiting for its window to close.
+# Stream messages in here stay pending (unacked) until the group is flushed.
+_pending: Dict[Tuple[uuid.UUID, uuid.UUID, str], SmsGroup] = {}
 
-async def _handle_payload(payload: Dict[str, Any]) -> None:
+# session_id -> title, user_id -> phone (None cached too: "no phone on file")
+_session_titles: LRUTTLCache[Optional[str]] = LRUTTLCache(S.SMS_CACHE_SIZE, S.SMS_CACHE_TTL_SEC)
+_host_phones: LRUTTLCache[Optional[str]] = LRUTTLCache(S.SMS_CACHE_SIZE, S.SMS_CACHE_TTL_SEC)
+
+
+def _as_uuid(v: Any) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(v)) if v else None
+    except ValueError:
+        return None
+
+
+def _parse_event(msg_id: str, fields: Dict[str, str]) -> Optional[SmsEvent]:
+    """Decode a stream message; None means there is nothing to send (ack it)."""
+    payload = _decode_payload(fields.get("payload"))
+    if not payload:
+        return None
     event_type = payload.get("type")
     if event_type not in MESSAGE_TEMPLATES:
-        return
+        return None
 
-    reg_id = payload.get("registration_id")
-    if not reg_id:
-        return
+    reg_uuid = _as_uuid(payload.get("registration_id"))
+    if not reg_uuid:
+        logger.debug("Invalid registration_id in payload: %s", payload.get("registration_id"))
+        return None
 
+    # guests never get their own text, but they count towards the host's seats
     try:
-        reg_uuid = uuid.UUID(reg_id)
-    except Exception:
-        logger.debug("Invalid registration_id in payload: %s", reg_id)
-        return
+        seats = max(1, int(payload.get("seats") or 1))
+    except (TypeError, ValueError):
+        seats = 1
+    return SmsEvent(
+        msg_id=msg_id,
+        fields=fields,
+        event_type=event_type,
+        registration_id=reg_uuid,
+        host_user_id=_as_uuid(payload.get("host_user_id")),
+        session_id=_as_uuid(payload.get("session_id")),
+        is_host=payload.get("is_host"),
+        seats=seats,
+    )
+
 
-    data = await _get_registration_data(reg_uuid)
-    if not data:
+async def _fill_legacy_meta(events: List[SmsEvent]) -> None:
+    """Events emitted before payloads carried host/session: one `= ANY(:ids)` lookup."""
+    legacy = [e.registration_id for e in events if e.is_host is None or not e.host_user_id or not e.session_id]
+    if not legacy:
         return
+    async with SessionLocal() as db:
+        rows = await db.execute(
+            select(Registration.id, Registration.host_user_id, Registration.session_id, Registration.is_host)
+            .where(Registration.id == sa.any_(sa.bindparam("ids", legacy, type_=pg.ARRAY(pg.UUID(as_uuid=True)))))
+        )
+        meta = {r.id: r for r in rows.all()}
+    for e in events:
+        m = meta.get(e.registration_id)
+        if m is not None:
+            e.host_user_id, e.session_id, e.is_host = m.host_user_id, m.session_id, bool(m.is_host)
 
-    phone, host_id, session_title = data
 
-    # Build message with or without session title
-    template_with_title, template_without_title = MESSAGE_TEMPLATES[event_type]
-    if session_title:
-        message = template_with_title.format(title=session_title)
-    else:
-        message = template_without_title
+async def _resolve_recipients(
+    groups: List[SmsGroup],
+) -> Dict[Tuple[uuid.UUID, uuid.UUID], Tuple[str, Optional[str]]]:
+    """
+    Map (host_user_id, session_id) -> (phone, session_title) for the groups being flushed.
+    At most two `= ANY(:ids)` queries on one connection, and only for cache misses.
+    """
+    async with AsyncExitStack() as stack:
+        db = None
+
+        async def _db():
+            nonlocal db
+            if db is None:
+                db = await stack.enter_async_context(SessionLocal())
+            return db
+
+        user_ids = _host_phones.missing(g.host_user_id for g in groups)
+        if user_ids:
+            rows = await (await _db()).execute(
+                select(User.id, User.phone)
+                .where(User.id == sa.any_(sa.bindparam("ids", user_ids, type_=pg.ARRAY(pg.UUID(as_uuid=True)))))
+            )
+            for uid, phone in rows.all():
+                _host_phones.set(uid, phone or None)
+
+        session_ids = _session_titles.missing(g.session_id for g in groups)
+        if session_ids:
+            rows = await (await _db()).execute(
+                select(SessionModel.id, SessionModel.title)
+                .where(SessionModel.id == sa.any_(sa.bindparam("ids", session_ids, type_=pg.ARRAY(pg.UUID(as_uuid=True)))))
+            )
+            for sid, title in rows.all():
+                _session_titles.set(sid, title)
+
+    out: Dict[Tuple[uuid.UUID, uuid.UUID], Tuple[str, Optional[str]]] = {}
+    for g in groups:
+        phone = _host_phones.get(g.host_user_id)
+        if phone is MISSING or not phone:
+            logger.debug("User %s has no phone on file; skipping SMS.", g.host_user_id)
+            continue
+        title = _session_titles.get(g.session_id)
+        out[(g.host_user_id, g.session_id)] = (phone, None if title is MISSING else title)
+    return out
 
-    if sms_service.enabled:
-        sent = await sms_service.send_sms(to=phone, body=message)
-        if sent:
-            logger.info("Sent %s SMS to %s for registration %s", event_type, phone, reg_uuid)
+
+def _render(event_type: str, seats: int, session_title: Optional[str]) -> str:
+    if seats > 1:
+        with_title, without_title = GROUP_TEMPLATES[event_type]
     else:
-        logger.debug("Twilio disabled; would have sent '%s' to %s for user %s", message, phone, host_id)
+        with_title, without_title = MESSAGE_TEMPLATES[event_type]
+    if session_title:
+        return with_title.format(title=session_title, n=seats)
+    return without_title.format(n=seats)
+
+
+async def _send(group: SmsGroup, phone: str, session_title: Optional[str]) -> None:
+    """Send one text for a group. Returns normally when done; raises SendFailed to retry."""
+    if not sms_service.enabled:
+        message = _render(group.event_type, sum(e.seats for e in group.events), session_title)
+        logger.debug("Twilio disabled; would have sent '%s' to %s for user %s", message, phone, group.host_user_id)
+        return
+
+    # Dedupe per (registration_id, type): the stream is at-least-once, and a redelivered
+    # group may be composed differently, so only seats not yet texted are counted.
+    seats_by_key: Dict[str, int] = {}
+    for e in group.events:  # a duplicate delivery of the same event counts once
+        seats_by_key[k_dedupe(e.registration_id, e.event_type)] = e.seats
+    keys = list(seats_by_key)
+    token = uuid.uuid4().hex
+    ttl = _claim_ttl()
+    pipe = redis.pipeline(transaction=False)
+    for key in keys:
+        pipe.set(key, token, nx=True, ex=ttl)
+    claimed = await pipe.execute()
+    mine = [k for k, ok in zip(keys, claimed) if ok]
+    others = [k for k, ok in zip(keys, claimed) if not ok]
+    if others and any(v != "sent" for v in await redis.mget(others)):
+        if mine:
+            await _release_claims(mine, token)
+        raise SendFailed("send already in flight")
+    if not mine:
+        logger.debug("Duplicate %s for host %s session %s; already sent",
+                     group.event_type, group.host_user_id, group.session_id)
+        return
+
+    seats = sum(seats_by_key[k] for k in mine)
+    message = _render(group.event_type, seats, session_title)
+    try:
+        sent = await sms_sender.submit(to=phone, body=message, on_start=lambda: _refresh_claims(mine, token))
+    except Exception as exc:
+        await _release_claims(mine, token)
+        if isinstance(exc, SendFailed):
+            raise
+        raise SendFailed(str(exc)) from exc
+    if not sent:
+        await _release_claims(mine, token)
+        raise SendFailed("twilio send failed")
+
+    pipe = redis.pipeline(transaction=False)
+    for key in mine:
+        pipe.set(key, "sent", ex=S.SMS_DEDUPE_TTL_SEC)
+    await pipe.execute()
+    logger.info("Sent %s SMS (%d seats) to %s for session %s", group.event_type, seats, phone, group.session_id)
 
 
 def _decode_payload(raw: Any) -> Optional[Dict[str, Any]]:
@@ -105,31 +347,313 @@ def _decode_payload(raw: Any) -> Optional[Dict[str, Any]]:
         return None
 
 
-async def main_loop() -> None:
-    pubsub = redis.pubsub()
-    await pubsub.psubscribe("session:*")
-    logger.info("SMS notifier subscribed to session:* channels")
+async def _ensure_group() -> None:
+    try:
+        await redis.xgroup_create(SMS_STREAM, SMS_GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _ack_many(msg_ids: List[str]) -> None:
+    if not msg_ids:
+        return
+    pipe = redis.pipeline(transaction=False)
+    pipe.xack(SMS_STREAM, SMS_GROUP, *msg_ids)
+    pipe.hdel(K_ATTEMPTS, *msg_ids)
+    pipe.zrem(K_RETRY, *msg_ids)
+    await pipe.execute()
+
+
+async def _schedule_retry(msg_id: str, fields: Dict[str, str], error: str) -> None:
+    attempts = await redis.hincrby(K_ATTEMPTS, msg_id, 1)
+    if attempts >= S.SMS_MAX_ATTEMPTS:
+        # exhausted: park in the dead-letter stream and stop redelivering
+        pipe = redis.pipeline(transaction=True)
+        pipe.xadd(
+            SMS_DEAD_STREAM,
+            {**fields, "source_id": msg_id, "attempts": str(attempts), "error": error[:500]},
+            maxlen=S.SMS_STREAM_MAXLEN,
+            approximate=True,
+        )
+        pipe.xack(SMS_STREAM, SMS_GROUP, msg_id)
+        pipe.hdel(K_ATTEMPTS, msg_id)
+        pipe.zrem(K_RETRY, msg_id)
+        await pipe.execute()
+        logger.error("SMS message %s dead-lettered after %d attempts: %s", msg_id, attempts, error)
+        return
+
+    delay = min(S.SMS_RETRY_MAX_SEC, S.SMS_RETRY_BASE_SEC * (2 ** (attempts - 1)))
+    await redis.zadd(K_RETRY, {msg_id: time.time() + delay})
+    logger.warning("SMS message %s failed (attempt %d); retry in %.0fs: %s", msg_id, attempts, delay, error)
+
+
+async def _process_batch(batch: List[Tuple[str, Dict[str, str]]]) -> None:
+    """Parse a stream batch into the coalescing buffer (acking what needs no text), then flush due groups."""
+    done: List[str] = []
+    events: List[SmsEvent] = []
+    for msg_id, fields in batch:
+        evt = _parse_event(msg_id, fields)
+        if evt is None:
+            done.append(msg_id)
+        else:
+            events.append(evt)
 
     try:
-        while True:
-            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=5.0)
-            if not msg:
-                await asyncio.sleep(0.5)
-                continue
-            if msg.get("type") != "pmessage":
-                continue
-            payload = _decode_payload(msg.get("data"))
-            if payload:
+        await _fill_legacy_meta(events)
+    except Exception as exc:
+        logger.exception("Registration lookup failed for %d SMS events: %s", len(events), exc)
+        for evt in events:
+            await _schedule_retry(evt.msg_id, evt.fields, f"lookup failed: {exc}")
+        await _ack_many(done)
+        return
+
+    now = time.monotonic()
+    for evt in events:
+        if not evt.host_user_id or not evt.session_id:
+            done.append(evt.msg_id)  # registration no longer exists
+            continue
+        key = (evt.host_user_id, evt.session_id, evt.event_type)
+        group = _pending.get(key)
+        if group is None:
+            group = _pending[key] = SmsGroup(
+                evt.host_user_id, evt.session_id, evt.event_type, due_at=now + S.SMS_COALESCE_WINDOW_SEC
+            )
+        group.events.append(evt)
+    await _ack_many(done)
+
+    await _flush_due()
+
+
+def _next_due_in() -> Optional[float]:
+    """Seconds until the earliest held-back group is due (None when nothing is held)."""
+    if not _pending:
+        return None
+    return max(0.0, min(g.due_at for g in _pending.values()) - time.monotonic())
+
+
+async def _flush_due(*, force: bool = False) -> None:
+    """Send one text per group whose window has closed, then ack or retry every member message."""
+    now = time.monotonic()
+    held = sum(len(g.events) for g in _pending.values())
+    force = force or held >= MAX_PENDING_EVENTS
+    due = [k for k, g in _pending.items() if force or g.due_at <= now]
+    if not due:
+        return
+    groups = [_pending.pop(k) for k in due]
+
+    done: List[str] = []
+    # a host only ever gets texts about their own registration; guest-only groups are dropped
+    hosts = [g for g in groups if g.has_host]
+    for g in groups:
+        if not g.has_host:
+            done.extend(e.msg_id for e in g.events)
+
+    try:
+        recipients = await _resolve_recipients(hosts) if hosts else {}
+    except Exception as exc:
+        logger.exception("Recipient lookup failed for %d SMS groups: %s", len(hosts), exc)
+        for g in hosts:
+            for evt in g.events:
+                await _schedule_retry(evt.msg_id, evt.fields, f"lookup failed: {exc}")
+        await _ack_many(done)
+        return
+
+    to_send = []
+    for g in hosts:
+        rcpt = recipients.get((g.host_user_id, g.session_id))
+        if rcpt is None:
+            done.extend(e.msg_id for e in g.events)
+        else:
+            to_send.append((g, rcpt))
+
+    # sends run concurrently through the bounded, rate-limited sender pool
+    results = await asyncio.gather(*(_send(g, *rcpt) for g, rcpt in to_send), return_exceptions=True)
+    for (g, _rcpt), res in zip(to_send, results):
+        if isinstance(res, BaseException):
+            for evt in g.events:
+                await _schedule_retry(evt.msg_id, evt.fields, str(res))
+        else:
+            done.extend(e.msg_id for e in g.events)
+
+    await _ack_many(done)
+
+
+async def _claim_due_retries(consumer: str) -> List[Tuple[str, Dict[str, str]]]:
+    """Take ownership of messages whose backoff expired (ZREM decides the winner across replicas)."""
+    due = await redis.zrangebyscore(K_RETRY, "-inf", time.time(), start=0, num=READ_COUNT)
+    mine = [mid for mid in due if await redis.zrem(K_RETRY, mid)]
+    if not mine:
+        return []
+    claimed = await redis.xclaim(SMS_STREAM, SMS_GROUP, consumer, min_idle_time=0, message_ids=mine)
+    # entries trimmed from the stream come back without fields
+    return [(mid, f) for mid, f in claimed if f]
+
+
+async def _claim_orphans(consumer: str) -> List[Tuple[str, Dict[str, str]]]:
+    """Adopt messages left pending by a replica that died mid-send."""
+    resp = await redis.xautoclaim(
+        SMS_STREAM, SMS_GROUP, consumer,
+        min_idle_time=S.SMS_CLAIM_IDLE_SEC * 1000, start_id="0-0", count=READ_COUNT,
+    )
+    return [(mid, f) for mid, f in resp[1] if f]
+
+
+def _format_start(starts_at: datetime, tz_name: str) -> str:
+    try:
+        local = starts_at.astimezone(ZoneInfo(tz_name))
+    except Exception:
+        local = starts_at
+    return f"{local:%a %b} {local.day} at {local:%H:%M}"
+
+
+async def _claim_due_reminders() -> List[Tuple[uuid.UUID, float]]:
+    """Session reminders that are due; ZREM decides the winner across replicas, then a lease is taken."""
+    now = time.time()
+    due = await redis.zrangebyscore(K_REMINDERS, "-inf", now, start=0, num=REMINDER_BATCH, withscores=True)
+    mine: List[Tuple[uuid.UUID, float]] = []
+    for sid, score in due:
+        if not await redis.zrem(K_REMINDERS, sid):
+            continue
+        await redis.zadd(K_REMINDERS, {sid: now + REMINDER_LEASE_SEC}, nx=True)
+        session_id = _as_uuid(sid)
+        if session_id:
+            mine.append((session_id, score))
+    return mine
+
+
+async def _send_session_reminder(session_id: uuid.UUID, due_at: float) -> None:
+    """
+    Text every confirmed host of one session: the session row plus one recipients query.
+    Sends are deduped per (session, user) and go through the shared sender pool.
+    """
+    async with SessionLocal() as db:
+        sess = (await db.execute(
+            select(SessionModel.id, SessionModel.title, SessionModel.starts_at, SessionModel.timezone, SessionModel.status)
+            .where(SessionModel.id == session_id)
+        )).one_or_none()
+        if sess is None or sess.status != "scheduled" or sess.starts_at <= datetime.now(timezone.utc):
+            await redis.zrem(K_REMINDERS, str(session_id))
+            return
+        if abs(reminder_due_at(sess.starts_at) - due_at) > 1 and reminder_due_at(sess.starts_at) > time.time():
+            # rescheduled without the schedule being updated: move the entry instead
+            await redis.zadd(K_REMINDERS, {str(session_id): reminder_due_at(sess.starts_at)})
+            return
+        rows = await db.execute(
+            select(User.id, User.phone)
+            .join(Registration, Registration.host_user_id == User.id)
+            .where(
+                Registration.session_id == session_id,
+                Registration.state == "confirmed",
+                Registration.is_host.is_(True),
+            )
+            .distinct()
+        )
+        recipients = [(uid, phone) for uid, phone in rows.all() if phone]
+
+    message = REMINDER_TEMPLATE.format(
+        title=sess.title or "your session", when=_format_start(sess.starts_at, sess.timezone)
+    )
+
+    async def _one(user_id: uuid.UUID, phone: str) -> None:
+        if not sms_service.enabled:
+            logger.debug("Twilio disabled; would have sent '%s' to %s", message, phone)
+            return
+        key = k_reminded(session_id, user_id)
+        token = uuid.uuid4().hex
+        if not await redis.set(key, token, nx=True, ex=_claim_ttl()):
+            if await redis.get(key) == "sent":
+                return
+            raise SendFailed("send already in flight")
+        try:
+            sent = await sms_sender.submit(to=phone, body=message, on_start=lambda: _refresh_claims([key], token))
+        except Exception:
+            await _release_claims([key], token)
+            raise
+        if not sent:
+            await _release_claims([key], token)
+            raise SendFailed("twilio send failed")
+        await redis.set(key, "sent", ex=S.SMS_DEDUPE_TTL_SEC)
+
+    results = await asyncio.gather(*(_one(uid, phone) for uid, phone in recipients), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, BaseException))
+    if failed:
+        # already-texted hosts are skipped on the next pass by the dedupe keys
+        retry_at = time.time() + S.SMS_REMINDER_RETRY_SEC
+        if retry_at < sess.starts_at.timestamp():
+            await redis.zadd(K_REMINDERS, {str(session_id): retry_at})
+            logger.warning("Reminder for session %s failed for %d of %d hosts; retrying", session_id, failed, len(recipients))
+            return
+        logger.error("Reminder for session %s failed for %d of %d hosts; session started", session_id, failed, len(recipients))
+    await redis.zrem(K_REMINDERS, str(session_id))
+    logger.info("Sent reminders for session %s to %d hosts", session_id, len(recipients) - failed)
+
+
+async def reminder_loop() -> None:
+    """Sleep until the earliest reminder is due (capped), then send the due sessions one by one."""
+    async with SessionLocal() as db:
+        added = await backfill_reminders(db)
+    if added:
+        logger.info("Scheduled reminders for %d existing sessions", added)
+    while True:
+        try:
+            for session_id, due_at in await _claim_due_reminders():
                 try:
-                    await _handle_payload(payload)
+                    await _send_session_reminder(session_id, due_at)
                 except Exception as exc:
-                    logger.exception("Failed to handle SMS payload: %s", exc)
-                    await asyncio.sleep(0.5)
-    finally:
+                    # the lease entry brings it back after REMINDER_LEASE_SEC
+                    logger.exception("Reminder for session %s failed: %s", session_id, exc)
+            head = await redis.zrange(K_REMINDERS, 0, 0, withscores=True)
+            wait = REMINDER_POLL_SEC if not head else min(REMINDER_POLL_SEC, head[0][1] - time.time())
+            await asyncio.sleep(max(0.5, wait))
+        except Exception as exc:
+            logger.exception("SMS reminder loop error: %s", exc)
+            await asyncio.sleep(REMINDER_POLL_SEC)
+
+
+async def main_loop() -> None:
+    start_worker_metrics_server(S.WORKER_METRICS_PORT)
+    await _ensure_group()
+    consumer = f"sms-{socket.gethostname()}-{os.getpid()}"
+    asyncio.create_task(beat(f"hb:sms_notifier:{consumer}"))
+    if S.SMS_REMINDER_HOURS > 0:
+        asyncio.create_task(reminder_loop())
+    logger.info("SMS notifier %s consuming %s (group %s)", consumer, SMS_STREAM, SMS_GROUP)
+
+    last_reclaim = 0.0
+    while True:
         try:
-            await pubsub.punsubscribe("session:*")
-        finally:
-            await pubsub.close()
+            batch = await _claim_due_retries(consumer)
+            if time.monotonic() - last_reclaim >= RECLAIM_EVERY_SEC:
+                batch += await _claim_orphans(consumer)
+                last_reclaim = time.monotonic()
+
+            # don't block on new messages while retries are waiting to be handled,
+            # nor past the moment the next coalesced group is due
+            block = BLOCK_MS
+            due_in = _next_due_in()
+            if batch:
+                block = None
+            elif due_in is not None:
+                block = max(1, min(BLOCK_MS, int(due_in * 1000) + 1))
+            resp = await redis.xreadgroup(
+                SMS_GROUP, consumer, streams={SMS_STREAM: ">"},
+                count=READ_COUNT, block=block,
+            )
+            for _stream, messages in resp or []:
+                batch.extend(messages)
+
+            try:
+                if batch:
+                    await _process_batch(batch)
+                else:
+                    await _flush_due()
+            except Exception as exc:
+                # Redis trouble while acking/scheduling: leave pending, orphan reclaim picks it up
+                logger.exception("Failed to process %d SMS messages: %s", len(batch), exc)
+        except Exception as exc:
+            logger.exception("SMS notifier loop error: %s", exc)
+            await asyncio.sleep(1.0)
 
 
 def main() -> None:
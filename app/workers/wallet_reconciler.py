@@ -0,0 +1,85 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+import uuid
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..redis_client import redis
+from ..repos.wallet_totals import fold_deltas, read_totals, verify_totals
+from ..services.wallet_reconciliation import reconcile_batch
+from ..observability.heartbeat import beat
+from ..observability.metrics import (
+    start_worker_metrics_server,
+    WALLET_DRIFT_WALLETS, WALLET_DRIFT_CENTS, WALLET_DRIFT_DETECTED, LEDGER_RECONCILE_LAG,
+    WALLET_TOTALS_DRIFT, WALLET_TOTALS_PENDING,
+)
+
+S = get_settings()
+log = logging.getLogger("worker.wallet_reconciler")
+
+# Position of the rolling wallet sweep; losing it only restarts the sweep.
+# The ledger high-water mark lives in Postgres (ledger_cursors), next to the shadow totals.
+K_SWEEP = "wallet_reconcile:sweep_after"
+
+async def run_once():
+    """Fold settled ledger rows until none are left; every pass also re-checks RECONCILE_SWEEP wallets."""
+    while True:
+        raw = await redis.get(K_SWEEP)
+        async with SessionLocal() as db:
+            res = await reconcile_batch(
+                db,
+                batch=S.RECONCILE_BATCH,
+                sweep_after=uuid.UUID(raw) if raw else None,
+                sweep=S.RECONCILE_SWEEP,
+            )
+            await db.commit()
+        if res.sweep_last is None:
+            await redis.delete(K_SWEEP)
+        else:
+            await redis.set(K_SWEEP, str(res.sweep_last))
+
+        WALLET_DRIFT_DETECTED.inc(len(res.newly_flagged))
+        WALLET_DRIFT_WALLETS.set(res.flagged)
+        WALLET_DRIFT_CENTS.labels("posted").set(res.drift_posted_cents)
+        WALLET_DRIFT_CENTS.labels("holds").set(res.drift_holds_cents)
+        LEDGER_RECONCILE_LAG.set(res.lag_ids)
+        if res.upto == res.after:
+            return res
+
+async def maintain_totals(verify: bool) -> None:
+    """Fold the admin summary's pending deltas; on `verify`, also check it against SUM(wallets)."""
+    async with SessionLocal() as db:
+        while await fold_deltas(db):
+            await db.commit()
+        await db.commit()
+        if verify:
+            dp, dh = await verify_totals(db)
+            await db.commit()
+            WALLET_TOTALS_DRIFT.labels("posted").set(dp)
+            WALLET_TOTALS_DRIFT.labels("holds").set(dh)
+            if dp or dh:
+                log.error("wallet totals corrected: posted=%+d holds=%+d", dp, dh)
+        WALLET_TOTALS_PENDING.set((await read_totals(db)).pending_deltas)
+
+async def run_forever():
+    start_worker_metrics_server(S.WORKER_METRICS_PORT)
+    asyncio.create_task(beat("hb:wallet_reconciler"))
+    last_verify = 0.0
+    while True:
+        try:
+            await run_once()
+            verify = time.monotonic() - last_verify >= S.WALLET_TOTALS_VERIFY_SEC
+            await maintain_totals(verify)
+            if verify:
+                last_verify = time.monotonic()
+        except Exception as e:
+            log.exception("wallet_reconciler error: %s", e)
+        await asyncio.sleep(S.RECONCILE_INTERVAL_SEC)
+
+def main():
+    asyncio.run(run_forever())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""index unsent outbox rows by channel for ordered, partitioned dispatch
+
+Revision ID: 0019_outbox_channel_order_idx
+Revises: 0018_registration_canceled_from
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0019_outbox_channel_order_idx"
+down_revision = "0018_registration_canceled_from"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Dispatcher checks "is an earlier event on this channel still pending?"
+    op.create_index(
+        "ix_outbox_unsent_channel_id",
+        "events_outbox",
+        ["channel", "id"],
+        unique=False,
+        postgresql_where=sa.text("sent_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_unsent_channel_id", table_name="events_outbox")
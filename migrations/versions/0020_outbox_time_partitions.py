@@ -0,0 +1,109 @@
+"""partition events_outbox by day on created_at
+
+Revision ID: 0020_outbox_time_partitions
+Revises: 0019_outbox_channel_order_idx
+Create Date: 2026-10-18
+
+Rebuilds events_outbox as a RANGE-partitioned table (one partition per UTC day,
+plus a DEFAULT catch-all) so old history can be dropped a partition at a time.
+Every row is carried over; nothing is deleted here. History older than the premade
+partitions lands in DEFAULT, and the next outbox maintenance pass drains it like any
+expired partition (archived to OUTBOX_ARCHIVE_DIR when set, then deleted).
+The id sequence is reused so ids keep increasing across the switch.
+"""
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+
+revision = "0020_outbox_time_partitions"
+down_revision = "0019_outbox_channel_order_idx"
+branch_labels = None
+depends_on = None
+
+KEEP_DAYS = 7
+AHEAD_DAYS = 3
+
+
+def _day_partition_sql(day) -> str:
+    nxt = day + timedelta(days=1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS events_outbox_p{day:%Y%m%d} PARTITION OF events_outbox "
+        f"FOR VALUES FROM ('{day:%Y-%m-%d} 00:00:00+00') TO ('{nxt:%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE events_outbox RENAME TO events_outbox_legacy")
+    op.execute("ALTER SEQUENCE events_outbox_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE events_outbox_legacy ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER INDEX IF EXISTS ix_outbox_ready RENAME TO ix_outbox_ready_legacy")
+    op.execute("ALTER INDEX IF EXISTS ix_outbox_unsent_channel_id RENAME TO ix_outbox_unsent_channel_id_legacy")
+
+    op.execute(
+        """
+        CREATE TABLE events_outbox (
+            id           BIGINT      NOT NULL DEFAULT nextval('events_outbox_id_seq'),
+            channel      TEXT        NOT NULL,
+            payload      JSONB       NOT NULL,
+            available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            sent_at      TIMESTAMPTZ NULL,
+            attempts     INTEGER     NOT NULL DEFAULT 0,
+            error        TEXT        NULL,
+            created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT pk_events_outbox PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE events_outbox_id_seq OWNED BY events_outbox.id")
+    op.execute("CREATE TABLE events_outbox_default PARTITION OF events_outbox DEFAULT")
+
+    today = datetime.now(timezone.utc).date()
+    for i in range(-KEEP_DAYS, AHEAD_DAYS + 1):
+        op.execute(_day_partition_sql(today + timedelta(days=i)))
+
+    # Unsent rows drive the dispatcher: keep every scan on small partial indexes
+    op.execute("CREATE INDEX ix_outbox_unsent_id ON events_outbox (id) WHERE sent_at IS NULL")
+    op.execute("CREATE INDEX ix_outbox_ready ON events_outbox (available_at, id) WHERE sent_at IS NULL")
+    op.execute("CREATE INDEX ix_outbox_unsent_channel_id ON events_outbox (channel, id) WHERE sent_at IS NULL")
+
+    op.execute(
+        """
+        INSERT INTO events_outbox (id, channel, payload, available_at, sent_at, attempts, error, created_at)
+        SELECT id, channel, payload, available_at, sent_at, attempts, error, created_at
+        FROM events_outbox_legacy
+        """
+    )
+    op.execute("DROP TABLE events_outbox_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE events_outbox RENAME TO events_outbox_partitioned")
+    op.execute("ALTER SEQUENCE events_outbox_id_seq OWNED BY NONE")
+    op.execute("ALTER INDEX IF EXISTS ix_outbox_ready RENAME TO ix_outbox_ready_partitioned")
+    op.execute("ALTER INDEX IF EXISTS ix_outbox_unsent_channel_id RENAME TO ix_outbox_unsent_channel_id_partitioned")
+    op.execute(
+        """
+        CREATE TABLE events_outbox (
+            id           BIGINT      NOT NULL DEFAULT nextval('events_outbox_id_seq'),
+            channel      TEXT        NOT NULL,
+            payload      JSONB       NOT NULL,
+            available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            sent_at      TIMESTAMPTZ NULL,
+            attempts     INTEGER     NOT NULL DEFAULT 0,
+            error        TEXT        NULL,
+            created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT pk_events_outbox PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE events_outbox_id_seq OWNED BY events_outbox.id")
+    op.execute("CREATE INDEX ix_outbox_ready ON events_outbox (available_at, id) WHERE sent_at IS NULL")
+    op.execute("CREATE INDEX ix_outbox_unsent_channel_id ON events_outbox (channel, id) WHERE sent_at IS NULL")
+    op.execute(
+        """
+        INSERT INTO events_outbox (id, channel, payload, available_at, sent_at, attempts, error, created_at)
+        SELECT id, channel, payload, available_at, sent_at, attempts, error, created_at
+        FROM events_outbox_partitioned
+        """
+    )
+    op.execute("DROP TABLE events_outbox_partitioned CASCADE")
@@ -0,0 +1,66 @@
+"""session series: weekly recurrence template for sessions
+
+Revision ID: 0021_session_series
+Revises: 0020_outbox_time_partitions
+Create Date: 2026-10-18
+
+A series stores a weekly rule (weekdays + local start time in an IANA timezone,
+skipped dates), the capacity/fee template and a standing prereg list.
+Materialized sessions point back at it through sessions.series_id; the unique
+(series_id, starts_at) index makes re-materializing the same dates a no-op.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0021_session_series"
+down_revision = "0020_outbox_time_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "session_series",
+        sa.Column("id", pg.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("timezone", sa.Text(), nullable=False),
+        sa.Column("weekdays", pg.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column("local_time", sa.Time(), nullable=False),
+        sa.Column("starts_on", sa.Date(), nullable=False),
+        sa.Column("exceptions", pg.ARRAY(sa.Date()), nullable=False, server_default=sa.text("'{}'")),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.Column("fee_cents", sa.Integer(), nullable=False),
+        sa.Column("preregistrations", pg.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("created_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.CheckConstraint("capacity > 0", name="ck_session_series_capacity_pos"),
+        sa.CheckConstraint("fee_cents >= 0", name="ck_session_series_fee_nonneg"),
+        sa.CheckConstraint(
+            "cardinality(weekdays) > 0 AND weekdays <@ ARRAY[0,1,2,3,4,5,6]::smallint[]",
+            name="ck_session_series_weekdays",
+        ),
+    )
+    op.add_column(
+        "sessions",
+        sa.Column(
+            "series_id",
+            pg.UUID(as_uuid=True),
+            sa.ForeignKey("session_series.id", name="fk_sessions_series_id_session_series", ondelete="SET NULL"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ux_sessions_series_starts_at",
+        "sessions",
+        ["series_id", "starts_at"],
+        unique=True,
+        postgresql_where=sa.text("series_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_sessions_series_starts_at", table_name="sessions")
+    op.drop_column("sessions", "series_id")
+    op.drop_table("session_series")
@@ -0,0 +1,26 @@
+"""sessions (status, starts_at, id) index for keyset-paged history
+
+Revision ID: 0022_sessions_status_starts_at_idx
+Revises: 0021_session_series
+Create Date: 2026-10-18
+
+Serves GET /admin/sessions/history: equality on status, then (starts_at, id)
+in index order, so each page is a bounded index range scan. id is the keyset
+tie-breaker for sessions sharing a start time.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0022_sessions_status_starts_at_idx"
+down_revision = "0021_session_series"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_sessions_status_starts_at_id", "sessions", ["status", "starts_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sessions_status_starts_at_id", table_name="sessions")
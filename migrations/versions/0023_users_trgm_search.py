@@ -0,0 +1,39 @@
+"""trigram search + keyset index for admin user lookup
+
+Revision ID: 0023_users_trgm_search
+Revises: 0022_sessions_status_starts_at_idx
+Create Date: 2026-10-18
+
+GIN pg_trgm indexes on lower(name) and lower(email::text) answer the admin
+search's substring LIKE '%q%' without a sequential scan (the expressions match
+the query exactly). A partial (created_at, id) index over live users serves the
+newest-first keyset pages.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0023_users_trgm_search"
+down_revision = "0022_sessions_status_starts_at_idx"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email::text) gin_trgm_ops)")
+    op.create_index(
+        "ix_users_live_created_at_id",
+        "users",
+        ["created_at", "id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_live_created_at_id", table_name="users")
+    op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_users_name_trgm")
+    # pg_trgm is left installed; other objects may depend on it
@@ -0,0 +1,30 @@
+"""per-user keyset indexes for ledger and registrations
+
+Revision ID: 0024_user_history_indexes
+Revises: 0023_users_trgm_search
+Create Date: 2026-10-18
+
+Admin user detail pages a member's ledger on id and their registrations on
+(created_at, id), newest first. (user_id, id) replaces ix_ledger_user, which it
+covers as a prefix.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0024_user_history_indexes"
+down_revision = "0023_users_trgm_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ledger_user_id_id", "ledger_entries", ["user_id", "id"])
+    op.execute("DROP INDEX IF EXISTS ix_ledger_user")
+    op.create_index("ix_reg_host_created_at_id", "registrations", ["host_user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reg_host_created_at_id", table_name="registrations")
+    op.create_index("ix_ledger_user", "ledger_entries", ["user_id"])
+    op.drop_index("ix_ledger_user_id_id", table_name="ledger_entries")
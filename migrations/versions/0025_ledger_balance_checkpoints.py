@@ -0,0 +1,41 @@
+"""ledger balance checkpoints: per-user running totals every N entries
+
+Revision ID: 0025_ledger_balance_checkpoints
+Revises: 0024_user_history_indexes
+Create Date: 2026-10-18
+
+A checkpoint stores a user's posted/holds totals right after one of their ledger
+entries. The ledger_checkpointer worker appends one every LEDGER_CHECKPOINT_EVERY
+entries, so a running balance never has to sum more than that many rows plus a page.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0025_ledger_balance_checkpoints"
+down_revision = "0024_user_history_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_balance_checkpoints",
+        sa.Column(
+            "user_id",
+            pg.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", name="fk_ledger_balance_checkpoints_user_id_users", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("ledger_id", sa.BigInteger(), nullable=False),
+        sa.Column("posted_cents", sa.BigInteger(), nullable=False),
+        sa.Column("holds_cents", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("user_id", "ledger_id", name="pk_ledger_balance_checkpoints"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ledger_balance_checkpoints")
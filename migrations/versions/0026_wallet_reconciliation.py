@@ -0,0 +1,57 @@
+"""wallet reconciliation: ledger cursors and per-user shadow totals
+
+Revision ID: 0026_wallet_reconciliation
+Revises: 0025_ledger_balance_checkpoints
+Create Date: 2026-10-18
+
+wallet_shadows holds each user's posted/holds totals summed from ledger_entries up
+to the reconciler's high-water mark (ledger_cursors 'wallet_reconcile'), plus the
+drift last seen against wallets. Both are updated in the same transaction, so the
+shadow never counts a ledger row twice. The partial index keeps drift totals cheap.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0026_wallet_reconciliation"
+down_revision = "0025_ledger_balance_checkpoints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_cursors",
+        sa.Column("name", sa.Text(), primary_key=True),
+        sa.Column("last_id", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_table(
+        "wallet_shadows",
+        sa.Column(
+            "user_id",
+            pg.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", name="fk_wallet_shadows_user_id_users", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("posted_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("holds_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("drift_posted_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("drift_holds_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("mismatch_since", pg.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("checked_at", pg.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_wallet_shadows_mismatch",
+        "wallet_shadows",
+        ["mismatch_since"],
+        postgresql_where=sa.text("mismatch_since IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_wallet_shadows_mismatch", table_name="wallet_shadows")
+    op.drop_table("wallet_shadows")
+    op.drop_table("ledger_cursors")
@@ -0,0 +1,53 @@
+"""wallet totals: maintained global posted/holds sums for the admin summary
+
+Revision ID: 0027_wallet_totals
+Revises: 0026_wallet_reconciliation
+Create Date: 2026-10-18
+
+Every wallet change appends its delta to wallet_total_deltas in the same
+transaction (insert-only, so concurrent SERIALIZABLE writers never conflict on a
+shared row). The wallet_reconciler folds deltas into the single wallet_totals row;
+the summary is that row plus the few deltas not folded yet. Seeded from wallets.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0027_wallet_totals"
+down_revision = "0026_wallet_reconciliation"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "wallet_totals",
+        sa.Column("id", sa.SmallInteger(), primary_key=True, server_default=sa.text("1")),
+        sa.Column("posted_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("holds_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("verified_at", pg.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("drift_posted_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("drift_holds_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.CheckConstraint("id = 1", name="ck_wallet_totals_single_row"),
+    )
+    op.create_table(
+        "wallet_total_deltas",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("posted_cents", sa.BigInteger(), nullable=False),
+        sa.Column("holds_cents", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.execute(
+        """
+        INSERT INTO wallet_totals (id, posted_cents, holds_cents)
+        SELECT 1, coalesce(sum(posted_cents), 0), coalesce(sum(holds_cents), 0) FROM wallets
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("wallet_total_deltas")
+    op.drop_table("wallet_totals")
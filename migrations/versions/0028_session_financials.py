@@ -0,0 +1,61 @@
+"""session financials: per-session money rollup maintained by the ledger write path
+
+Revision ID: 0028_session_financials
+Revises: 0027_wallet_totals
+Create Date: 2026-10-18
+
+One row per session with ledger activity. Every ledger write that carries a
+session_id adds to it in the same transaction (repos/session_financials.py).
+Amounts are from the club's side: fees captured and penalties are positive, and
+net = captured + penalties - refunded. Seeded from the existing ledger.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0028_session_financials"
+down_revision = "0027_wallet_totals"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "session_financials",
+        sa.Column(
+            "session_id",
+            pg.UUID(as_uuid=True),
+            sa.ForeignKey("sessions.id", name="fk_session_financials_session_id_sessions", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("captured_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("refunded_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("penalties_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("holds_outstanding_cents", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column(
+            "net_cents",
+            sa.BigInteger(),
+            sa.Computed("captured_cents + penalties_cents - refunded_cents", persisted=True),
+            nullable=False,
+        ),
+        sa.Column("updated_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.execute(
+        """
+        INSERT INTO session_financials (session_id, captured_cents, refunded_cents, penalties_cents, holds_outstanding_cents)
+        SELECT session_id,
+               coalesce(-sum(amount_cents) FILTER (WHERE kind = 'fee_capture'), 0),
+               coalesce(sum(amount_cents)  FILTER (WHERE kind = 'refund'), 0),
+               coalesce(-sum(amount_cents) FILTER (WHERE kind = 'penalty'), 0),
+               coalesce(sum(amount_cents)  FILTER (WHERE kind IN ('hold', 'hold_release')), 0)
+        FROM ledger_entries
+        WHERE session_id IS NOT NULL
+        GROUP BY session_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("session_financials")
@@ -0,0 +1,35 @@
+"""ledger settle marks: bound incremental ledger scans by in-flight transactions
+
+Revision ID: 0029_ledger_settle_marks
+Revises: 0028_session_financials
+Create Date: 2026-10-18
+
+Replaces the wall-clock settle window of the checkpointer and the wallet reconciler.
+A mark pairs the highest visible ledger id with the snapshot's xmax; ids up to it are
+final once no transaction older than that xid is still running
+(repos/ledger_checkpoints.py: settled_upto).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision = "0029_ledger_settle_marks"
+down_revision = "0028_session_financials"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_settle_marks",
+        sa.Column("xid", sa.BigInteger(), nullable=False),
+        sa.Column("max_ledger_id", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", pg.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("xid", name="pk_ledger_settle_marks"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ledger_settle_marks")
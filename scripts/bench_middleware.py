@@ -0,0 +1,120 @@
+"""
+Per-request overhead of the request-context middleware, measured in-process
+(ASGI calls, no sockets) against a trivial route:
+
+    python -m scripts.bench_middleware -n 20000
+
+Compares no middleware, the previous BaseHTTPMiddleware implementation and the
+current pure-ASGI RequestContextMiddleware, with and without a session cookie.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from datetime import timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.auth.jwt import create_jwt, verify_jwt
+from app.config import get_settings
+from app.middleware.request_context import RequestContextMiddleware
+from app.observability.logging import setup_logging
+
+S = get_settings()
+
+
+class LegacyRequestContextMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version this replaced (logging kept, formatting inline)."""
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        rid = request.headers.get(S.REQUEST_ID_HEADER) or "x"
+        user_id = None
+        token = request.cookies.get(S.SESSION_COOKIE_NAME)
+        if token:
+            try:
+                user_id = verify_jwt(token).get("sub")
+            except Exception:
+                pass
+        response = await call_next(request)
+        response.headers[S.REQUEST_ID_HEADER] = rid
+        logging.getLogger("bench.legacy").info(
+            "request", extra={"request_id": rid, "extra": f"ms={int((time.perf_counter() - start) * 1000)} user_id={user_id}"}
+        )
+        return response
+
+
+def _app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        # what get_current_user does with the shared claims (or a second decode)
+        state = request.scope.get("state") or {}
+        if "jwt_claims" not in state and request.cookies.get(S.SESSION_COOKIE_NAME):
+            verify_jwt(request.cookies[S.SESSION_COOKIE_NAME])
+        return PlainTextResponse("pong")
+
+    if middleware:
+        app.add_middleware(middleware)
+    return app
+
+
+async def _measure(app, n: int, cookie: str | None) -> list[float]:
+    headers = [(b"host", b"bench")]
+    if cookie:
+        headers.append((b"cookie", f"{S.SESSION_COOKIE_NAME}={cookie}".encode()))
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message):
+        return None
+
+    out: list[float] = []
+    for i in range(n):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+            "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+        t0 = time.perf_counter()
+        await app(scope, receive, send)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+async def run(n: int) -> None:
+    token = create_jwt({"sub": "00000000-0000-0000-0000-000000000001", "name": "Bench"}, expires_in=timedelta(hours=1))
+    variants = [
+        ("none", _app()),
+        ("legacy BaseHTTPMiddleware", _app(LegacyRequestContextMiddleware)),
+        ("pure ASGI", _app(RequestContextMiddleware)),
+    ]
+    for cookie_label, cookie in (("anonymous", None), ("with cookie", token)):
+        for label, app in variants:
+            await _measure(app, min(n, 500), cookie)  # warm up
+            lat = sorted(await _measure(app, n, cookie))
+            print(
+                f"{cookie_label:12} {label:28} p50={statistics.median(lat) * 1e6:7.1f}us "
+                f"p99={lat[int(len(lat) * 0.99) - 1] * 1e6:7.1f}us"
+            )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="request-context middleware overhead")
+    ap.add_argument("-n", type=int, default=10000)
+    args = ap.parse_args()
+    setup_logging()
+    # keep stdout readable: the access log still goes through its handlers, to nowhere
+    logging.getLogger().handlers[0].stream = open(os.devnull, "w")
+    asyncio.run(run(args.n))
+
+
+if __name__ == "__main__":
+    main()
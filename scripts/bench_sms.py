@@ -0,0 +1,67 @@
+"""
+Push N messages through the SMS sender pool and report throughput/latency.
+
+    python -m scripts.bench_sms -n 500 --phones 50
+
+Point TWILIO_API_BASE_URL at scripts/fake_twilio.py (any non-empty Twilio
+credentials work against the fake). Rate/concurrency flags default to settings.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.config import get_settings
+from app.services.sms import SmsSenderPool, sms_service
+
+
+async def run(n: int, phones: int, pool: SmsSenderPool) -> None:
+    if not sms_service.enabled:
+        raise SystemExit("Twilio is not configured (set TWILIO_* and TWILIO_API_BASE_URL)")
+    latencies: list[float] = []
+
+    async def one(i: int) -> bool:
+        t0 = time.perf_counter()
+        ok = await pool.submit(to=f"+1555{i % phones:07d}", body=f"bench message {i}")
+        latencies.append(time.perf_counter() - t0)
+        return ok
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(n)), return_exceptions=True)
+    elapsed = time.perf_counter() - t0
+    await pool.stop()
+
+    ok = sum(1 for r in results if r is True)
+    latencies.sort()
+    print(f"sent={ok}/{n} elapsed={elapsed:.2f}s throughput={n / elapsed:.1f} msg/s")
+    print(
+        "latency (submit->result) p50={:.3f}s p95={:.3f}s max={:.3f}s".format(
+            statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], latencies[-1]
+        )
+    )
+
+
+def main():
+    S = get_settings()
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("-n", type=int, default=200)
+    ap.add_argument("--phones", type=int, default=50, help="distinct destination numbers")
+    ap.add_argument("--concurrency", type=int, default=S.SMS_SEND_CONCURRENCY)
+    ap.add_argument("--rate", type=float, default=S.SMS_RATE_PER_SEC)
+    ap.add_argument("--burst", type=int, default=S.SMS_RATE_BURST)
+    ap.add_argument("--per-phone", type=float, default=S.SMS_PER_PHONE_INTERVAL_SEC)
+    args = ap.parse_args()
+    pool = SmsSenderPool(
+        sms_service,
+        concurrency=args.concurrency,
+        rate_per_sec=args.rate,
+        burst=args.burst,
+        per_phone_interval_sec=args.per_phone,
+        queue_max=max(args.n, 1),
+    )
+    asyncio.run(run(args.n, args.phones, pool))
+
+
+if __name__ == "__main__":
+    main()
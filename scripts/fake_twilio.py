@@ -0,0 +1,50 @@
+"""
+Local stand-in for the Twilio Messages API, for offline SMS load tests.
+
+    uvicorn scripts.fake_twilio:app --port 8099
+    TWILIO_API_BASE_URL=http://127.0.0.1:8099 TWILIO_ACCOUNT_SID=AC... ...
+
+FAKE_TWILIO_LATENCY_MS (default 150) and FAKE_TWILIO_ERROR_RATE (default 0)
+shape the responses.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Form
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_TWILIO_LATENCY_MS", "150"))
+ERROR_RATE = float(os.getenv("FAKE_TWILIO_ERROR_RATE", "0"))
+
+app = FastAPI(title="fake-twilio")
+stats = {"accepted": 0, "rejected": 0}
+
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def create_message(account_sid: str, To: str = Form(...), Body: str = Form(...), From: str = Form(None)):
+    await asyncio.sleep(random.uniform(0.5, 1.5) * LATENCY_MS / 1000)
+    if random.random() < ERROR_RATE:
+        stats["rejected"] += 1
+        return JSONResponse(
+            {"code": 20429, "message": "Too Many Requests", "status": 429}, status_code=429
+        )
+    stats["accepted"] += 1
+    return JSONResponse(
+        {
+            "sid": "SM" + uuid.uuid4().hex,
+            "account_sid": account_sid,
+            "to": To,
+            "from": From,
+            "body": Body,
+            "status": "queued",
+        },
+        status_code=201,
+    )
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
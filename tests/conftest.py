@@ -16,7 +16,7 @@ from app.config import get_settings
 @pytest_asyncio.fixture(autouse=True, loop_scope="function")
 async def _db_clean():
     async with engine.begin() as conn:
-        for tbl in ["events_outbox", "ledger_entries", "registrations", "sessions", "wallets", "users"]:
+        for tbl in ["events_outbox", "ledger_entries", "registrations", "sessions", "session_series", "wallets", "ledger_balance_checkpoints", "wallet_shadows", "ledger_cursors", "ledger_settle_marks", "wallet_totals", "wallet_total_deltas", "session_financials", "users"]:
             try:
                 await conn.exec_driver_sql(f"TRUNCATE TABLE {tbl} RESTART IDENTITY CASCADE;")
             except Exception:
@@ -131,7 +131,7 @@ def _stub_promotion_queue(monkeypatch):
 async def _db_clean():
     from app.db import engine
     async with engine.begin() as conn:
-        for tbl in ["events_outbox", "ledger_entries", "registrations", "sessions", "wallets", "users"]:
+        for tbl in ["events_outbox", "ledger_entries", "registrations", "sessions", "session_series", "wallets", "ledger_balance_checkpoints", "wallet_shadows", "ledger_cursors", "ledger_settle_marks", "wallet_totals", "wallet_total_deltas", "session_financials", "users"]:
             try:
                 await conn.exec_driver_sql(f"TRUNCATE TABLE {tbl} RESTART IDENTITY CASCADE;")
             except Exception:
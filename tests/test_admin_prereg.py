@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.domain.schemas.registration import AdminPreregItemIn
+from app.models import Session as SessionModel
+from app.repos.wallets import get_wallet_summary
+from app.services.admin_prereg_service import prereg_batch_on_create
+from tests.conftest import mk_user, deposit, mk_session
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_batch_prereg_decides_in_item_order(db):
+    fee = 1000
+    sid = await mk_session(
+        db, title="prereg", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=3),
+        tz="UTC", capacity=2, fee_cents=fee,
+    )
+    a = await mk_user(db, "pa@x.test", "A")
+    b = await mk_user(db, "pb@x.test", "B")
+    poor = await mk_user(db, "pp@x.test", "Poor")
+    await deposit(db, a, 5_000)
+    await deposit(db, b, 5_000)
+    sess = await db.get(SessionModel, sid)
+
+    items = [
+        AdminPreregItemIn(user_id=a, seats=1),
+        AdminPreregItemIn(user_id=b, seats=2, guest_names=["G1"]),  # 1 seat left -> waitlisted
+        AdminPreregItemIn(user_id=poor, seats=1),
+        AdminPreregItemIn(user_id=uuid.uuid4(), seats=1),
+        AdminPreregItemIn(user_id=a, seats=1),
+    ]
+    results = await prereg_batch_on_create(db, session=sess, items=items)
+    await db.commit()
+
+    assert [(r.state, r.waitlist_pos, r.error) for r in results] == [
+        ("confirmed", None, None),
+        ("waitlisted", 1, None),
+        ("rejected", None, "insufficient_funds"),
+        ("rejected", None, "user_disabled_or_missing"),
+        ("rejected", None, "already_registered_or_waitlisted"),
+    ]
+    wa = await get_wallet_summary(db, a)
+    wb = await get_wallet_summary(db, b)
+    assert (wa.posted_cents, wa.holds_cents) == (5_000 - fee, 0)
+    assert (wb.posted_cents, wb.holds_cents) == (5_000, 2 * fee)
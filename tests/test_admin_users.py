@@ -0,0 +1,73 @@
+import pytest
+
+from app.api.routers.admin_users import admin_get_user, admin_list_users
+from app.models import User
+from tests.conftest import mk_user, deposit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _list(db, admin, **kw):
+    params = {"q": None, "limit": 50, "cursor": None, "offset": 0}
+    params.update(kw)
+    return await admin_list_users(db=db, current=admin, **params)
+
+
+async def test_search_and_keyset_pages(db):
+    admin_id = await mk_user(db, "root@x.test", "Root")
+    admin = await db.get(User, admin_id)
+    admin.is_admin = True
+    await db.commit()
+    for i in range(5):
+        await mk_user(db, f"player{i}@club.test", f"Player {i}")
+    await mk_user(db, "odd_one@x.test", "100% Fan")
+
+    # substring on name or email, case-insensitive; LIKE wildcards in q are literal
+    found = await _list(db, admin, q="CLUB")
+    assert {r.email for r in found.items} == {f"player{i}@club.test" for i in range(5)}
+    assert (found.total, found.total_is_estimate) == (5, False)
+    assert [r.name for r in (await _list(db, admin, q="100%")).items] == ["100% Fan"]
+    assert (await _list(db, admin, q="p_a")).items == []
+    assert [r.email for r in (await _list(db, admin, q="odd_")).items] == ["odd_one@x.test"]
+    # a colon in q stays part of the search term (not a bind parameter in the count's EXPLAIN)
+    await mk_user(db, "coach@x.test", "Team :b Coach")
+    found = await _list(db, admin, q="team :b")
+    assert [r.name for r in found.items] == ["Team :b Coach"]
+    assert (found.total, found.total_is_estimate) == (1, False)
+
+    seen, cursor = [], None
+    while True:
+        page = await _list(db, admin, q="player", limit=2, cursor=cursor)
+        seen += [r.id for r in page.items]
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == len(set(seen)) == 5
+
+
+async def test_user_detail_pages_sections_and_summarizes(db):
+    admin_id = await mk_user(db, "root@x.test", "Root")
+    admin = await db.get(User, admin_id)
+    admin.is_admin = True
+    await db.commit()
+    uid = await mk_user(db, "member@x.test", "Member")
+    for amount in (100, 200, 300, 400, 500):
+        await deposit(db, uid, amount)
+
+    params = dict(reg_limit=100, reg_cursor=None, summary=False, summary_items=5, current=admin)
+    amounts, cursor = [], None
+    while True:
+        out = await admin_get_user(uid, ledger_limit=2, ledger_cursor=cursor, **params)
+        amounts += [r.amount_cents for r in out.ledger]
+        if out.ledger_next_cursor is None:
+            break
+        cursor = out.ledger_next_cursor
+    assert amounts == [500, 400, 300, 200, 100]
+    assert out.wallet.posted_cents == 1_500
+    assert out.ledger_count is None
+
+    params["summary"], params["summary_items"] = True, 2
+    summary = await admin_get_user(uid, ledger_limit=100, ledger_cursor=None, **params)
+    assert [r.amount_cents for r in summary.ledger] == [500, 400]
+    assert (summary.ledger_count, summary.registrations_count) == (5, 0)
+    assert summary.ledger_next_cursor is None
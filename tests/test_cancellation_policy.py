@@ -111,3 +111,45 @@ async def test_cancellation_closed_session_disallowed(db: AsyncSession, monkeypa
         )
     assert state == "session_closed"
     assert refund == 0 and penalty == 0
+
+
+async def test_admin_cancel_session_refunds_and_releases_in_bulk(db: AsyncSession):
+    from sqlalchemy import select
+    from app.models import EventsOutbox, Registration
+    from app.repos.wallets import get_wallet_summary
+    from app.services.session_lifecycle import admin_update_session
+
+    fee = 1200
+    sid = await mk_session(
+        db, title="bulk-cancel", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=2),
+        tz="UTC", capacity=1, fee_cents=fee,
+    )
+    confirmed_uid = await mk_user(db, "bc1@x.test", "BC1")
+    waitlisted_uid = await mk_user(db, "bc2@x.test", "BC2")
+    for uid in (confirmed_uid, waitlisted_uid):
+        await deposit(db, uid, 10_000)
+    await _mk_confirmed(sid, confirmed_uid)
+    await _mk_confirmed(sid, waitlisted_uid)  # capacity 1 -> waitlisted
+
+    async with SessionLocal() as s:
+        await admin_update_session(s, session_id=sid, new_capacity=None, new_status="canceled")
+
+    async with SessionLocal() as s:
+        w1 = await get_wallet_summary(s, confirmed_uid)
+        w2 = await get_wallet_summary(s, waitlisted_uid)
+        assert (w1.posted_cents, w1.holds_cents) == (10_000, 0)
+        assert (w2.posted_cents, w2.holds_cents) == (10_000, 0)
+
+        regs = (await s.execute(select(Registration).where(Registration.session_id == sid))).scalars().all()
+        assert {r.state for r in regs} == {"canceled"}
+        assert {r.canceled_from_state for r in regs} == {"confirmed", "waitlisted"}
+
+        payloads = [
+            e.payload for e in (await s.execute(
+                select(EventsOutbox).where(EventsOutbox.channel == f"session:{sid}").order_by(EventsOutbox.id)
+            )).scalars().all()
+        ]
+        results = [p for p in payloads if p["type"] == "registration_canceled"]
+        assert sorted((p["refund_cents"], p["released_cents"]) for p in results) == [(0, fee), (fee, 0)]
+        assert payloads[-1]["type"] == "session_canceled"
+        assert payloads[-1]["registrations_canceled"] == 2
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.models import LedgerBalanceCheckpoint
+from app.repos import ledger_repo
+from app.repos.ledger_checkpoints import balances_after, write_checkpoints
+from tests.conftest import mk_user, deposit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_checkpoints_are_incremental_and_feed_running_balances(db):
+    a = await mk_user(db, "ca@x.test", "A")
+    b = await mk_user(db, "cb@x.test", "B")
+    for amount in (100, 200, 300, 400, 500):           # ids 1..5
+        await deposit(db, a, amount)
+    await ledger_repo.apply_ledger_entry(              # id 6: holds only
+        db, user_id=a, kind="hold", amount_cents=50, idempotency_key="ck-hold"
+    )
+    await db.commit()
+    await deposit(db, b, 1_000)                        # id 7
+
+    upto, written = await write_checkpoints(db, after_id=0, every=2, batch=1000)
+    await db.commit()
+    assert (upto, written) == (7, 3)
+    cps = (await db.execute(
+        select(LedgerBalanceCheckpoint.ledger_id, LedgerBalanceCheckpoint.posted_cents, LedgerBalanceCheckpoint.holds_cents)
+        .where(LedgerBalanceCheckpoint.user_id == a)
+        .order_by(LedgerBalanceCheckpoint.ledger_id)
+    )).all()
+    assert [tuple(r) for r in cps] == [(2, 300, 0), (4, 1_000, 0), (6, 1_500, 50)]
+    assert await write_checkpoints(db, after_id=7, every=2, batch=1000) == (7, 0)
+
+    # the next checkpoint counts from the user's last one, not from the high-water mark
+    await deposit(db, a, 600)                          # id 8
+    await deposit(db, a, 700)                          # id 9
+    assert await write_checkpoints(db, after_id=7, every=2, batch=1000) == (9, 1)
+    await db.commit()
+
+    page = [(9, a), (8, a), (6, a), (5, a), (3, a), (7, b)]
+    assert await balances_after(db, page) == {9: 2_800, 8: 2_100, 6: 1_500, 5: 1_500, 3: 600, 7: 1_000}
+    assert await balances_after(db, []) == {}
+
+
+async def test_entry_committing_late_is_not_skipped(db):
+    a = await mk_user(db, "la@x.test", "A")
+    b = await mk_user(db, "lb@x.test", "B")
+
+    # b's entry takes id 1 but its transaction is still open while a's ids 2 and 3 commit
+    late = SessionLocal()
+    await ledger_repo.apply_ledger_entry(late, user_id=b, kind="deposit_in", amount_cents=50, idempotency_key="late")
+    await deposit(db, a, 100)                          # id 2
+    await deposit(db, a, 200)                          # id 3
+
+    assert await write_checkpoints(db, after_id=0, every=1, batch=1000) == (0, 0)
+    await db.commit()
+
+    await late.commit()
+    await late.close()
+    assert await write_checkpoints(db, after_id=0, every=1, batch=1000) == (3, 3)
+    await db.commit()
+    cps = (await db.execute(
+        select(LedgerBalanceCheckpoint.user_id, LedgerBalanceCheckpoint.ledger_id, LedgerBalanceCheckpoint.posted_cents)
+        .order_by(LedgerBalanceCheckpoint.ledger_id)
+    )).all()
+    assert [tuple(r) for r in cps] == [(b, 1, 50), (a, 2, 100), (a, 3, 300)]
@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from redis.asyncio import from_url
+from sqlalchemy import select, update
+
+from app.api.routers.sessions import SessionPatchIn, get_session, patch_session
+from app.config import get_settings
+from app.models import EventsOutbox, User
+from app.repos.outbox import add_outbox_event, mark_failed
+from app.services import session_versions
+from app.services.session_versions import K_SESSION_VERSIONS, K_LIST_VERSION
+from app.workers import outbox_dispatcher
+from tests.conftest import mk_session, mk_user
+
+pytestmark = pytest.mark.asyncio
+
+
+class _FakePipeline:
+    def __init__(self, owner):
+        self.owner = owner
+        self.calls = []
+
+    def publish(self, channel, data):
+        self.calls.append(("publish", channel, None))
+
+    def xadd(self, stream, fields, **_kw):
+        self.calls.append(("xadd", stream, None))
+
+    def hset(self, key, field, value):
+        self.calls.append(("hset", key, (field, value)))
+
+    def incr(self, key):
+        self.calls.append(("incr", key, None))
+
+    async def execute(self, raise_on_error=True):
+        self.owner.round_trips += 1
+        out = []
+        for cmd, target, args in self.calls:
+            if target in self.owner.fail_channels:
+                out.append(ConnectionError("boom"))
+            elif cmd == "xadd" and target in self.owner.fail_streams:
+                out.append(Exception("OOM command not allowed"))
+            elif cmd == "publish":
+                self.owner.published.append(target)
+                out.append(1)
+            elif cmd == "hset":
+                field, value = args
+                self.owner.hashes.setdefault(target, {})[field] = str(value)
+                out.append(1)
+            elif cmd == "incr":
+                self.owner.counters[target] = self.owner.counters.get(target, 0) + 1
+                out.append(self.owner.counters[target])
+            else:
+                self.owner.streamed.append(target)
+                out.append("1-0")
+        return out
+
+
+class _FakeRedis:
+    def __init__(self, fail_channels=(), fail_streams=()):
+        self.fail_channels = set(fail_channels)
+        self.fail_streams = set(fail_streams)
+        self.published = []
+        self.streamed = []
+        self.hashes = {}
+        self.counters = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+async def _seed(db, channels, type_="t"):
+    for ch in channels:
+        await add_outbox_event(db, channel=ch, payload={"type": type_, "channel": ch})
+    await db.commit()
+
+
+async def test_batch_published_in_one_round_trip(db, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    await _seed(db, ["session:a", "session:b", "session:a"])
+
+    handled = await outbox_dispatcher.publish_once(db)
+
+    assert handled == 3
+    assert fake.round_trips == 1
+    assert fake.published == ["session:a", "session:b", "session:a"]
+
+    rows = (await db.execute(select(EventsOutbox).order_by(EventsOutbox.id))).scalars().all()
+    assert all(r.sent_at is not None and r.attempts == 1 and r.error is None for r in rows)
+
+
+async def test_failed_publish_is_rescheduled_with_backoff(db, monkeypatch):
+    fake = _FakeRedis(fail_channels={"session:bad"})
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    await _seed(db, ["session:ok", "session:bad"])
+    before = datetime.now(timezone.utc)
+
+    await outbox_dispatcher.publish_once(db)
+
+    rows = {
+        r.channel: r
+        for r in (await db.execute(select(EventsOutbox))).scalars().all()
+    }
+    assert rows["session:ok"].sent_at is not None
+    bad = rows["session:bad"]
+    assert bad.sent_at is None
+    assert bad.attempts == 1
+    assert bad.error == "boom"
+    assert bad.available_at > before
+
+    # not ready yet -> nothing to do on the next pass
+    assert await outbox_dispatcher.publish_once(db) == 0
+
+
+async def test_backoff_stays_capped_after_many_attempts(db):
+    await _seed(db, ["session:stuck"])
+    evt = (await db.execute(select(EventsOutbox))).scalar_one()
+    await db.execute(update(EventsOutbox).values(attempts=5000))
+    await db.commit()
+
+    await mark_failed(db, [evt.id], error="boom", base_delay_sec=1.0, max_delay_sec=300)
+    await db.commit()
+
+    row = (await db.execute(select(EventsOutbox).execution_options(populate_existing=True))).scalar_one()
+    assert row.attempts == 5001
+    assert row.available_at <= datetime.now(timezone.utc) + timedelta(seconds=301)
+
+
+async def test_partitions_split_channels_without_overlap(db, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    channels = [f"session:{i}" for i in range(8)] * 2
+    await _seed(db, channels)
+
+    handled = 0
+    for p in range(3):
+        before = len(fake.published)
+        handled += await outbox_dispatcher.publish_once(db, partition=p, partitions=3)
+        mine = fake.published[before:]
+        # a channel lives in exactly one partition, in id order
+        assert all(mine.count(ch) == 2 for ch in set(mine))
+
+    assert handled == len(channels)
+    assert sorted(fake.published) == sorted(channels)
+
+
+async def test_sms_events_also_go_to_durable_stream(db, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    await _seed(db, ["session:a"], type_="registration_confirmed")
+    await _seed(db, ["session:a"], type_="session_status_changed")
+
+    await outbox_dispatcher.publish_once(db)
+
+    assert fake.round_trips == 1
+    assert fake.published == ["session:a", "session:a"]
+    # only the confirmation goes to the SMS stream; both feed the participants projector
+    assert fake.streamed == ["sms:events", "sessions:events", "sessions:events"]
+
+
+async def test_session_events_move_read_versions(db, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    await _seed(db, ["session:a", "session:b", "session:a", "request:r1"])
+    ids = {
+        r.channel: r.id
+        for r in (await db.execute(select(EventsOutbox).order_by(EventsOutbox.id))).scalars().all()
+    }
+
+    await outbox_dispatcher.publish_once(db)
+
+    # latest event id per session; one list bump per batch
+    assert fake.hashes[K_SESSION_VERSIONS] == {"a": str(ids["session:a"]), "b": str(ids["session:b"])}
+    assert fake.counters == {K_LIST_VERSION: 1}
+
+
+async def test_failed_side_command_holds_back_rest_of_channel(db, monkeypatch):
+    # the SMS XADD of the 2nd session:a event fails while its PUBLISH goes out
+    fake = _FakeRedis(fail_streams={"sms:events"})
+    monkeypatch.setattr(outbox_dispatcher, "redis", fake)
+    await _seed(db, ["session:a"])
+    await _seed(db, ["session:a"], type_="registration_confirmed")
+    await _seed(db, ["session:a", "session:b"])
+
+    await outbox_dispatcher.publish_once(db)
+
+    rows = (await db.execute(select(EventsOutbox).order_by(EventsOutbox.id))).scalars().all()
+    assert [(r.channel, r.sent_at is not None) for r in rows] == [
+        ("session:a", True), ("session:a", False), ("session:a", False), ("session:b", True),
+    ]
+    assert rows[1].error == "OOM command not allowed"
+    assert rows[2].error == f"held back: event {rows[1].id} on this channel failed"
+    assert rows[2].available_at > datetime.now(timezone.utc)
+
+
+async def test_capacity_patch_changes_session_etag(db, monkeypatch):
+    client = from_url(get_settings().REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    monkeypatch.setattr(outbox_dispatcher, "redis", client)
+    monkeypatch.setattr(session_versions, "redis", client)
+    try:
+        admin_id = await mk_user(db, "cap-admin@x.test", "Admin")
+        admin = await db.get(User, admin_id)
+        admin.is_admin = True
+        await db.commit()
+        sid = await mk_session(
+            db, title="cap", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=1),
+            tz="UTC", capacity=4, fee_cents=0,
+        )
+        await add_outbox_event(db, channel=f"session:{sid}", payload={"type": "session_created", "session_id": str(sid)})
+        await db.commit()
+        await outbox_dispatcher.publish_once(db)
+
+        first = await get_session(sid, SimpleNamespace(headers={}), db=db)
+        etag = first.headers["etag"]
+
+        await patch_session(sid, SessionPatchIn(capacity=6), db=db, current=admin)
+        await outbox_dispatcher.publish_once(db)
+
+        fresh = await get_session(sid, SimpleNamespace(headers={"if-none-match": etag}), db=db)
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+        assert b'"capacity":6' in fresh.body
+    finally:
+        await client.aclose()
@@ -0,0 +1,127 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.db import engine
+from app.services.outbox_retention import (
+    DEFAULT,
+    drain_default,
+    drop_expired_partitions,
+    ensure_partitions,
+    list_day_partitions,
+    partition_name,
+)
+
+pytestmark = pytest.mark.asyncio
+
+# Days far in the past so nothing here collides with the partitions the migration premade.
+D0 = date(2001, 1, 10)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def _test_partitions():
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {DEFAULT} PARTITION OF events_outbox DEFAULT")
+    yield
+    async with engine.begin() as conn:
+        rows = await conn.exec_driver_sql(
+            "SELECT relname FROM pg_class WHERE relname LIKE 'events\\_outbox\\_p200%' AND relkind = 'r'"
+        )
+        for (name,) in rows.all():
+            await conn.exec_driver_sql(f"DROP TABLE {name}")
+
+
+async def _insert(db, day: date, *, sent: bool, n: int = 1) -> list[int]:
+    at = datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc)
+    ids = []
+    for _ in range(n):
+        res = await db.execute(
+            text(
+                "INSERT INTO events_outbox (channel, payload, created_at, sent_at) "
+                "VALUES ('test', '{\"k\": 1}', :at, :sent) RETURNING id"
+            ),
+            {"at": at, "sent": at if sent else None},
+        )
+        ids.append(res.scalar_one())
+    await db.commit()
+    return ids
+
+
+async def _ids_in(db, table: str) -> list[int]:
+    return list((await db.execute(text(f"SELECT id FROM {table} ORDER BY id"))).scalars().all())
+
+
+async def _names(db) -> set[str]:
+    return {name for name, _ in await list_day_partitions(db)}
+
+
+async def test_premake_creates_partitions_and_moves_default_rows(db):
+    ids = await _insert(db, D0, sent=True) + await _insert(db, D0, sent=False)
+    assert await _ids_in(db, DEFAULT) == ids
+
+    created = await ensure_partitions(db, today=D0, ahead_days=2)
+    await db.commit()
+
+    assert created == [partition_name(D0 + timedelta(days=i)) for i in range(3)]
+    assert {partition_name(D0), partition_name(D0 + timedelta(days=2))} <= await _names(db)
+    assert await _ids_in(db, partition_name(D0)) == ids
+    assert await _ids_in(db, DEFAULT) == []
+
+    # Already there: nothing to do, and inserts route to the new partition.
+    assert await ensure_partitions(db, today=D0, ahead_days=2) == []
+    more = await _insert(db, D0 + timedelta(days=1), sent=False)
+    assert await _ids_in(db, partition_name(D0 + timedelta(days=1))) == more
+
+
+async def test_expired_partition_is_archived_then_dropped(db, tmp_path):
+    old = D0 - timedelta(days=20)
+    await ensure_partitions(db, today=old, ahead_days=0)
+    await db.commit()
+    ids = await _insert(db, old, sent=True, n=3)
+
+    dropped = await drop_expired_partitions(db, today=D0, retention_days=7, archive_dir=str(tmp_path))
+
+    assert dropped == [partition_name(old)]
+    assert partition_name(old) not in await _names(db)
+    with gzip.open(tmp_path / f"{partition_name(old)}.ndjson.gz", "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == ids
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+async def test_expired_partition_with_unsent_rows_is_kept(db, tmp_path):
+    old = D0 - timedelta(days=20)
+    older = old - timedelta(days=1)
+    await ensure_partitions(db, today=older, ahead_days=1)
+    await db.commit()
+    await _insert(db, older, sent=True)
+    await _insert(db, old, sent=True)
+    pending = await _insert(db, old, sent=False)
+
+    dropped = await drop_expired_partitions(db, today=D0, retention_days=7, archive_dir=str(tmp_path))
+
+    assert dropped == [partition_name(older)]
+    assert partition_name(old) in await _names(db)
+    assert pending[0] in await _ids_in(db, partition_name(old))
+    assert not (tmp_path / f"{partition_name(old)}.ndjson.gz").exists()
+
+
+async def test_drain_default_archives_expired_and_partitions_recent(db, tmp_path):
+    expired = D0 - timedelta(days=30)
+    sent = await _insert(db, expired, sent=True, n=2)
+    unsent = await _insert(db, expired, sent=False)
+    recent = await _insert(db, D0 - timedelta(days=1), sent=True)
+
+    created, deleted = await drain_default(db, today=D0, retention_days=7, archive_dir=str(tmp_path))
+
+    assert created == [partition_name(D0 - timedelta(days=1))]
+    assert deleted == 2
+    assert await _ids_in(db, partition_name(D0 - timedelta(days=1))) == recent
+    # Unsent history stays in DEFAULT until it is delivered.
+    assert await _ids_in(db, DEFAULT) == unsent
+    (path,) = tmp_path.glob(f"{DEFAULT}_{expired:%Y%m%d}_*.ndjson.gz")
+    with gzip.open(path, "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == sent
@@ -0,0 +1,75 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import from_url
+from sqlalchemy import update
+
+from app.config import get_settings
+from app.domain.schemas.registration import AdminPreregItemIn
+from app.models import Registration, Session as SessionModel
+from app.services import participants
+from app.services.admin_prereg_service import prereg_batch_on_create
+from tests.conftest import mk_user, deposit, mk_session
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def proj_redis(monkeypatch):
+    client = from_url(get_settings().REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    monkeypatch.setattr(participants, "redis", client)
+    monkeypatch.setattr(participants, "_script", None)
+    yield client
+    await client.aclose()
+
+
+async def test_projection_rebuild_and_since_version_deltas(db, proj_redis):
+    sid = await mk_session(
+        db, title="proj", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=2),
+        tz="UTC", capacity=1, fee_cents=0,
+    )
+    a = await mk_user(db, "pa@x.test", "A")
+    b = await mk_user(db, "pb@x.test", "B")
+    await deposit(db, a, 1_000)
+    await deposit(db, b, 1_000)
+    sess = await db.get(SessionModel, sid)
+    await prereg_batch_on_create(
+        db, session=sess, items=[AdminPreregItemIn(user_id=a, seats=1), AdminPreregItemIn(user_id=b, seats=1)]
+    )
+    await db.commit()
+
+    assert await participants.read_projection(sid) is None
+    version, rows_json = await participants.rebuild(db, sid)
+    rows = json.loads(rows_json)
+    assert version == 0
+    assert [(r["host_name"], r["state"], r["waitlist_pos"], r["v"]) for r in rows] == [
+        ("A", "confirmed", None, 0),
+        ("B", "waitlisted", 1, 0),
+    ]
+
+    # A cancels, B is promoted; the projector sees outbox id 7 for the session
+    await db.execute(update(Registration).where(Registration.host_user_id == a).values(state="canceled"))
+    await db.execute(
+        update(Registration).where(Registration.host_user_id == b).values(state="confirmed", waitlist_pos=None)
+    )
+    await db.commit()
+    await participants.refresh(db, {sid: 7})
+
+    version, rows_json = await participants.read_projection(sid)
+    assert version == 7
+    rows = json.loads(rows_json)
+    assert [(r["host_name"], r["state"], r["v"]) for r in rows] == [("B", "confirmed", 7), ("A", "canceled", 7)]
+
+    # an older rebuild racing in is ignored
+    await participants.refresh(db, {sid: 3})
+    assert (await participants.read_projection(sid))[0] == 7
+
+
+async def test_rebuild_unknown_session_stores_nothing(db, proj_redis):
+    sid = uuid.uuid4()
+    assert await participants.rebuild(db, sid) is None
+    assert not await proj_redis.exists(participants.k_participants(sid))
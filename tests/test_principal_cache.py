@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.auth import deps, principal_cache
+from app.auth.jwt import create_jwt
+from app.models import User
+from tests.conftest import mk_user
+
+pytestmark = pytest.mark.asyncio
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+class _Req:
+    def __init__(self, token):
+        self.cookies = {deps.S.SESSION_COOKIE_NAME: token}
+        self.scope = {}
+
+
+class _CountingDb:
+    """Wraps the test session and counts round trips."""
+    def __init__(self, db):
+        self.db = db
+        self.calls = 0
+
+    async def execute(self, *a, **kw):
+        self.calls += 1
+        return await self.db.execute(*a, **kw)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(principal_cache, "redis", fake)
+    principal_cache._local.clear()
+    yield fake
+    principal_cache._local.clear()
+
+
+async def _auth(db, user_id):
+    token = create_jwt({"sub": str(user_id)}, expires_in=timedelta(minutes=5))
+    return await deps.get_current_user(_Req(token), db)
+
+
+async def test_second_request_skips_db(db, fake_redis):
+    uid = await mk_user(db, "p1@example.com", "P1")
+    counting = _CountingDb(db)
+
+    first = await _auth(counting, uid)
+    second = await _auth(counting, uid)
+
+    assert counting.calls == 1
+    assert first.id == second.id == uid
+    assert second.email == "p1@example.com"
+
+
+async def test_invalidate_locks_out_disabled_user(db, fake_redis):
+    uid = await mk_user(db, "p2@example.com", "P2")
+    await _auth(db, uid)
+
+    await db.execute(update(User).where(User.id == uid).values(status="disabled"))
+    await db.commit()
+    await principal_cache.invalidate_principal(uid)
+
+    with pytest.raises(HTTPException) as exc:
+        await _auth(db, uid)
+    assert exc.value.status_code == 401
+    # the tombstone keeps a stale fill out of Redis
+    assert fake_redis.data[principal_cache.k_principal(uid)] == principal_cache.TOMBSTONE
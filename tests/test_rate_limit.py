@@ -0,0 +1,51 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from redis.asyncio import from_url
+
+from app.config import get_settings
+from app.services import rate_limit
+from app.services.rate_limit import Bucket, check_limits
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def rl_redis(monkeypatch):
+    client = from_url(get_settings().REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    monkeypatch.setattr(rate_limit, "redis", client)
+    monkeypatch.setattr(rate_limit, "_script", None)
+    rate_limit._blocked.clear()
+    yield client
+    rate_limit._blocked.clear()
+    await client.aclose()
+
+
+async def test_burst_up_to_limit_then_precise_retry_after(rl_redis):
+    b = Bucket("rl:test:user:1", limit=3, window_sec=10)
+    for _ in range(3):
+        await check_limits(b)
+
+    with pytest.raises(HTTPException) as exc:
+        await check_limits(b)
+    assert exc.value.status_code == 429
+    # one slot frees up every window/limit seconds
+    assert 1 <= int(exc.value.headers["Retry-After"]) <= 4
+
+
+async def test_denied_check_charges_no_bucket(rl_redis):
+    ip = Bucket("rl:test:ip:1", limit=10, window_sec=10)
+    user = Bucket("rl:test:user:2", limit=1, window_sec=10)
+    await check_limits(ip, user)
+    tat_after_first = await rl_redis.get(ip.key)
+
+    with pytest.raises(HTTPException):
+        await check_limits(ip, user)
+    assert await rl_redis.get(ip.key) == tat_after_first
+
+    # only the bucket that was over is remembered by the in-process pre-filter
+    await rl_redis.flushdb()
+    with pytest.raises(HTTPException):
+        await check_limits(user)
+    await check_limits(ip)
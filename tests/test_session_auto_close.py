@@ -1,14 +1,22 @@
+import time
 from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
 
 import pytest
+import pytest_asyncio
+from redis.asyncio import from_url
+from sqlalchemy import update
 
+from app.config import get_settings
 from app.models import Session as SessionModel
 from app.models import Registration
 from app.repos import session_repo as sess_repo
 from app.repos.wallets import get_wallet_summary
+from app.services import session_auto_close
 from app.services.registration_allocator import process_registration_request
-from app.services.session_auto_close import close_due_sessions
+from app.services.session_auto_close import CLOSE_AFTER, K_CLOSE_QUEUE, close_due_at, close_due_sessions
 from app.services.session_lifecycle import admin_update_session
+from app.workers import session_closer
 from tests.conftest import mk_session, mk_user, deposit
 from app.db import SessionLocal
 
@@ -152,3 +160,82 @@ async def test_admin_close_releases_waitlist_holds(db):
     reg = await db.get(Registration, reg_id)
     assert reg.state == "canceled"
     assert reg.waitlist_pos is None
+
+
+async def test_bulk_ledger_entries_are_idempotent_and_aggregated(db):
+    from app.repos import ledger_repo
+
+    uid = await mk_user(db, "bulk@x.test", "Bulk")
+    await deposit(db, uid, 10_000)
+    entries = [
+        {"user_id": uid, "kind": "penalty", "amount_cents": -300, "idempotency_key": "bulk:1"},
+        {"user_id": uid, "kind": "refund", "amount_cents": 100, "idempotency_key": "bulk:2"},
+    ]
+
+    inserted = await ledger_repo.apply_ledger_entries(db, entries)
+    await db.commit()
+    assert len(inserted) == 2
+
+    # replay: nothing inserted, wallet untouched
+    assert await ledger_repo.apply_ledger_entries(db, entries) == []
+    await db.commit()
+
+    w = await get_wallet_summary(db, uid)
+    assert w.posted_cents == 10_000 - 300 + 100
+
+
+@pytest_asyncio.fixture
+async def close_queue(monkeypatch):
+    client = from_url(get_settings().REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    monkeypatch.setattr(session_closer, "redis", client)
+    monkeypatch.setattr(session_auto_close, "redis", client)
+    yield client
+    await client.aclose()
+
+
+async def _queued(db, close_queue, title, starts_at, *, score=None):
+    sid = await mk_session(db, title=title, starts_at_utc=starts_at, tz="UTC", capacity=4, fee_cents=0)
+    await close_queue.zadd(K_CLOSE_QUEUE, {str(sid): close_due_at(starts_at) if score is None else score})
+    return sid
+
+
+async def test_queue_closes_at_due_time_and_fixes_stale_entries(db, close_queue):
+    now = datetime.now(timezone.utc)
+    due = await _queued(db, close_queue, "due now", now - CLOSE_AFTER)
+    later = await _queued(db, close_queue, "due in an hour", now - CLOSE_AFTER + timedelta(hours=1))
+    moved = await _queued(db, close_queue, "rescheduled", now + timedelta(days=1), score=time.time() - 60)
+    gone = await _queued(db, close_queue, "canceled", now - timedelta(hours=3))
+    await db.execute(update(SessionModel).where(SessionModel.id == gone).values(status="canceled"))
+    await db.commit()
+
+    assert await session_closer.close_queued_once() == 1
+
+    assert (await db.get(SessionModel, due, populate_existing=True)).status == "closed"
+    assert (await db.get(SessionModel, moved, populate_existing=True)).status == "scheduled"
+    queue = dict(await close_queue.zrange(K_CLOSE_QUEUE, 0, -1, withscores=True))
+    assert set(queue) == {str(later), str(moved)}
+    # the stale entry was put back at the rescheduled session's real close time
+    assert queue[str(moved)] == pytest.approx(close_due_at(now + timedelta(days=1)))
+    assert queue[str(later)] == pytest.approx(close_due_at(now - CLOSE_AFTER + timedelta(hours=1)))
+
+    assert await session_closer.close_queued_once() == 0
+
+
+async def test_closer_sleeps_until_the_queue_head_is_due(close_queue, monkeypatch):
+    waits = []
+
+    async def _sleep(sec):
+        waits.append(sec)
+
+    monkeypatch.setattr(session_closer, "asyncio", SimpleNamespace(sleep=_sleep))
+
+    await session_closer._sleep_until_next_due()
+    await close_queue.zadd(K_CLOSE_QUEUE, {"a": time.time() + 2})
+    await session_closer._sleep_until_next_due()
+    await close_queue.zadd(K_CLOSE_QUEUE, {"b": time.time() - 10})
+    await session_closer._sleep_until_next_due()
+
+    assert waits[0] == session_closer.S.AUTO_CLOSE_POLL_SEC
+    assert 1.5 < waits[1] <= 2
+    assert waits[2] == 0.05
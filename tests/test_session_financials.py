@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Response
+from sqlalchemy import update
+
+from app.api.routers.sessions import admin_session_financials, admin_sessions_financials, list_admin_session_history
+from app.models import Session as SessionModel, User
+from app.repos import ledger_repo, session_financials
+from tests.conftest import mk_user, deposit, mk_session
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_rollup_follows_ledger_writes(db):
+    admin_id = await mk_user(db, "root@x.test", "Root")
+    admin = await db.get(User, admin_id)
+    admin.is_admin = True
+    await db.commit()
+    base = datetime(2025, 3, 1, 18, 0, tzinfo=timezone.utc)
+    sid = await mk_session(db, title="Paid", starts_at_utc=base, tz="UTC", capacity=4, fee_cents=500)
+    other = await mk_session(db, title="Free", starts_at_utc=base + timedelta(days=1), tz="UTC", capacity=4, fee_cents=0)
+    a = await mk_user(db, "fa@x.test", "A")
+    b = await mk_user(db, "fb@x.test", "B")
+    await deposit(db, a, 2_000)                       # no session: not rolled up
+
+    for kind, amount in (("hold", 500), ("hold_release", -500), ("fee_capture", -500)):
+        await ledger_repo.apply_ledger_entry(
+            db, user_id=a, kind=kind, amount_cents=amount, session_id=sid, idempotency_key=f"sf-{kind}"
+        )
+    await ledger_repo.apply_ledger_entry(
+        db, user_id=b, kind="penalty", amount_cents=-200, session_id=sid, idempotency_key="sf-pen"
+    )
+    await ledger_repo.apply_ledger_entries(db, [
+        {"user_id": a, "kind": "refund", "amount_cents": 100, "session_id": sid, "idempotency_key": "sf-ref"},
+        {"user_id": b, "kind": "hold", "amount_cents": 300, "session_id": sid, "idempotency_key": "sf-hold-b"},
+    ])
+    await db.execute(update(SessionModel).values(status="closed"))
+    await db.commit()
+
+    money = await session_financials.get_many(db, [sid, other])
+    f = money[sid]
+    assert (f.captured_cents, f.refunded_cents, f.penalties_cents, f.holds_outstanding_cents, f.net_cents) == (
+        500, 100, 200, 300, 600,
+    )
+    assert money[other].net_cents == 0
+
+    out = await admin_session_financials(sid, db=db, current=admin)
+    assert (out.net_cents, out.holds_outstanding_cents) == (600, 300)
+
+    history = await list_admin_session_history(
+        Response(), db=db, current=admin, limit=10, cursor=None, status_=["closed"],
+        starts_from=None, starts_before=None, q=None,
+    )
+    assert [(h.title, h.financials.captured_cents) for h in history] == [("Free", 0), ("Paid", 500)]
+
+    totals = await admin_sessions_financials(
+        db=db, current=admin, status_=["closed"], starts_from=base, starts_before=base + timedelta(days=7)
+    )
+    assert (totals.sessions, totals.captured_cents, totals.net_cents) == (2, 500, 600)
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models import Session as SessionModel
+from app.repos import session_repo
+from tests.conftest import mk_session
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_history_keyset_pages_and_filters(db):
+    base = datetime(2025, 1, 1, 18, 0, tzinfo=timezone.utc)
+    ids = []
+    for i in range(5):
+        # two sessions share every start time: the id breaks the tie
+        ids.append(await mk_session(
+            db, title=f"Week {i // 2}", starts_at_utc=base + timedelta(days=7 * (i // 2)),
+            tz="UTC", capacity=4, fee_cents=0,
+        ))
+    await db.execute(update(SessionModel).values(status="closed"))
+    await db.execute(update(SessionModel).where(SessionModel.id == ids[4]).values(status="canceled"))
+    await db.commit()
+
+    seen, after = [], None
+    while True:
+        page = await session_repo.list_history(db, after=after, limit=2)
+        seen += [s.id for s, _, _ in page]
+        if len(page) < 2:
+            break
+        after = (page[-1][0].starts_at, page[-1][0].id)
+    assert sorted(seen) == sorted(ids[:4])
+    assert len(set(seen)) == 4
+    starts = [s.starts_at for s, _, _ in await session_repo.list_history(db, limit=10)]
+    assert starts == sorted(starts, reverse=True)
+
+    both = await session_repo.list_history(db, statuses=["closed", "canceled"], title_q="week 2", limit=10)
+    assert [s.id for s, _, _ in both] == [ids[4]]
+    ranged = await session_repo.list_history(
+        db, starts_from=base + timedelta(days=7), starts_before=base + timedelta(days=8), limit=10
+    )
+    assert sorted(s.id for s, _, _ in ranged) == sorted(ids[2:4])
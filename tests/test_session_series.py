@@ -0,0 +1,70 @@
+from datetime import date, datetime, time, timezone
+
+import pytest
+from sqlalchemy import select, func
+
+from app.domain.schemas.registration import AdminPreregItemIn
+from app.models import Session as SessionModel
+from app.repos.wallets import get_wallet_summary
+from app.services.session_series import create_series, materialize_series, occurrences
+from tests.conftest import mk_user, deposit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_occurrences_follow_local_time_across_dst_and_skip_exceptions():
+    starts = occurrences(
+        timezone_name="America/Vancouver",
+        weekdays=[1],  # Tuesdays
+        local_time=time(19, 0),
+        starts_on=date(2026, 10, 20),
+        exceptions=[date(2026, 10, 27)],
+        after=datetime(2026, 10, 1, tzinfo=timezone.utc),
+        count=3,
+    )
+    # PDT (UTC-7) until Nov 1st, PST (UTC-8) after
+    assert starts == [
+        datetime(2026, 10, 21, 2, 0, tzinfo=timezone.utc),
+        datetime(2026, 11, 4, 3, 0, tzinfo=timezone.utc),
+        datetime(2026, 11, 11, 3, 0, tzinfo=timezone.utc),
+    ]
+
+
+async def test_materialize_creates_sessions_and_standing_preregs(db):
+    fee = 1000
+    a = await mk_user(db, "sa@x.test", "A")
+    b = await mk_user(db, "sb@x.test", "B")
+    await deposit(db, a, 10_000)
+    await deposit(db, b, 1_500)  # enough for one session only
+
+    series = await create_series(
+        db,
+        title="Tuesday league",
+        timezone_name="UTC",
+        weekdays=[1, 3],
+        local_time=time(18, 30),
+        starts_on=date(2030, 1, 1),
+        exceptions=[date(2030, 1, 3)],
+        capacity=8,
+        fee_cents=fee,
+        preregistrations=[AdminPreregItemIn(user_id=a, seats=1), AdminPreregItemIn(user_id=b, seats=1)],
+    )
+    now = datetime(2029, 12, 31, tzinfo=timezone.utc)
+    created = await materialize_series(db, series, count=3, now=now)
+    await db.commit()
+
+    assert [s.starts_at.date() for s, _ in created] == [date(2030, 1, 1), date(2030, 1, 8), date(2030, 1, 10)]
+    assert [[r.state for r in results] for _, results in created] == [
+        ["confirmed", "confirmed"],
+        ["confirmed", "rejected"],
+        ["confirmed", "rejected"],
+    ]
+    assert (await get_wallet_summary(db, a)).posted_cents == 10_000 - 3 * fee
+    assert (await get_wallet_summary(db, b)).posted_cents == 1_500 - fee
+
+    # the next call continues after the latest session instead of repeating dates
+    more = await materialize_series(db, series, count=1, now=now)
+    await db.commit()
+    assert [s.starts_at.date() for s, _ in more] == [date(2030, 1, 15)]
+    total = await db.scalar(select(func.count()).where(SessionModel.series_id == series.id))
+    assert total == 4
@@ -0,0 +1,277 @@
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import from_url
+
+from app.config import get_settings
+from app.models import Session as SessionModel
+from app.repos import users as users_repo
+from app.services import session_auto_close, session_reminders
+from app.services.session_reminders import K_REMINDERS, reminder_due_at
+from app.services.session_schedules import sync_session_schedules
+from app.services.sms_stream import SMS_DEAD_STREAM, SMS_GROUP, SMS_STREAM
+from app.workers import sms_notifier
+from app.workers.sms_notifier import K_ATTEMPTS, K_RETRY, SendFailed, SmsEvent, SmsGroup, k_dedupe
+from tests.conftest import mk_session
+
+pytestmark = pytest.mark.asyncio
+
+
+class _FakeSender:
+    """Stands in for the sender pool; `before_start` runs while the send is still "queued"."""
+
+    def __init__(self, ok=True, before_start=None):
+        self.ok = ok
+        self.before_start = before_start
+        self.sent = []
+
+    def backlog_sec(self):
+        return 0.0
+
+    async def submit(self, *, to, body, on_start=None):
+        if self.before_start is not None:
+            await self.before_start()
+        if on_start is not None:
+            await on_start()
+        self.sent.append((to, body))
+        return self.ok
+
+
+@pytest_asyncio.fixture
+async def sms_redis(monkeypatch):
+    client = from_url(get_settings().REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    monkeypatch.setattr(sms_notifier, "redis", client)
+    monkeypatch.setattr(sms_notifier, "_refresh_script", None)
+    monkeypatch.setattr(sms_notifier, "_release_script", None)
+    monkeypatch.setattr(sms_notifier, "sms_service", SimpleNamespace(enabled=True))
+    yield client
+    await client.aclose()
+
+
+def _sender(monkeypatch, **kw) -> _FakeSender:
+    sender = _FakeSender(**kw)
+    monkeypatch.setattr(sms_notifier, "sms_sender", sender)
+    return sender
+
+
+def _group(*reg_ids, event_type="registration_confirmed") -> SmsGroup:
+    host, sid = uuid.uuid4(), uuid.uuid4()
+    g = SmsGroup(host, sid, event_type, due_at=0.0)
+    for i, reg in enumerate(reg_ids):
+        g.events.append(SmsEvent(f"{i + 1}-0", {}, event_type, reg, host, sid, is_host=i == 0))
+    return g
+
+
+async def _pending_message(client, consumer="a") -> tuple:
+    await sms_notifier._ensure_group()
+    fields = {"payload": '{"type": "registration_confirmed"}'}
+    mid = await client.xadd(SMS_STREAM, fields)
+    await client.xreadgroup(SMS_GROUP, consumer, streams={SMS_STREAM: ">"}, count=10)
+    return mid, fields
+
+
+async def test_dedupe_sends_once_per_registration(sms_redis, monkeypatch):
+    sender = _sender(monkeypatch)
+    reg = uuid.uuid4()
+    g = _group(reg)
+
+    await sms_notifier._send(g, "+15550001", "Tuesday doubles")
+    await sms_notifier._send(g, "+15550001", "Tuesday doubles")  # redelivery
+
+    assert sender.sent == [("+15550001", "Birdie Buddies - Your session 'Tuesday doubles' has been confirmed")]
+    key = k_dedupe(reg, "registration_confirmed")
+    assert await sms_redis.get(key) == "sent"
+    assert await sms_redis.ttl(key) > sms_notifier.IN_FLIGHT_TTL_SEC
+
+    # a regrouped redelivery only texts the seats not sent yet
+    extra = uuid.uuid4()
+    await sms_notifier._send(_group(reg, extra), "+15550001", None)
+    assert sender.sent[-1] == ("+15550001", "Birdie Buddies - Your session has been confirmed")
+    assert len(sender.sent) == 2
+
+
+async def test_in_flight_claim_blocks_and_failed_send_releases(sms_redis, monkeypatch):
+    sender = _sender(monkeypatch, ok=False)
+    busy, fresh = uuid.uuid4(), uuid.uuid4()
+    await sms_redis.set(k_dedupe(busy, "registration_confirmed"), "someone-else", ex=60)
+
+    with pytest.raises(SendFailed, match="in flight"):
+        await sms_notifier._send(_group(busy), "+15550002", None)
+    assert sender.sent == []
+    assert await sms_redis.get(k_dedupe(busy, "registration_confirmed")) == "someone-else"
+
+    with pytest.raises(SendFailed, match="twilio"):
+        await sms_notifier._send(_group(fresh), "+15550002", None)
+    assert not await sms_redis.exists(k_dedupe(fresh, "registration_confirmed"))
+
+
+async def test_claim_checked_again_when_send_starts(sms_redis, monkeypatch):
+    reg = uuid.uuid4()
+    key = k_dedupe(reg, "registration_confirmed")
+
+    # expired while queued, nobody else took it: re-taken and sent
+    sender = _sender(monkeypatch, before_start=lambda: sms_redis.delete(key))
+    await sms_notifier._send(_group(reg), "+15550003", None)
+    assert len(sender.sent) == 1
+    assert await sms_redis.get(key) == "sent"
+
+    # expired while queued and claimed by another delivery: this send is dropped
+    other = uuid.uuid4()
+    other_key = k_dedupe(other, "registration_confirmed")
+    sender = _sender(monkeypatch, before_start=lambda: sms_redis.set(other_key, "someone-else"))
+    with pytest.raises(SendFailed, match="taken over"):
+        await sms_notifier._send(_group(other), "+15550003", None)
+    assert sender.sent == []
+    assert await sms_redis.get(other_key) == "someone-else"
+
+
+async def test_claim_ttl_covers_sender_backlog(monkeypatch):
+    monkeypatch.setattr(sms_notifier, "sms_sender", SimpleNamespace(backlog_sec=lambda: 500.0))
+    assert sms_notifier._claim_ttl() == sms_notifier.IN_FLIGHT_TTL_SEC + 500
+
+
+async def test_failed_message_retried_after_backoff(sms_redis):
+    mid, fields = await _pending_message(sms_redis)
+
+    before = time.time()
+    await sms_notifier._schedule_retry(mid, fields, "boom")
+    assert await sms_redis.hget(K_ATTEMPTS, mid) == "1"
+    due = await sms_redis.zscore(K_RETRY, mid)
+    assert due >= before + sms_notifier.S.SMS_RETRY_BASE_SEC
+
+    assert await sms_notifier._claim_due_retries("b") == []
+    await sms_redis.zadd(K_RETRY, {mid: 0})
+    assert await sms_notifier._claim_due_retries("b") == [(mid, fields)]
+    assert await sms_redis.zscore(K_RETRY, mid) is None
+    (pending,) = await sms_redis.xpending_range(SMS_STREAM, SMS_GROUP, "-", "+", 10)
+    assert pending["consumer"] == "b"
+
+
+async def test_exhausted_message_is_dead_lettered(sms_redis, monkeypatch):
+    monkeypatch.setattr(sms_notifier.S, "SMS_MAX_ATTEMPTS", 2)
+    mid, fields = await _pending_message(sms_redis)
+
+    await sms_notifier._schedule_retry(mid, fields, "boom")
+    await sms_notifier._schedule_retry(mid, fields, "still boom")
+
+    ((_, dead),) = await sms_redis.xrange(SMS_DEAD_STREAM)
+    assert dead["source_id"] == mid and dead["attempts"] == "2" and dead["error"] == "still boom"
+    assert (await sms_redis.xpending(SMS_STREAM, SMS_GROUP))["pending"] == 0
+    assert not await sms_redis.hexists(K_ATTEMPTS, mid)
+    assert await sms_redis.zscore(K_RETRY, mid) is None
+
+
+async def test_orphaned_message_is_reclaimed(sms_redis, monkeypatch):
+    mid, fields = await _pending_message(sms_redis, consumer="dead-replica")
+
+    monkeypatch.setattr(sms_notifier.S, "SMS_CLAIM_IDLE_SEC", 3600)
+    assert await sms_notifier._claim_orphans("b") == []
+
+    monkeypatch.setattr(sms_notifier.S, "SMS_CLAIM_IDLE_SEC", 0)
+    assert await sms_notifier._claim_orphans("b") == [(mid, fields)]
+    (pending,) = await sms_redis.xpending_range(SMS_STREAM, SMS_GROUP, "-", "+", 10)
+    assert pending["consumer"] == "b"
+
+
+async def test_events_for_one_host_and_session_coalesce_into_one_text(db, sms_redis, monkeypatch):
+    sender = _sender(monkeypatch)
+    monkeypatch.setattr(sms_notifier, "_pending", {})
+    monkeypatch.setattr(sms_notifier.S, "SMS_COALESCE_WINDOW_SEC", 60.0)
+    host = (await users_repo.upsert_by_email(db, email="host@x.com", name="Host", phone="+15550004")).id
+    await db.commit()
+    sid = await mk_session(
+        db, title="Friday smash", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=2),
+        tz="UTC", capacity=8, fee_cents=1000,
+    )
+    await sms_notifier._ensure_group()
+
+    async def _deliver(*events):
+        for is_host in events:
+            payload = {
+                "type": "registration_confirmed", "registration_id": str(uuid.uuid4()),
+                "host_user_id": str(host), "session_id": str(sid), "is_host": is_host, "seats": 1,
+            }
+            await sms_redis.xadd(SMS_STREAM, {"payload": json.dumps(payload)})
+        resp = await sms_redis.xreadgroup(SMS_GROUP, "a", streams={SMS_STREAM: ">"}, count=50)
+        await sms_notifier._process_batch(resp[0][1])
+
+    # host + two guests arrive over two reads; all stay pending inside the window
+    await _deliver(True, False)
+    await _deliver(False)
+    assert sender.sent == []
+    assert (await sms_redis.xpending(SMS_STREAM, SMS_GROUP))["pending"] == 3
+
+    await sms_notifier._flush_due(force=True)
+
+    assert sender.sent == [("+15550004", "Birdie Buddies - 3 seats confirmed for 'Friday smash'")]
+    assert (await sms_redis.xpending(SMS_STREAM, SMS_GROUP))["pending"] == 0
+    assert sms_notifier._pending == {}
+
+
+async def test_recipients_resolved_once_then_served_from_cache(db, monkeypatch):
+    monkeypatch.setattr(sms_notifier, "_host_phones", sms_notifier.LRUTTLCache(100, 300))
+    monkeypatch.setattr(sms_notifier, "_session_titles", sms_notifier.LRUTTLCache(100, 300))
+    host = (await users_repo.upsert_by_email(db, email="rc@x.com", name="Host", phone="+15550005")).id
+    no_phone = (await users_repo.upsert_by_email(db, email="np@x.com", name="No Phone")).id
+    await db.commit()
+    sid = await mk_session(
+        db, title="Cached", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=1),
+        tz="UTC", capacity=8, fee_cents=0,
+    )
+    groups = [
+        SmsGroup(host, sid, "registration_confirmed", due_at=0.0),
+        SmsGroup(no_phone, sid, "registration_confirmed", due_at=0.0),
+    ]
+    assert await sms_notifier._resolve_recipients(groups) == {(host, sid): ("+15550005", "Cached")}
+
+    def _no_db():
+        raise AssertionError("cache hit expected")
+
+    # "no phone on file" is cached too, so neither lookup goes back to Postgres
+    monkeypatch.setattr(sms_notifier, "SessionLocal", _no_db)
+    assert await sms_notifier._resolve_recipients(groups) == {(host, sid): ("+15550005", "Cached")}
+
+
+async def test_reminder_claim_lease_reschedule_and_cancel(db, sms_redis, monkeypatch):
+    monkeypatch.setattr(session_reminders, "redis", sms_redis)
+    monkeypatch.setattr(session_auto_close, "redis", sms_redis)
+    sid = await mk_session(
+        db, title="Sunday ladder", starts_at_utc=datetime.now(timezone.utc) + timedelta(days=2),
+        tz="UTC", capacity=8, fee_cents=1000,
+    )
+    sess = await db.get(SessionModel, sid)
+    await sync_session_schedules(sess)
+    assert await sms_redis.zscore(K_REMINDERS, str(sid)) == pytest.approx(reminder_due_at(sess.starts_at))
+
+    # due: one replica wins the ZREM and leaves a lease entry behind
+    await sms_redis.zadd(K_REMINDERS, {str(sid): time.time() - 1})
+    (claimed,) = await sms_notifier._claim_due_reminders()
+    assert claimed[0] == sid
+    lease = await sms_redis.zscore(K_REMINDERS, str(sid))
+    assert lease == pytest.approx(time.time() + sms_notifier.REMINDER_LEASE_SEC, abs=5)
+    assert await sms_notifier._claim_due_reminders() == []
+
+    # the replica died: once the lease runs out the session is claimed again
+    await sms_redis.zadd(K_REMINDERS, {str(sid): time.time() - 1})
+    (claimed,) = await sms_notifier._claim_due_reminders()
+    assert claimed[0] == sid
+
+    # a claim for a stale due time (the session moved) is put back at the right time
+    await sms_notifier._send_session_reminder(sid, claimed[1])
+    assert await sms_redis.zscore(K_REMINDERS, str(sid)) == pytest.approx(reminder_due_at(sess.starts_at))
+
+    sess.starts_at = sess.starts_at + timedelta(days=1)
+    await db.commit()
+    await sync_session_schedules(sess)
+    assert await sms_redis.zscore(K_REMINDERS, str(sid)) == pytest.approx(reminder_due_at(sess.starts_at))
+
+    sess.status = "canceled"
+    await db.commit()
+    await sync_session_schedules(sess)
+    assert await sms_redis.zscore(K_REMINDERS, str(sid)) is None
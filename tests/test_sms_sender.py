@@ -0,0 +1,165 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import sms
+from app.services.sms import PerKeySpacer, SmsSenderPool, TokenBucket
+
+pytestmark = pytest.mark.asyncio
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, sec):
+        self.slept.append(round(sec, 6))
+        self.now += sec
+
+
+class _AsyncioWithClock:
+    """asyncio, except that sleep() only advances the fake clock."""
+
+    def __init__(self, clock):
+        self._clock = clock
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+    async def sleep(self, sec):
+        await self._clock.sleep(sec)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(sms, "time", SimpleNamespace(monotonic=c.monotonic, perf_counter=time.perf_counter))
+    monkeypatch.setattr(sms, "asyncio", _AsyncioWithClock(c))
+    return c
+
+
+class _FakeService:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_sms(self, *, to, body):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if to == "+boom":
+                raise RuntimeError("provider down")
+            self.sent.append((to, body))
+            return to != "+fail"
+        finally:
+            self.in_flight -= 1
+
+
+def _pool(service, **kw):
+    params = dict(concurrency=2, rate_per_sec=1000.0, burst=100, per_phone_interval_sec=0.0, queue_max=10)
+    params.update(kw)
+    return SmsSenderPool(service, **params)
+
+
+async def test_bucket_spends_burst_then_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        await bucket.acquire()
+    assert clock.slept == []
+
+    await bucket.acquire()
+    assert clock.slept == [0.5]
+
+    clock.now += 60                     # refill is capped at the burst size
+    for _ in range(3):
+        await bucket.acquire()
+    assert clock.slept == [0.5]
+    await bucket.acquire()
+    assert clock.slept == [0.5, 0.5]
+
+
+async def test_spacer_spaces_each_key_separately(clock):
+    spacer = PerKeySpacer(1.0)
+    await spacer.wait("+1")
+    await spacer.wait("+2")
+    assert clock.slept == []
+
+    await spacer.wait("+1")
+    assert clock.slept == [1.0]
+
+    clock.now += 0.4
+    await spacer.wait("+1")
+    assert clock.slept == [1.0, 0.6]
+
+    await PerKeySpacer(0).wait("+1")
+    assert clock.slept == [1.0, 0.6]
+
+
+async def test_pool_bounds_concurrency_and_reports_each_result():
+    service = _FakeService(delay=0.01)
+    pool = _pool(service)
+    try:
+        results = await asyncio.gather(
+            *(pool.submit(to=to, body="hi") for to in ["+1", "+2", "+3", "+fail", "+4", "+boom"]),
+            return_exceptions=True,
+        )
+    finally:
+        await pool.stop()
+
+    assert results[:5] == [True, True, True, False, True]
+    assert isinstance(results[5], RuntimeError)
+    assert service.max_in_flight == 2
+
+
+async def test_on_start_runs_before_the_send_and_can_cancel_it():
+    service = _FakeService()
+    pool = _pool(service)
+    calls = []
+
+    async def _ok():
+        calls.append(len(service.sent))
+
+    async def _lost():
+        raise RuntimeError("claim lost")
+
+    try:
+        assert await pool.submit(to="+1", body="a", on_start=_ok) is True
+        with pytest.raises(RuntimeError, match="claim lost"):
+            await pool.submit(to="+2", body="b", on_start=_lost)
+    finally:
+        await pool.stop()
+
+    assert calls == [0]
+    assert service.sent == [("+1", "a")]
+
+
+async def test_stop_fails_pending_sends_and_pool_can_restart():
+    service = _FakeService(delay=10)
+    pool = _pool(service, concurrency=1)
+    in_flight = asyncio.ensure_future(pool.submit(to="+1", body="a"))
+    queued = asyncio.ensure_future(pool.submit(to="+2", body="b"))
+    await asyncio.sleep(0.01)
+    assert pool.backlog_sec() > 0
+
+    await pool.stop()
+
+    for fut in (in_flight, queued):
+        with pytest.raises(asyncio.CancelledError):
+            await fut
+    assert pool.backlog_sec() == 0
+    assert service.sent == []
+
+    service.delay = 0
+    try:
+        assert await pool.submit(to="+3", body="c") is True
+    finally:
+        await pool.stop()
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ttl_cache
+from app.services.ttl_cache import MISSING, LRUTTLCache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+async def test_entries_expire_after_ttl(clock):
+    cache: LRUTTLCache[str] = LRUTTLCache(maxsize=10, ttl_sec=30)
+    cache.set("a", "1")
+    clock[0] += 29.9
+    assert cache.get("a") == "1"
+    clock[0] += 0.2
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+async def test_none_is_a_cached_value(clock):
+    cache: LRUTTLCache[None] = LRUTTLCache(maxsize=10, ttl_sec=30)
+    cache.set("no-phone", None)
+    assert cache.get("no-phone") is None
+    assert cache.get("unknown") is MISSING
+
+
+async def test_least_recently_used_entry_is_evicted(clock):
+    cache: LRUTTLCache[int] = LRUTTLCache(maxsize=2, ttl_sec=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "b" is now the oldest
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+async def test_missing_dedupes_and_includes_expired(clock):
+    cache: LRUTTLCache[int] = LRUTTLCache(maxsize=10, ttl_sec=30)
+    cache.set("old", 1)
+    clock[0] += 20
+    cache.set("fresh", 2)
+    clock[0] += 15
+    assert cache.missing(["fresh", "old", "new", "old", "new"]) == ["old", "new"]
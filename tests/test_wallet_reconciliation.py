@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import update
+
+from app.models import Wallet
+from app.services.wallet_reconciliation import reconcile_batch, repair_wallet
+from tests.conftest import mk_user, deposit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _pass(db, **kw):
+    params = {"batch": 1000, "sweep": 10}
+    params.update(kw)
+    res = await reconcile_batch(db, **params)
+    await db.commit()
+    return res
+
+
+async def test_reconcile_flags_drift_and_repair_clears_it(db):
+    a = await mk_user(db, "ra@x.test", "A")
+    b = await mk_user(db, "rb@x.test", "B")
+    await deposit(db, a, 1_000)
+    await deposit(db, b, 500)
+
+    first = await _pass(db)
+    assert (first.after, first.upto, first.lag_ids) == (0, 2, 0)
+    assert (first.checked, first.flagged, first.newly_flagged) == (2, 0, [])
+
+    # a wallet edited without a ledger row is caught by the sweep, not by new rows
+    await db.execute(update(Wallet).where(Wallet.user_id == a).values(posted_cents=Wallet.posted_cents + 7))
+    await db.commit()
+    second = await _pass(db)
+    assert second.upto == second.after == 2
+    assert second.newly_flagged == [(a, 7, 0)]
+    assert (second.flagged, second.drift_posted_cents) == (1, 7)
+    assert (await _pass(db)).newly_flagged == []          # already flagged: reported once
+
+    # a row past the cursor is counted by repair in the wallet, and folded later exactly once
+    await deposit(db, a, 250)
+    fixed = await repair_wallet(db, a)
+    await db.commit()
+    assert (fixed.posted_cents_before, fixed.posted_cents, fixed.changed) == (1_257, 1_250, True)
+
+    third = await _pass(db)
+    assert third.upto == 3
+    assert (third.flagged, third.drift_posted_cents, third.newly_flagged) == (0, 0, [])
+    assert (await repair_wallet(db, a)).changed is False
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app.api.routers.admin import wallet_totals
+from app.db import SessionLocal
+from app.models import User, Wallet
+from app.repos import ledger_repo
+from app.repos.wallet_totals import fold_deltas, read_totals, verify_totals
+from tests.conftest import mk_user, deposit
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_totals_follow_writes_fold_and_verify(db):
+    admin_id = await mk_user(db, "root@x.test", "Root")
+    admin = await db.get(User, admin_id)
+    admin.is_admin = True
+    await db.commit()
+    a = await mk_user(db, "ta@x.test", "A")
+    b = await mk_user(db, "tb@x.test", "B")
+    await deposit(db, a, 1_000)
+    await deposit(db, b, 500)
+    await ledger_repo.apply_ledger_entry(db, user_id=a, kind="hold", amount_cents=200, idempotency_key="tt-hold")
+    await db.commit()
+
+    t = await read_totals(db)
+    assert (t.posted_cents, t.holds_cents, t.pending_deltas) == (1_500, 200, 3)
+    assert await fold_deltas(db) == 3
+    await db.commit()
+    assert await fold_deltas(db) == 0
+
+    # the bulk path appends a single delta for the whole batch
+    await ledger_repo.apply_ledger_entries(db, [
+        {"user_id": a, "kind": "fee_capture", "amount_cents": -300, "idempotency_key": "tt-fee-a"},
+        {"user_id": b, "kind": "refund", "amount_cents": 50, "idempotency_key": "tt-ref-b"},
+    ])
+    await db.commit()
+    t = await read_totals(db)
+    assert (t.posted_cents, t.holds_cents, t.pending_deltas) == (1_250, 200, 1)
+
+    out = await wallet_totals(db=db, current=admin)
+    assert (out.total_posted_cents, out.total_available_cents, out.verified_at) == (1_250, 1_050, None)
+
+    # a wallet changed behind the write path's back is corrected by the verifier
+    await db.execute(update(Wallet).where(Wallet.user_id == b).values(posted_cents=Wallet.posted_cents + 9))
+    await db.commit()
+    assert await verify_totals(db) == (9, 0)
+    await db.commit()
+    assert (await read_totals(db)).posted_cents == 1_259
+    assert await verify_totals(db) == (0, 0)
+
+
+async def test_concurrent_verifiers_correct_drift_once(db):
+    a = await mk_user(db, "va@x.test", "A")
+    await deposit(db, a, 1_000)
+    await fold_deltas(db)
+    await db.commit()
+    await db.execute(update(Wallet).where(Wallet.user_id == a).values(posted_cents=Wallet.posted_cents + 7))
+    await db.commit()
+
+    async with SessionLocal() as first, SessionLocal() as second:
+        assert await verify_totals(first) == (7, 0)
+        # the second verifier blocks on the wallet_totals row until the first commits
+        racing = asyncio.create_task(verify_totals(second))
+        await asyncio.sleep(0.2)
+        assert not racing.done()
+        await first.commit()
+        assert await racing == (0, 0)
+        await second.commit()
+
+    assert (await read_totals(db)).posted_cents == 1_007